@@ -71,7 +71,7 @@
 # In[1]:
 
 
-get_ipython().system(' pip install folium')
+# folium устанавливается вместе с остальными зависимостями заранее: pip install folium
 
 
 # In[2]:
@@ -85,16 +85,33 @@ import seaborn as sns
 import plotly.express as px
 import folium
 from plotly import graph_objects as go
-from folium import Map, Choropleth
-from folium import Map, Marker
-from folium.plugins import MarkerCluster
+from folium import Map
+from places import (
+    EXACT,
+    STATE_GEO,
+    DistrictBoundaries,
+    PlacesCube,
+    StreetIndex,
+    add_cluster_layer,
+    candidate_grid,
+    category_totals,
+    district_map,
+    extract_street,
+    fix_chain_flag,
+    infer_chains,
+    is_24_7,
+    load_places,
+    normalize_names,
+    rank_sites,
+    report_tables,
+    site_features,
+    top_entities,
+)
 
 
 # In[3]:
 
 
-# загружаем JSON-файл с границами округов Москвы
-state_geo = 'https://code.s3.yandex.net/data-analyst/admin_level_geomap.geojson'
 # moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
 moscow_lat, moscow_lng = 55.751244, 37.618423
 
@@ -105,11 +122,10 @@ m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
 # In[4]:
 
 
-try:
-    data = pd.read_csv('moscow_places.csv')
-except:
-    data = pd.read_csv('moscow_places.csv')
-    
+# загружаем датасет с явной схемой типов; при повторных запусках
+# читается закешированный снимок вместо разбора CSV
+data = load_places('moscow_places.csv')
+
 display(data)
 
 
@@ -166,16 +182,8 @@ display(data['name'].nunique())
 # In[11]:
 
 
-# Перевод в верхний регистр 
-data['name'] = data['name'].str.upper()
-# Удаление пробелов по краям
-data['name'] = data['name'].str.strip()
-
-
-# In[12]:
-
-
-data['name'] = data['name'].str.replace('Ё','Е')
+# Перевод в верхний регистр, удаление пробелов по краям и замена Ё на Е
+data['name'] = normalize_names(data['name'])
 
 
 # In[13]:
@@ -202,9 +210,7 @@ display(data)
 
 # Создание столбца street с названиями улиц из столбца с адресом;
 
-data['street'] = data['address'].apply(
-    lambda x: x.split(',')[1].strip()
-)
+data['street'] = extract_street(data['address'])
 
 
 # In[16]:
@@ -217,10 +223,7 @@ display(data)
 
 
 # Создание столбца is_24/7 с обозначением, что заведение работает ежедневно и круглосуточно (24/7)
-data['is_24/7'] = data['hours'].apply(
-    lambda x: True if x == 'ежедневно, круглосуточно' 
-    else False
-)
+data['is_24/7'] = is_24_7(data['hours'])
 
 
 # In[18]:
@@ -240,7 +243,18 @@ display(data)
 # In[19]:
 
 
-data_cat = (data.groupby('category').agg(count=('lat','count')).reset_index().sort_values('count', ascending=False))
+# исправляем флаг chain: сетью считаются и неотмеченные заведения с названием
+# отмеченной сети; варианты написания одной сети («Кофемания», «КОФЕ МАНИЯ»)
+# объединяются под самым частым названием
+chains = infer_chains(data)
+data = fix_chain_flag(data, chains)
+
+# строим куб агрегатов за один проход по данным, таблицы ниже - его срезы;
+# медианы точные, как у groupby
+cube = PlacesCube.build(data, sketch_alpha=EXACT)
+tables = report_tables(cube)
+
+data_cat = tables['data_cat']
 display(data_cat)
 
 
@@ -264,7 +278,7 @@ fig.show()
 # In[21]:
 
 
-data.groupby('category')['seats'].median().sort_values(ascending=False)
+tables['seats_med']
 
 
 # In[22]:
@@ -290,7 +304,7 @@ fig.set_title('Кол-во посадочных мест по категория
 # In[24]:
 
 
-seats_med = data.groupby('category').agg(median=('seats','median')).reset_index().sort_values('median', ascending=False)
+seats_med = tables['seats_med']
 
 
 # In[25]:
@@ -316,7 +330,7 @@ fig.show()
 
 
 # Посчитаем кол-во по группам и подготовим к визуализации
-data_chain = (data.groupby('chain').agg(count=('lat','count')).reset_index())
+data_chain = tables['data_chain'].copy()
 data_chain['chain'] = data_chain['chain'].map({1: 'Сетевое', 0: 'Несетевое'})
 display(data_chain)
 
@@ -339,15 +353,18 @@ fig.show()
 # In[28]:
 
 
-# Создадим данныне только по сетевым заведениям
-chain_rest = data.query('chain == 1')
+# названия сетей из infer_chains (варианты написания объединены)
+data_chains = data.assign(name=chains['chain_name'])
+
+# Создадим данныне только по сетевым заведениям (флаг chain исправлен выше)
+chain_rest = data_chains.query('chain == 1')
 display(chain_rest)
 
 
 # In[29]:
 
 
-chain_rest_cat = (chain_rest.groupby('category').agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+chain_rest_cat = tables['chain_rest_cat']
 display(chain_rest_cat)
 
 
@@ -365,10 +382,7 @@ fig.show()
 # In[31]:
 
 
-chain_rest_all = chain_rest_cat.merge(data_cat, how='inner', on='category')
-chain_rest_all.columns = [ 'category', 'count_chain', 'count_all']
-chain_rest_all['ratio'] = (chain_rest_all['count_chain']/chain_rest_all['count_all'] * 100).round(2)
-chain_rest_all = chain_rest_all.sort_values('ratio', ascending=False)
+chain_rest_all = tables['chain_rest_all']
 display(chain_rest_all)
 
 
@@ -395,22 +409,25 @@ fig.show()
 # In[33]:
 
 
-rest_top = chain_rest.groupby('name').agg(count=('lat','count')).reset_index().sort_values('count', ascending=False).head(15)
+# топ считается по кодам названий за один проход, вместе с разбивкой по категориям
+chains_top = top_entities(data_chains['name'], data_chains['category'], 15,
+                          rank_mask=data_chains['chain'] == 1)
+rest_top = chains_top.top
 display(rest_top)
 
 
 # In[34]:
 
 
-# Составим датасет по топ 15 сетевым заведениям
-rest_top_data = data.merge(rest_top, how='inner', on='name')
+# Разбивка топ 15 сетевых заведений по категориям (без слияния с полным датасетом)
+rest_top_data = chains_top.by_category
 display(rest_top_data)
 
 
 # In[35]:
 
 
-rest_top_cat = (rest_top_data.groupby('category').agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+rest_top_cat = category_totals(rest_top_data)
 display(rest_top_cat)
 
 
@@ -453,7 +470,7 @@ print(data['district'].unique())
 # In[39]:
 
 
-data_dist = (data.groupby(['district','category']).agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+data_dist = tables['data_dist']
 display(data_dist)
 
 
@@ -493,8 +510,7 @@ fig.show()
 # In[42]:
 
 
-rating_mean = data.groupby('category', as_index=False)['rating'].mean().round(2).sort_values(by='rating', ascending=False)
-rating_mean.columns = ['category', 'rating_mean']
+rating_mean = tables['rating_mean']
 rating_mean
 
 
@@ -529,24 +545,18 @@ fig.set_title('Оценки по категориям', fontsize=15);
 # In[45]:
 
 
-distr_rating_mean = data.groupby('district', as_index=False)['rating'].mean().round(2).sort_values(by='rating', ascending=False)
-distr_rating_mean.columns = ['district', 'rating_mean']
+distr_rating_mean = tables['distr_rating_mean']
 distr_rating_mean
 
 
 # In[46]:
 
 
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=distr_rating_mean,
-    columns=['district', 'rating_mean'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    distr_rating_mean.set_index('district')['rating_mean'],
     legend_name='Средний рейтинг заведений по районам',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -566,19 +576,9 @@ moscow_lat, moscow_lng = 55.751244, 37.618423
 
 # создаём карту Москвы
 m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-# создаём пустой кластер, добавляем его на карту
-marker_cluster = MarkerCluster().add_to(m)
-
-# пишем функцию, которая принимает строку датафрейма,
-# создаёт маркер в текущей точке и добавляет его в кластер marker_cluster
-def create_clusters(row):
-    Marker(
-        [row['lat'], row['lng']],
-        popup=f"{row['name']} {row['rating']}",
-    ).add_to(marker_cluster)
-
-# применяем функцию create_clusters() к каждой строке датафрейма
-data.apply(create_clusters, axis=1)
+# добавляем на карту заранее посчитанные кластеры заведений
+# (один JSON на все уровни масштаба вместо отдельного маркера на каждую строку)
+add_cluster_layer(m, data)
 
 # выводим карту
 m
@@ -589,23 +589,17 @@ m
 # In[48]:
 
 
-street_top = data.groupby('street').agg(count=('name','count')).reset_index().sort_values('count', ascending=False).head(15)
+# индекс улиц: адреса разбираются один раз, кол-ва заведений по улицам, категориям и округам считаются заранее
+streets = StreetIndex.from_frame(data)
+street_top = streets.top(15)
 display(street_top)
 
 
 # In[49]:
 
 
-street_top_cat = data.groupby(['street','category']).agg(count=('name','count')).reset_index().sort_values('count', ascending=False)
-display(street_top_cat)
-
-
-# In[50]:
-
-
-street_cat = street_top_cat.merge(street_top, how='inner', on='street')
-street_cat.columns = ['street', 'category', 'count_cat', 'count_street']
-street_cat = street_cat.sort_values('count_street', ascending=False)
+# категории заведений на топ-15 улицах
+street_cat = streets.top_by_category(15)
 display(street_cat)
 
 
@@ -647,7 +641,7 @@ fig.show()
 # In[54]:
 
 
-street_all = data.groupby('street').agg(count=('name','count')).reset_index().sort_values('count', ascending=False)
+street_all = streets.top(None)
 display(street_all)
 
 
@@ -655,7 +649,7 @@ display(street_all)
 
 
 # Создадим данныне только по 1 заведению на улице
-street_one = street_all.query('count == 1')
+street_one = streets.single_venue()
 display(street_one)
 
 
@@ -663,36 +657,26 @@ display(street_one)
 
 
 # Составим датасет по данным улицам и заведениям на них
-street_one_data = data.merge(street_one, how='inner', on='street')
+street_one_data = data.loc[streets.venues_of(street_one['street'])]
 display(street_one_data)
 
 
 # In[57]:
 
 
-street_data = (street_one_data.groupby('district').agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+# кол-ва по округам берутся из индекса улиц, без группировки выбранных строк
+street_data = streets.single_venue_districts()
 display(street_data)
 
 
 # In[58]:
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=street_data,
-    columns=['district', 'count'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    street_data.set_index('district')['count'],
     legend_name='Кол-во заведений по районам',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -706,19 +690,9 @@ moscow_lat, moscow_lng = 55.751244, 37.618423
 
 # создаём карту Москвы
 m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-# создаём пустой кластер, добавляем его на карту
-marker_cluster = MarkerCluster().add_to(m)
-
-# пишем функцию, которая принимает строку датафрейма,
-# создаёт маркер в текущей точке и добавляет его в кластер marker_cluster
-def create_clusters(row):
-    Marker(
-        [row['lat'], row['lng']],
-        popup=f"{row['name']} {row['rating']}",
-    ).add_to(marker_cluster)
-
-# применяем функцию create_clusters() к каждой строке датафрейма
-street_one_data.apply(create_clusters, axis=1)
+# добавляем на карту заранее посчитанные кластеры заведений
+# (один JSON на все уровни масштаба вместо отдельного маркера на каждую строку)
+add_cluster_layer(m, street_one_data)
 
 # выводим карту
 m
@@ -733,7 +707,7 @@ m
 # In[60]:
 
 
-avg_bill = data.groupby('district').agg(median=('middle_avg_bill','median')).reset_index().sort_values('median', ascending=False)
+avg_bill = tables['avg_bill']
 
 display(avg_bill)
 
@@ -742,22 +716,11 @@ display(avg_bill)
 
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=avg_bill,
-    columns=['district', 'median'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    avg_bill.set_index('district')['median'],
     legend_name='Средний рейтинг заведений по районам',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -779,7 +742,7 @@ m
 
 
 # Посчитаем кол-во по группам и подготовим к визуализации
-data_is_24 = (data.groupby(['category','is_24/7']).agg(count=('name','count')).reset_index())
+data_is_24 = tables['data_is_24'].copy()
 data_is_24['is_24/7'] = data_is_24['is_24/7'].map({True: 'Круглосуточно', False: 'Обычно'})
 display(data_is_24)
 
@@ -812,7 +775,7 @@ fig.show()
 # In[65]:
 
 
-price_cat = (data.groupby('price').agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+price_cat = tables['price_cat']
 display(price_cat)
 
 
@@ -823,7 +786,7 @@ display(price_cat)
 # In[66]:
 
 
-data_dist_price = (data.groupby(['district','price']).agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+data_dist_price = tables['data_dist_price']
 display(data_dist_price)
 
 
@@ -864,29 +827,18 @@ print(coffe['name'].count())
 # In[70]:
 
 
-coffe_distr_data = (coffe.groupby('district').agg(count=('name','count')).reset_index().sort_values('count', ascending=False))
+coffe_distr_data = tables['coffe_distr_data']
 display(coffe_distr_data)
 
 
 # In[71]:
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=coffe_distr_data,
-    columns=['district', 'count'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    coffe_distr_data.set_index('district')['count'],
     legend_name='Расположение кофеен',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -899,7 +851,7 @@ m
 # In[72]:
 
 
-coffe_is_24 = (coffe.groupby(['category','is_24/7']).agg(count=('name','count')).reset_index())
+coffe_is_24 = tables['coffe_is_24'].copy()
 coffe_is_24['is_24/7'] = coffe_is_24['is_24/7'].map({True: 'Круглосуточно', False: 'Обычно'})
 display(coffe_is_24)
 
@@ -920,8 +872,7 @@ fig.show()
 # In[74]:
 
 
-coffe_dist_rating = coffe.groupby('district', as_index=False)['rating'].mean().round(2).sort_values(by='rating', ascending=False)
-coffe_dist_rating.columns = ['district', 'rating_mean']
+coffe_dist_rating = tables['coffe_dist_rating']
 coffe_dist_rating
 
 
@@ -929,22 +880,11 @@ coffe_dist_rating
 
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=coffe_dist_rating,
-    columns=['district', 'rating_mean'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    coffe_dist_rating.set_index('district')['rating_mean'],
     legend_name='Средний рейтинг кофеен по районам',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -957,7 +897,7 @@ m
 # In[76]:
 
 
-avg_bill_coffe = coffe.groupby('district').agg(mean=('middle_coffee_cup','mean')).reset_index().sort_values('mean', ascending=False).round(2)
+avg_bill_coffe = tables['avg_bill_coffe']
 
 display(avg_bill_coffe)
 
@@ -966,22 +906,11 @@ display(avg_bill_coffe)
 
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=avg_bill_coffe,
-    columns=['district', 'mean'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    avg_bill_coffe.set_index('district')['mean'],
     legend_name='Средняя цена чашки кофе',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -990,7 +919,7 @@ m
 # In[78]:
 
 
-median_bill_coffe = coffe.groupby('district').agg(median=('middle_coffee_cup','median')).reset_index().sort_values('median', ascending=False).round(2)
+median_bill_coffe = tables['median_bill_coffe']
 
 display(median_bill_coffe)
 
@@ -999,22 +928,11 @@ display(median_bill_coffe)
 
 
 
-# moscow_lat - широта центра Москвы, moscow_lng - долгота центра Москвы
-moscow_lat, moscow_lng = 55.751244, 37.618423
-
-# создаём карту Москвы
-m = Map(location=[moscow_lat, moscow_lng], zoom_start=10)
-
-# создаём хороплет с помощью конструктора Choropleth и добавляем его на карту
-Choropleth(
-    geo_data=state_geo,
-    data=median_bill_coffe,
-    columns=['district', 'median'],
-    key_on='feature.name',
-    fill_color='YlGnBu',
-    fill_opacity=0.8,
+# создаём карту Москвы с хороплетом (геометрия округов загружается один раз и кешируется)
+m = district_map(
+    median_bill_coffe.set_index('district')['median'],
     legend_name='Медианная цена чашки кофе',
-).add_to(m)
+)
 
 # выводим карту
 m
@@ -1024,6 +942,26 @@ m
 # 
 # Самые высокие цены на кофе в центральном, западном и юго-западном округах. Более логично ориентироваться на медианное значение цены в рамках защиты от выблосов. При открытии кофейни стоит ориентироваться на чек в районе и для начал в рамках создания конкуренции снизить его, а потом постепенно наращивать и выходить на средний по округу или кайону (в случае если будут данные в детализации по районам).
 
+# ### Оценка точек для открытия кофейни
+
+# In[80]:
+
+
+# узлы сетки с шагом 100 м внутри округов и признаки окружения каждого узла:
+# кол-во кофеен в радиусах 250/500/1000 м, медианная цена чашки, средний рейтинг,
+# доли сетевых и круглосуточных кофеен рядом
+candidates = candidate_grid(data, step=100, boundaries=DistrictBoundaries.load(STATE_GEO))
+site_scores = rank_sites(site_features(data, candidates['lat'], candidates['lng']), top=20)
+site_scores['district'] = candidates.loc[site_scores.index, 'district']
+display(site_scores)
+
+
+# In[81]:
+
+
+site_scores['district'].value_counts()
+
+
 # ### Выводы этапа анализа кофеен
 
 # Не стоит открывать круглосуточную кофейню, так как это принесет лишние затраты, а кофе по ночам пьют мало людей. Наиболее логичным выглядит открытие кофейни на западе, средний рейтинг ниже чем в центре (можно составить конкуренцию если давать хорошее качество и интересные предложения, а также работать с клиентом), при этом ценник за чашку находится на уровне центра, следовательно имеется потенциал хорошей прибыли, так как скорее всего цена аренды помещения на западе ниже, но для подтверждения этой гепотезы нужно расширить данные.
@@ -0,0 +1,225 @@
+# coding: utf-8
+"""Масштабирование этапов анализа заведений на синтетических данных.
+
+Запуск из каталога «Fast food»:
+
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000
+    python -m benchmarks.bench_pipeline --rows 100000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --rows 100000 --baseline benchmarks/baseline.json
+
+Для каждого объёма генерируется CSV, после чего замеряются этапы скрипта:
+загрузка, нормализация названий, street и is_24/7, каждая таблица-groupby
+(так, как она считается в скрипте), куб агрегатов и таблицы анализа,
+графики и, с --maps, карты. Каждый объём считается в отдельном процессе,
+поэтому пиковая память (RSS) не зависит от предыдущих объёмов. Пиковая
+память этапа - максимум RSS процесса после этапа.
+
+С --baseline время этапов сравнивается с сохранённым запуском; этапы,
+ставшие медленнее больше чем на --tolerance, выводятся как регрессии, и
+код возврата равен 1. Базовая линия зависит от машины, поэтому в
+репозитории не хранится: сохраните её у себя с --save-baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from benchmarks.synthetic import write_places_csv
+from places.preprocessing import extract_street, is_24_7, normalize_names
+
+# таблицы скрипта: имя -> (группировка, столбец, агрегат, фильтр)
+GROUPBY_TABLES = {
+    'data_cat': ('category', 'name', 'count', None),
+    'seats_med': ('category', 'seats', 'median', None),
+    'data_chain': ('chain', 'name', 'count', None),
+    'chain_rest_cat': ('category', 'name', 'count', 'chain == 1'),
+    'rest_top': ('name', 'category', 'count', 'chain == 1'),
+    'data_dist': (['district', 'category'], 'name', 'count', None),
+    'rating_mean': ('category', 'rating', 'mean', None),
+    'distr_rating_mean': ('district', 'rating', 'mean', None),
+    'street_top': ('street', 'name', 'count', None),
+    'avg_bill': ('district', 'middle_avg_bill', 'median', None),
+    'data_is_24': (['category', 'is_24/7'], 'name', 'count', None),
+    'price_cat': ('price', 'name', 'count', None),
+    'data_dist_price': (['district', 'price'], 'name', 'count', None),
+    'coffe_distr_data': ('district', 'name', 'count', 'category == "кофейня"'),
+    'coffe_dist_rating': ('district', 'rating', 'mean', 'category == "кофейня"'),
+    'avg_bill_coffe': ('district', 'middle_coffee_cup', 'mean', 'category == "кофейня"'),
+    'median_bill_coffe': ('district', 'middle_coffee_cup', 'median', 'category == "кофейня"'),
+}
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+# этапы, результат которых нужен остальным: --skip на них не действует
+REQUIRED_STAGES = ('generate', 'load', 'normalize_names', 'street', 'is_24/7')
+
+
+def peak_rss_mb():
+    """Пиковый RSS текущего процесса в МБ (ru_maxrss в КБ на Linux, в байтах на macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class Stages:
+    """Замеры этапов одного объёма: время, строк в секунду и пиковая память."""
+
+    def __init__(self, rows, skip=()):
+        self.rows = rows
+        self.skip = tuple(skip)
+        self.records = []
+
+    def run(self, name, func, *args, **kwargs):
+        if name not in REQUIRED_STAGES and name.startswith(self.skip):
+            return None
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        self.records.append({
+            'rows': self.rows,
+            'stage': name,
+            'seconds': round(seconds, 6),
+            'rows_per_s': round(self.rows / seconds) if seconds > 0 else None,
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        })
+        return result
+
+
+def _groupby(data, by, column, how, where):
+    subset = data.query(where) if where else data
+    return subset.groupby(by)[column].agg(how).reset_index()
+
+
+def _figures(data, tables, out_dir, formats):
+    from places.figures import render_figures, report_figures
+
+    return render_figures(report_figures(data, tables), out_dir, formats, workers=1)
+
+
+def run_size(rows, work_dir, skip=(), formats=('html',), maps=False, boundary=None, seed=0):
+    """Все этапы для одного объёма; возвращает список замеров."""
+    from places.analysis import analysis_tables
+    from places.cube import PlacesCube, report_tables
+    from places.loader import load_places, read_csv_typed
+    from places.sketches import EXACT
+
+    stages = Stages(rows, skip)
+    path = os.path.join(work_dir, f'places_{rows}.csv')
+    stages.run('generate', write_places_csv, path, rows, seed)
+
+    data = stages.run('load', read_csv_typed, path)
+    cache_dir = os.path.join(work_dir, f'cache_{rows}')
+    stages.run('load_snapshot_write', load_places, path, cache_dir)
+    stages.run('load_snapshot', load_places, path, cache_dir)
+
+    data['name'] = stages.run('normalize_names', normalize_names, data['name'])
+    data['street'] = stages.run('street', extract_street, data['address'])
+    data['is_24/7'] = stages.run('is_24/7', is_24_7, data['hours'])
+
+    for name, (by, column, how, where) in GROUPBY_TABLES.items():
+        stages.run(f'groupby:{name}', _groupby, data, by, column, how, where)
+
+    cube = stages.run('cube', PlacesCube.build, data, sketch_alpha=EXACT)
+    if cube is not None:
+        stages.run('report_tables', report_tables, cube)
+    # таблицы анализа строят свой куб по исправленному флагу chain
+    tables = stages.run('analysis_tables', analysis_tables, data)
+
+    if tables is not None:
+        stages.run('figures', _figures, data, tables, os.path.join(work_dir, f'figures_{rows}'),
+                   formats)
+        if maps:
+            from places.cli import save_maps
+
+            stages.run('maps', save_maps, data, tables, os.path.join(work_dir, f'maps_{rows}'),
+                       boundary)
+    return stages.records
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(records, baseline, tolerance):
+    """Таблица сравнения с базовой линией с флагом регрессии для каждого этапа."""
+    base = pd.DataFrame(baseline['results'])[['rows', 'stage', 'seconds']]
+    table = pd.DataFrame(records).merge(base, on=['rows', 'stage'], suffixes=('', '_baseline'))
+    table['ratio'] = (table['seconds'] / table['seconds_baseline']).round(2)
+    # замедление меньше 10 мс считается шумом измерения
+    slower = table['seconds'] - table['seconds_baseline'] > 0.01
+    table['regression'] = slower & (table['ratio'] > 1 + tolerance)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='объёмы синтетических данных (до 10 млн строк)')
+    parser.add_argument('--skip', nargs='*', default=[],
+                        help='пропустить этапы с этими префиксами (например figures groupby:)')
+    parser.add_argument('--format', nargs='+', default=['html'], help='форматы графиков')
+    parser.add_argument('--maps', action='store_true', help='замерять сохранение карт')
+    parser.add_argument('--boundary', default=None,
+                        help='GeoJSON с границами округов для карт (по умолчанию STATE_GEO)')
+    parser.add_argument('--work-dir', default=None,
+                        help='каталог для CSV и результатов (по умолчанию временный)')
+    parser.add_argument('--json', default=None, help='сохранить замеры в JSON')
+    parser.add_argument('--baseline', default=None, help='сравнить с сохранённым JSON')
+    parser.add_argument('--save-baseline', default=None, help='сохранить замеры как базовую линию')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='допустимое замедление относительно базовой линии')
+    args = parser.parse_args(argv)
+
+    if args.maps and args.boundary is None:
+        from places.districts import STATE_GEO
+
+        args.boundary = STATE_GEO
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or tmp
+        os.makedirs(work_dir, exist_ok=True)
+        for rows in args.rows:
+            # отдельный процесс на объём: пиковый RSS считается с нуля
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                records += pool.submit(run_size, rows, work_dir, args.skip, args.format,
+                                       args.maps, args.boundary).result()
+
+    table = pd.DataFrame(records)
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(table.to_string(index=False))
+
+    result = {'environment': environment(), 'results': records}
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(records, baseline, args.tolerance)
+        print()
+        print(comparison[['rows', 'stage', 'seconds', 'seconds_baseline', 'ratio', 'regression']]
+              .to_string(index=False))
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            print(f'\nрегрессии (медленнее больше чем на {args.tolerance:.0%}): '
+                  + ', '.join(f"{row.stage} ({row.rows})" for row in regressions.itertuples()))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
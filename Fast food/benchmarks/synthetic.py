@@ -0,0 +1,227 @@
+# coding: utf-8
+"""Генератор синтетического датасета по схеме moscow_places.csv.
+
+Распределения приближены к исходным данным: доли категорий и округов,
+координаты вокруг центров округов, рейтинг около 4.2, около 40% сетевых
+заведений, адреса «Москва, <улица>, <дом>» с улицами разных типов и
+частотой по закону Ципфа, строки hours и avg_bill в форматах Яндекс
+Карт. Средний чек и цена чашки кофе согласованы со строкой avg_bill.
+Генерация векторная (около 3 с на миллион строк); для больших объёмов
+write_places_csv пишет CSV частями, не держа весь датасет в памяти.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = [
+    'кафе', 'ресторан', 'кофейня', 'бар,паб',
+    'пиццерия', 'быстрое питание', 'столовая', 'булочная',
+]
+# кол-во заведений по категориям в исходных данных
+CATEGORY_COUNTS = [2003, 1969, 1398, 747, 628, 570, 306, 249]
+
+DISTRICTS = [
+    'Центральный административный округ',
+    'Северный административный округ',
+    'Северо-Восточный административный округ',
+    'Северо-Западный административный округ',
+    'Западный административный округ',
+    'Восточный административный округ',
+    'Юго-Восточный административный округ',
+    'Южный административный округ',
+    'Юго-Западный административный округ',
+]
+# кол-во заведений по округам в исходных данных и примерные центры округов
+DISTRICT_COUNTS = [2242, 900, 891, 409, 851, 798, 714, 892, 709]
+DISTRICT_CENTERS = [
+    (55.754, 37.620), (55.838, 37.525), (55.864, 37.634),
+    (55.829, 37.452), (55.728, 37.443), (55.787, 37.775),
+    (55.692, 37.755), (55.622, 37.679), (55.662, 37.529),
+]
+
+PRICES = ['средние', 'выше среднего', 'высокие', 'низкие']
+PRICE_COUNTS = [2117, 564, 478, 156]
+# доля заведений без категории цены
+PRICE_MISSING = 0.61
+
+STREETS = [
+    'проспект Мира', 'Профсоюзная улица', 'Ленинградский проспект',
+    'Пресненская набережная', 'Варшавское шоссе', 'Ленинский проспект',
+    'улица Вавилова', 'Каширское шоссе', 'Кировоградская улица',
+    'МКАД', 'Тверская улица', 'улица Арбат', 'Кутузовский проспект',
+    'Большая Садовая улица', 'Сретенский бульвар', 'Петровка',
+]
+# основы названий для остальных улиц: «<основа> улица», «улица <основа>» и т. п.
+STREET_STEMS = [
+    'Ленина', 'Гагарина', 'Пушкина', 'Лесная', 'Садовая', 'Новая', 'Школьная',
+    'Молодёжная', 'Мясницкая', 'Покровка', 'Маросейка', 'Пятницкая', 'Бауманская',
+    'Сокольническая', 'Нагорная', 'Озёрная', 'Беговая', 'Полярная', 'Строителей',
+    'Академика Королёва', 'Маршала Жукова', 'Героев Панфиловцев', 'Дмитрия Ульянова',
+    'Новослободская', 'Земляной Вал', 'Лефортовский', 'Измайловский', 'Рязанский',
+    'Волгоградский', 'Андропова', 'Вернадского', 'Мичуринский', 'Хорошёвское',
+]
+STREET_PATTERNS = [
+    '{} улица', 'улица {}', '{} переулок', '{} проезд', '{} бульвар',
+    'проспект {}', '{} шоссе', '{} набережная', '{} площадь', 'ул. {}',
+]
+HOUSE_SUFFIXES = ['', '', '', '', 'А', 'к1', 'к2', 'с1', 'с2', 'к1с2']
+
+NAMES = [
+    'Шоколадница', 'Домино\'с Пицца', 'Додо Пицца', 'One Price Coffee',
+    'Яндекс Лавка', 'Cofix', 'Prime', 'Хинкальная', 'КОФЕПОРТ',
+    'Кулинарная лавка братьев Караваевых', 'Теремок', 'Чайхана',
+    'Буханка', 'Кофемания', 'Ёлки-Палки', ' кафе ', 'Шаурма',
+]
+# слова для названий несетевых заведений («Кафе Уют», «Бар Встреча 12»)
+NAME_PREFIXES = ['Кафе', 'Ресторан', 'Бар', 'Кофейня', 'Пекарня', 'Столовая', 'Пиццерия', '']
+NAME_WORDS = [
+    'Уют', 'Встреча', 'Лето', 'Весна', 'Причал', 'Дом', 'Огонёк', 'Вкус', 'Гости',
+    'Самовар', 'Пельменная', 'Хачапури', 'Суши', 'Burger', 'Coffee', 'Bistro',
+    'Grill', 'Time', 'Bar', 'Шашлык', 'Плов', 'Блинная', 'Сказка', 'Лофт',
+]
+
+HOURS = [
+    'ежедневно, круглосуточно',
+    'ежедневно, 10:00–22:00',
+    'ежедневно, 09:00–23:00',
+    'пн-пт 08:00–20:00; сб,вс 10:00–20:00',
+    'пн-чт 12:00–00:00; пт,сб 12:00–02:00; вс 12:00–00:00',
+    'пн-пт 09:00–18:00',
+    'ежедневно, 11:00–23:00',
+    'ежедневно, 08:00–22:00',
+    'ежедневно, 12:00–06:00',
+    'пн-пт 07:30–19:00; сб 09:00–17:00',
+    'вт-вс 11:00–21:00',
+    'пн-сб 10:00–20:00',
+]
+HOURS_WEIGHTS = [9, 14, 10, 6, 4, 4, 12, 10, 2, 3, 2, 3]
+
+AVG_BILLS = [
+    'Средний счёт:1000–1500 ₽',
+    'Средний счёт:500–1000 ₽',
+    'Средний счёт:от 1000 ₽',
+    'Средний счёт:2000 ₽',
+    'Цена чашки капучино:130–220 ₽',
+    'Цена чашки капучино:от 170 ₽',
+    'Цена бокала пива:400–600 ₽',
+]
+
+# центр Москвы
+MOSCOW_LAT, MOSCOW_LNG = 55.751244, 37.618423
+
+
+def _bill_pool(prefix, low, high, step):
+    """Строки avg_bill «<prefix>:от X ₽», «X ₽» и «X–Y ₽» и их середины."""
+    values = np.arange(low, high + step, step)
+    strings, middles = [], []
+    for value in values:
+        strings += [f'{prefix}:от {value} ₽', f'{prefix}:{value} ₽']
+        middles += [value, value]
+        for upper in values[(values > value) & (values <= value * 3)]:
+            strings.append(f'{prefix}:{value}–{upper} ₽')
+            middles.append((value + upper) / 2)
+    return np.array(strings, dtype=object), np.array(middles, dtype=np.float64)
+
+
+_BILLS = _bill_pool('Средний счёт', 100, 5000, 100)
+_CUPS = _bill_pool('Цена чашки капучино', 60, 400, 10)
+_BEERS = _bill_pool('Цена бокала пива', 150, 900, 50)
+
+
+def _street_pool():
+    """Все названия улиц: известные улицы и сочетания основ с типами."""
+    generated = [pattern.format(stem) for stem in STREET_STEMS for pattern in STREET_PATTERNS]
+    return np.array(STREETS + generated, dtype=object)
+
+
+def make_places(n_rows, seed=0, missing_street=0.0):
+    """Возвращает DataFrame из n_rows синтетических заведений.
+
+    missing_street - доля адресов без запятой (без улицы).
+    """
+    rng = np.random.default_rng(seed)
+
+    def pick(values, weights=None):
+        p = None if weights is None else np.divide(weights, np.sum(weights))
+        return np.asarray(values, dtype=object)[
+            rng.choice(len(values), size=n_rows, p=p)
+        ]
+
+    chain = (rng.random(n_rows) < 0.38).astype(np.int64)
+
+    # названия: сетевые - из NAMES, несетевые - сочетания слов с номером
+    name = pick(NAMES)
+    own = chain == 0
+    own_names = pd.Series(pick(NAME_PREFIXES)[own]) + ' ' + pick(NAME_WORDS)[own]
+    numbered = rng.random(own.sum()) < 0.5
+    numbers = pd.Series(rng.integers(1, 1000, numbered.sum())).astype(str)
+    own_names[numbered] += ' ' + numbers.to_numpy()
+    name[own] = own_names.str.strip().to_numpy(dtype=object)
+
+    # улицы по закону Ципфа: несколько длинных улиц и много коротких
+    street_pool = _street_pool()
+    streets = pick(street_pool, 1 / np.arange(1, len(street_pool) + 1))
+    houses = pd.Series(rng.integers(1, 200, size=n_rows)).astype(str) + pick(HOUSE_SUFFIXES)
+    address = ('Москва, ' + pd.Series(streets) + ', ' + houses).to_numpy(dtype=object)
+    no_street = rng.random(n_rows) < missing_street
+    address[no_street] = 'Москва'
+
+    district_weights = np.divide(DISTRICT_COUNTS, sum(DISTRICT_COUNTS))
+    district_code = rng.choice(len(DISTRICTS), size=n_rows, p=district_weights)
+    centers = np.array(DISTRICT_CENTERS)[district_code]
+
+    category = pick(CATEGORIES, CATEGORY_COUNTS)
+    # строка avg_bill: у кофеен - цена чашки, у баров - бокала пива, иначе средний чек
+    avg_bill = np.full(n_rows, None, dtype=object)
+    middle_avg_bill = np.full(n_rows, np.nan)
+    middle_coffee_cup = np.full(n_rows, np.nan)
+    has_bill = rng.random(n_rows) < 0.45
+    kind = np.select([category == 'кофейня', category == 'бар,паб'], [1, 2], 0)
+    for code, (strings, middles), target in [
+        (0, _BILLS, middle_avg_bill), (1, _CUPS, middle_coffee_cup), (2, _BEERS, None),
+    ]:
+        rows = np.flatnonzero(has_bill & (kind == code))
+        # половина кофеен указывает средний чек вместо цены чашки
+        if code == 1:
+            rows = rows[rng.random(len(rows)) < 0.5]
+        choice = rng.choice(len(strings), size=len(rows))
+        avg_bill[rows] = strings[choice]
+        if target is not None:
+            target[rows] = middles[choice]
+    rest = np.flatnonzero(has_bill & pd.isna(avg_bill))
+    choice = rng.choice(len(_BILLS[0]), size=len(rest))
+    avg_bill[rest] = _BILLS[0][choice]
+    middle_avg_bill[rest] = _BILLS[1][choice]
+
+    hours = pick(HOURS, HOURS_WEIGHTS)
+    hours[rng.random(n_rows) < 0.06] = None
+
+    seats = rng.gamma(2.0, 40.0, size=n_rows).round()
+    seats[rng.random(n_rows) < 0.43] = np.nan
+
+    price = pick(PRICES, PRICE_COUNTS)
+    price[rng.random(n_rows) < PRICE_MISSING] = None
+
+    return pd.DataFrame({
+        'name': name,
+        'category': category,
+        'address': address,
+        'district': np.asarray(DISTRICTS, dtype=object)[district_code],
+        'hours': hours,
+        'lat': centers[:, 0] + rng.normal(0, 0.03, size=n_rows),
+        'lng': centers[:, 1] + rng.normal(0, 0.05, size=n_rows),
+        'rating': np.clip(rng.normal(4.23, 0.47, size=n_rows), 1, 5).round(1),
+        'price': price,
+        'avg_bill': avg_bill,
+        'middle_avg_bill': middle_avg_bill,
+        'middle_coffee_cup': middle_coffee_cup,
+        'chain': chain,
+        'seats': seats,
+    })
+
+
+def write_places_csv(path, n_rows, seed=0, chunk_rows=1_000_000, missing_street=0.0):
+    """Пишет n_rows синтетических заведений в CSV частями по chunk_rows строк."""
+    for start in range(0, n_rows, chunk_rows):
+        chunk = make_places(min(chunk_rows, n_rows - start), seed + start, missing_street)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
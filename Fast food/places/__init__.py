@@ -0,0 +1,56 @@
+# coding: utf-8
+"""Инструменты для анализа датасета заведений общественного питания Москвы.
+
+Модули пакета загружаются лениво, при первом обращении к имени:
+``import places`` не тянет pandas, а plotly, seaborn и folium
+импортируются только функциями построения графиков и карт.
+"""
+
+import importlib
+
+# модуль -> имена, которые пакет экспортирует из него
+_EXPORTS = {
+    'places.analysis': ['analysis_tables'],
+    'places.avg_bill': ['middle_prices', 'parse_avg_bill'],
+    'places.choropleth': ['district_map', 'load_geometry', 'render_district_metrics'],
+    'places.cube': ['PlacesCube', 'report_tables'],
+    'places.dedup': ['connected_components', 'fix_chain_flag', 'infer_chains', 'name_keys'],
+    'places.density': ['DensitySurface', 'hexbin', 'kde_surface', 'kde_surfaces', 'surface_frame'],
+    'places.districts': [
+        'DistrictBoundaries', 'STATE_GEO', 'assign_districts', 'cached_geojson', 'fill_districts',
+    ],
+    'places.figures': ['FigureSpec', 'build_figure', 'render_figures', 'report_figures'],
+    'places.hours': ['hours_bitmap', 'open_at', 'open_during', 'week_mask'],
+    'places.incremental': ['IncrementalReport', 'diff_snapshots'],
+    'places.instrument': ['Instrumentation', 'StageRecord'],
+    'places.loader': ['SCHEMA', 'load_places', 'read_csv_chunks', 'read_csv_typed'],
+    'places.markers': ['add_cluster_layer', 'build_clusters'],
+    'places.preprocessing': ['extract_street', 'is_24_7', 'normalize_names', 'preprocess'],
+    'places.runner': ['CityConfig', 'run_cities', 'run_city'],
+    'places.scoring': ['candidate_grid', 'rank_sites', 'score_sites', 'site_features'],
+    'places.sketches': ['EXACT', 'QuantileSketches'],
+    'places.service': ['PlacesService', 'QueryCache', 'serve'],
+    'places.spatial': ['VenueIndex'],
+    'places.store': ['Venue', 'VenueStore'],
+    'places.streaming': ['iter_preprocessed', 'stream_cube'],
+    'places.streets': ['StreetIndex', 'parse_addresses'],
+    'places.tiles': ['export_density_tiles', 'export_district_tiles'],
+    'places.topn': ['SpaceSaving', 'TopN', 'category_totals', 'stream_top', 'top_entities'],
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
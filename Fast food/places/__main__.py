@@ -0,0 +1,8 @@
+# coding: utf-8
+"""Точка входа: python -m places."""
+
+import sys
+
+from places.cli import main
+
+sys.exit(main())
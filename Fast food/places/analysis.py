@@ -0,0 +1,48 @@
+# coding: utf-8
+"""Все таблицы анализа из скрипта «Fast food.py» без графиков и карт.
+
+Как и в скрипте, флаг chain сначала исправляется по найденным сетям
+(places.dedup.infer_chains), поэтому все таблицы по сетевым заведениям
+считаются по исправленному флагу. Срезы по измерениям куба берутся из
+places.cube.report_tables, к ним добавляются таблицы по сетям (с
+объединёнными вариантами написания) и улицам, которые в скрипте
+считаются отдельными ячейками. С instrument каждая группа таблиц
+замеряется как отдельный этап.
+"""
+
+from places.cube import PlacesCube, report_tables
+from places.dedup import fix_chain_flag, infer_chains
+from places.instrument import DISABLED
+from places.sketches import EXACT
+from places.streets import StreetIndex
+from places.topn import category_totals, top_entities
+
+
+def analysis_tables(data, cube=None, top=15, instrument=DISABLED):
+    """Словарь имя таблицы -> DataFrame; data - предобработанная таблица заведений.
+
+    cube - куб по data с уже исправленным флагом chain (None - строится здесь).
+    """
+    chains = instrument.call('infer_chains', infer_chains, data)
+    data = fix_chain_flag(data, chains)
+    if cube is None:
+        cube = instrument.call('cube', PlacesCube.build, data, sketch_alpha=EXACT)
+    tables = instrument.call('report_tables', report_tables, cube)
+
+    with instrument.stage('chains', len(data)) as stage:
+        # топ сетей: варианты написания одной сети объединены под самым частым названием;
+        # рейтинг - по сетевым заведениям, разбивка по категориям - по всем заведениям топа
+        names = chains['chain_name'].rename('name')
+        top_chains = top_entities(names, data['category'], top,
+                                  rank_mask=data['chain'].to_numpy() == 1)
+        tables['rest_top'] = top_chains.top
+        tables['rest_top_cat'] = category_totals(top_chains.by_category)
+        stage.rows_out = len(top_chains.top) + len(tables['rest_top_cat'])
+
+    with instrument.stage('streets', len(data)) as stage:
+        streets = StreetIndex.from_frame(data)
+        tables['street_top'] = streets.top(top)
+        tables['street_cat'] = streets.top_by_category(top)
+        tables['street_data'] = streets.single_venue_districts()
+        stage.rows_out = sum(len(tables[name]) for name in ('street_top', 'street_cat', 'street_data'))
+    return tables
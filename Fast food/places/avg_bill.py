@@ -0,0 +1,86 @@
+# coding: utf-8
+"""Разбор строк avg_bill в числовые столбцы.
+
+Строка вида «Средний счёт:1000–1500 ₽» превращается в вид цены (bill,
+coffee_cup, beer), нижнюю и верхнюю границы диапазона и середину. Середина
+считается так же, как в middle_avg_bill и middle_coffee_cup исходных данных:
+для диапазона - медиана двух значений, для одного числа - само число.
+«от X» задаёт только нижнюю границу, «до X» - только верхнюю.
+"""
+
+import numpy as np
+import pandas as pd
+
+# вид цены по подписи до двоеточия
+KINDS = {
+    'средний счёт': 'bill',
+    'средний счет': 'bill',
+    'цена чашки капучино': 'coffee_cup',
+    'цена одной чашки капучино': 'coffee_cup',
+    'цена бокала пива': 'beer',
+}
+
+# столбцы исходных данных, которые можно пересчитать из avg_bill
+MIDDLE_COLUMNS = {
+    'bill': 'middle_avg_bill',
+    'coffee_cup': 'middle_coffee_cup',
+}
+
+# пробелы, в том числе неразрывные (U+00A0, U+202F) - разделители разрядов в Яндекс Картах;
+# со строками Arrow в pandas 3 класс \s их не включает, поэтому они перечислены явно
+SPACES = '\\s\u00a0\u202f'
+
+AVG_BILL_PATTERN = (
+    rf'^[{SPACES}]*(?P<label>[^:]+?)[{SPACES}]*:[{SPACES}]*'
+    rf'(?:(?P<bound>от|до)[{SPACES}]*)?(?P<low>\d[\d{SPACES}]*?)[{SPACES}]*'
+    rf'(?:[–—-][{SPACES}]*(?P<high>\d[\d{SPACES}]*?))?[{SPACES}]*(?:₽|руб|$)'
+)
+
+
+def _to_number(values):
+    return pd.to_numeric(
+        values.str.replace(f'[{SPACES}]', '', regex=True), errors='coerce'
+    )
+
+
+def _parse_unique(values):
+    parts = values.str.extract(AVG_BILL_PATTERN)
+    kind = parts['label'].str.lower().map(KINDS)
+    # строки с неизвестной подписью считаются нераспознанными
+    number = _to_number(parts['low']).where(kind.notna())
+    upper = _to_number(parts['high']).where(kind.notna())
+    up_to = parts['bound'].eq('до')
+    low = number.mask(up_to)
+    high = upper.fillna(number.where(up_to))
+    return pd.DataFrame({
+        'kind': kind,
+        'low': low,
+        'high': high,
+        'middle': ((low + high) / 2).fillna(low).fillna(high),
+    })
+
+
+def parse_avg_bill(avg_bill):
+    """Разбирает столбец avg_bill.
+
+    Возвращает DataFrame с тем же индексом и столбцами kind (категория),
+    low, high, middle (float64). Каждая уникальная строка разбирается один
+    раз; пропуски и нераспознанные строки дают пропуски во всех столбцах.
+    """
+    avg_bill = pd.Series(avg_bill)
+    codes, uniques = pd.factorize(avg_bill)
+    parsed = _parse_unique(pd.Series(uniques, dtype='object').astype(str))
+    # добавляем пустую строку для кода -1 (пропуск)
+    parsed.loc[len(parsed)] = [np.nan] * parsed.shape[1]
+    result = parsed.iloc[codes].set_axis(avg_bill.index)
+    result['kind'] = result['kind'].astype('category')
+    return result
+
+
+def middle_prices(avg_bill):
+    """Пересчитывает столбцы middle_avg_bill и middle_coffee_cup из avg_bill."""
+    parsed = parse_avg_bill(avg_bill)
+    return pd.DataFrame({
+        column: parsed['middle'].where(parsed['kind'] == kind)
+        for kind, column in MIDDLE_COLUMNS.items()
+    })
@@ -0,0 +1,118 @@
+# coding: utf-8
+"""Хороплеты показателей по округам с однократной загрузкой геометрии.
+
+Геометрия границ загружается и упрощается один раз за процесс (кеш по
+источнику и допуску упрощения) и переиспользуется всеми картами. Все
+показатели объединяются в одну таблицу по округам, после чего строятся
+либо отдельные карты на каждый показатель, либо одна карта со слоями,
+которые переключаются через LayerControl.
+"""
+
+import copy
+import json
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from places.districts import STATE_GEO, cached_geojson
+
+# центр Москвы
+MOSCOW_CENTER = (55.751244, 37.618423)
+
+
+def _simplify_ring(ring, tolerance):
+    """Убирает вершины ближе tolerance (в градусах) к предыдущей оставленной.
+
+    Первая и последняя вершины кольца сохраняются.
+    """
+    ring = np.asarray(ring, dtype=np.float64)[:, :2]
+    if tolerance <= 0 or len(ring) <= 4:
+        return ring
+    snapped = np.round(ring / tolerance)
+    keep = np.r_[True, np.any(snapped[1:] != snapped[:-1], axis=1)]
+    keep[-1] = True
+    simplified = ring[keep]
+    # кольцо должно оставаться многоугольником
+    return simplified if len(simplified) >= 4 else ring
+
+
+def _simplify_geometry(geometry, tolerance):
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return geometry
+    simplified = [
+        [_simplify_ring(ring, tolerance).round(6).tolist() for ring in polygon]
+        for polygon in polygons
+    ]
+    if geometry['type'] == 'Polygon':
+        return {'type': 'Polygon', 'coordinates': simplified[0]}
+    return {'type': 'MultiPolygon', 'coordinates': simplified}
+
+
+@lru_cache(maxsize=8)
+def load_geometry(source=STATE_GEO, tolerance=0.0005):
+    """Упрощённый GeoJSON границ (dict).
+
+    Файл читается и упрощается один раз за процесс; все вызовы получают
+    один и тот же объект, поэтому его нельзя изменять - перед передачей
+    туда, где он меняется (например, в folium), нужна копия.
+    """
+    with open(cached_geojson(source), encoding='utf-8') as f:
+        geojson = json.load(f)
+    for feature in geojson['features']:
+        feature['geometry'] = _simplify_geometry(feature['geometry'], tolerance)
+    return geojson
+
+
+def render_district_metrics(metrics, source=STATE_GEO, layered=False,
+                            center=MOSCOW_CENTER, zoom_start=10, tolerance=0.0005,
+                            key_on='feature.name', fill_color='YlGnBu', fill_opacity=0.8):
+    """Строит хороплеты для словаря metrics: подпись легенды -> Series (округ -> значение).
+
+    При layered=False возвращает словарь подпись -> folium.Map, при
+    layered=True - одну карту со всеми показателями в виде переключаемых слоёв.
+    """
+    from folium import Choropleth, LayerControl, Map
+
+    geo_data = load_geometry(source, tolerance)
+    # все показатели в одной таблице по округам
+    table = pd.concat(metrics, axis=1)
+    table.index.name = 'district'
+    table = table.reset_index()
+
+    def add_layer(m, legend_name, show=True):
+        Choropleth(
+            # folium дописывает в признаки id, поэтому получает копию общей геометрии
+            geo_data=copy.deepcopy(geo_data),
+            data=table,
+            columns=['district', legend_name],
+            key_on=key_on,
+            fill_color=fill_color,
+            fill_opacity=fill_opacity,
+            legend_name=legend_name,
+            name=legend_name,
+            show=show,
+        ).add_to(m)
+
+    if layered:
+        m = Map(location=list(center), zoom_start=zoom_start)
+        for i, legend_name in enumerate(metrics):
+            add_layer(m, legend_name, show=i == 0)
+        LayerControl(collapsed=False).add_to(m)
+        return m
+
+    maps = {}
+    for legend_name in metrics:
+        m = Map(location=list(center), zoom_start=zoom_start)
+        add_layer(m, legend_name)
+        maps[legend_name] = m
+    return maps
+
+
+def district_map(metric, legend_name, **kwargs):
+    """Карта с одним хороплетом; metric - Series (округ -> значение)."""
+    return render_district_metrics({legend_name: metric}, **kwargs)[legend_name]
@@ -0,0 +1,158 @@
+# coding: utf-8
+"""Командная строка пакета places.
+
+Запуск из каталога «Fast food»:
+
+    python -m places report moscow_places.csv --out report
+    python -m places report moscow_places.csv --out report --figures --maps
+    python -m places cities cities.json --out reports
+    python -m places serve moscow_places.csv --port 8000
+    python -m places report moscow_places.csv --metrics metrics.prom --profile
+
+Этап report считает все таблицы анализа и сохраняет их в CSV; графики
+(--figures) и карты (--maps) строятся только по запросу, и только тогда
+загружаются plotly, seaborn, matplotlib и folium. С --metrics замеры этапов
+(время, CPU, строки, память) сохраняются в JSON или OpenMetrics.
+"""
+
+import argparse
+import os
+import sys
+
+from places.analysis import analysis_tables
+from places.choropleth import MOSCOW_CENTER, render_district_metrics
+from places.districts import STATE_GEO
+from places.figures import FORMATS, render_figures, report_figures
+from places.instrument import Instrumentation
+from places.loader import load_places
+from places.markers import add_cluster_layer
+from places.preprocessing import preprocess
+from places.runner import failed_cities, load_configs, run_cities
+from places.service import serve
+
+# карты показателей по округам: подпись легенды -> (таблица, столбец)
+DISTRICT_METRICS = {
+    'Средний рейтинг заведений по районам': ('distr_rating_mean', 'rating_mean'),
+    'Кол-во улиц с одним заведением по районам': ('street_data', 'count'),
+    'Медианный средний чек по районам': ('avg_bill', 'median'),
+    'Расположение кофеен': ('coffe_distr_data', 'count'),
+    'Средний рейтинг кофеен по районам': ('coffe_dist_rating', 'rating_mean'),
+    'Средняя цена чашки кофе': ('avg_bill_coffe', 'mean'),
+    'Медианная цена чашки кофе': ('median_bill_coffe', 'median'),
+}
+
+
+def save_tables(tables, out_dir):
+    """Сохраняет таблицы анализа в out_dir/<имя>.csv."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_csv(os.path.join(out_dir, f'{name}.csv'), index=False)
+
+
+def save_maps(data, tables, out_dir, boundary=STATE_GEO, center=MOSCOW_CENTER):
+    """Карта показателей по округам (слои) и карта заведений с кластерами в HTML."""
+    from folium import Map
+
+    os.makedirs(out_dir, exist_ok=True)
+    metrics = {
+        legend: tables[table].set_index('district')[column]
+        for legend, (table, column) in DISTRICT_METRICS.items()
+    }
+    districts = render_district_metrics(metrics, boundary, layered=True, center=center)
+    districts.save(os.path.join(out_dir, 'districts.html'))
+    venues = Map(location=list(center), zoom_start=10)
+    add_cluster_layer(venues, data)
+    venues.save(os.path.join(out_dir, 'venues.html'))
+
+
+def report(args):
+    instrument = Instrumentation(args.metrics is not None, args.profile, args.trace_memory)
+    data = instrument.call('load', load_places, args.data)
+    data = instrument.call('preprocess', preprocess, data, instrument)
+    tables = instrument.call('analysis', analysis_tables, data, instrument=instrument)
+    instrument.call('save_tables', save_tables, tables, os.path.join(args.out, 'tables'))
+    print(f'таблиц: {len(tables)}')
+    if args.figures:
+        with instrument.stage('figures', len(data)) as stage:
+            stats = render_figures(report_figures(data, tables),
+                                   os.path.join(args.out, 'figures'), args.format, args.workers)
+            stage.rows_out = stats['rendered']
+        print(f"графиков отрендерено: {stats['rendered']}, без изменений: {stats['skipped']}")
+    if args.maps:
+        instrument.call('maps', save_maps, data, tables, os.path.join(args.out, 'maps'),
+                        args.boundary)
+        print('карты сохранены')
+    if args.metrics is not None:
+        instrument.write(args.metrics, args.metrics_format)
+        print(f'замеры этапов: {args.metrics}')
+
+
+def cities(args):
+    try:
+        configs = load_configs(args.config)
+    except ValueError as error:
+        print(f'{args.config}: {error}', file=sys.stderr)
+        return 2
+    summary = run_cities(configs, args.out, args.workers, args.metrics, args.maps)
+    print(summary.to_string(index=False))
+    failed = failed_cities(summary)
+    if failed:
+        print(f'ошибки в городах: {", ".join(failed)}')
+        return 1
+
+
+def serve_places(args):
+    serve(args.data, args.host, args.port, args.cache_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m places',
+                                     description='Анализ заведений общественного питания')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = commands.add_parser('report', help='таблицы, графики и карты по одному файлу')
+    report_parser.add_argument('data', help='CSV-файл с заведениями')
+    report_parser.add_argument('--out', default='report', help='каталог для результатов')
+    report_parser.add_argument('--figures', action='store_true', help='рендерить графики')
+    report_parser.add_argument('--format', nargs='+', default=['png'],
+                               choices=FORMATS, help='форматы графиков')
+    report_parser.add_argument('--maps', action='store_true', help='сохранить карты в HTML')
+    report_parser.add_argument('--boundary', default=STATE_GEO,
+                               help='GeoJSON с границами округов (путь или URL)')
+    report_parser.add_argument('--workers', type=int, default=None, help='кол-во процессов')
+    report_parser.add_argument('--metrics', default=None,
+                               help='файл для замеров этапов (.json - JSON, иначе OpenMetrics)')
+    report_parser.add_argument('--metrics-format', choices=['json', 'openmetrics'], default=None,
+                               help='формат замеров (по умолчанию по расширению файла)')
+    report_parser.add_argument('--profile', action='store_true',
+                               help='профиль cProfile для каждого этапа')
+    report_parser.add_argument('--trace-memory', action='store_true',
+                               help='трасса tracemalloc для каждого этапа')
+    report_parser.set_defaults(handler=report)
+
+    cities_parser = commands.add_parser('cities', help='отчёт для нескольких городов')
+    cities_parser.add_argument('config', help='JSON-файл со списком городов')
+    cities_parser.add_argument('--out', default='reports', help='каталог для результатов')
+    cities_parser.add_argument('--workers', type=int, default=None, help='кол-во процессов')
+    cities_parser.add_argument('--metrics', choices=['json', 'openmetrics'], default=None,
+                               help='сохранить замеры этапов в каталог каждого города')
+    cities_parser.add_argument('--maps', action='store_true',
+                               help='сохранить карты каждого города в HTML')
+    cities_parser.set_defaults(handler=cities)
+
+    serve_parser = commands.add_parser('serve', help='HTTP-сервис запросов к датасету')
+    serve_parser.add_argument('data', help='CSV-файл с заведениями')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='адрес сервиса')
+    serve_parser.add_argument('--port', type=int, default=8000, help='порт сервиса')
+    serve_parser.add_argument('--cache-size', type=int, default=256,
+                              help='кол-во ответов в LRU-кеше')
+    serve_parser.set_defaults(handler=serve_places)
+
+    args = parser.parse_args(argv)
+    if args.command == 'report' and (args.profile or args.trace_memory) and not args.metrics:
+        parser.error('--profile и --trace-memory сохраняются только вместе с --metrics')
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
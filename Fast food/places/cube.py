@@ -0,0 +1,341 @@
+# coding: utf-8
+"""Агрегатный куб по измерениям district, category, chain, price, is_24/7.
+
+Куб строится за один проход по данным: для каждой комбинации значений
+измерений (ячейки) хранится кол-во заведений, а для числовых столбцов -
+кол-во непустых значений, сумма, сумма квадратов и гистограмма значений
+с фиксированными границами корзин. Гистограмма служит эскизом для медианы
+и других квантилей: точность - половина ширины корзины (для seats и
+rating - точное значение). При построении с sketch_alpha рядом с
+гистограммами хранятся эскизы квантилей places.sketches с относительной
+ошибкой не больше sketch_alpha при любом диапазоне значений, и медианы и
+перцентили считаются по ним; sketch_alpha=EXACT (0) даёт точные квантили.
+Таблицы скрипта (report_tables) строятся по кубу с точными квантилями.
+
+Все таблицы скрипта по этим измерениям (data_cat, data_dist, rating_mean,
+avg_bill и т.д.) получаются срезами куба без повторного прохода по строкам.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from places.sketches import EXACT, QuantileSketches
+
+DIMENSIONS = ['district', 'category', 'chain', 'price', 'is_24/7']
+
+# границы корзин гистограмм; центры корзин совпадают с «круглыми» значениями
+BIN_EDGES = {
+    'seats': np.concatenate([np.arange(-0.5, 300, 1.0), np.geomspace(300.5, 10_000, 120)]),
+    'rating': np.arange(-0.05, 5.1, 0.1),
+    'middle_avg_bill': np.concatenate([
+        np.arange(-5, 1000, 10.0), np.geomspace(1005, 200_000, 200),
+    ]),
+    'middle_coffee_cup': np.concatenate([
+        np.arange(-2.5, 1000, 5.0), np.geomspace(1002.5, 20_000, 60),
+    ]),
+}
+
+MEASURES = list(BIN_EDGES)
+
+_QUANTILE_RE = re.compile(r'^(?P<measure>.+)_(?:(?P<median>median)|p(?P<p>\d+))$')
+
+
+def _bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def _hist_quantile(hist, centers, q):
+    """Квантиль q по каждой строке гистограмм hist; значения - центры корзин."""
+    total = hist.sum(axis=1)
+    cumulative = np.cumsum(hist, axis=1)
+    # позиция квантиля в отсортированных значениях, как в linear-интерполяции pandas
+    position = (total - 1) * q
+    lower = np.floor(position)
+    upper = np.ceil(position)
+    weight = position - lower
+
+    def value_at(rank):
+        idx = (cumulative <= rank[:, None]).sum(axis=1)
+        return centers[np.minimum(idx, len(centers) - 1)]
+
+    result = value_at(lower) * (1 - weight) + value_at(upper) * weight
+    return np.where(total > 0, result, np.nan)
+
+
+class PlacesCube:
+    """Куб агрегатов по заведениям.
+
+    cells - DataFrame с измерениями и столбцами n, {measure}_count,
+    {measure}_sum, {measure}_sumsq; hist - словарь measure -> массив
+    (кол-во ячеек, кол-во корзин); sketches - словарь measure ->
+    QuantileSketches (пустой, если куб построен без sketch_alpha).
+    """
+
+    def __init__(self, cells, hist, dimensions=DIMENSIONS, bin_edges=BIN_EDGES, sketches=None):
+        self.cells = cells
+        self.hist = hist
+        self.dimensions = list(dimensions)
+        self.bin_edges = bin_edges
+        self.sketches = sketches or {}
+
+    @property
+    def sketch_alpha(self):
+        """Точность эскизов квантилей (None, если эскизов нет)."""
+        return next(iter(self.sketches.values())).alpha if self.sketches else None
+
+    @classmethod
+    def build(cls, data, dimensions=DIMENSIONS, bin_edges=BIN_EDGES, sketch_alpha=None):
+        """Строит куб за один проход по data.
+
+        sketch_alpha - относительная ошибка эскизов квантилей (например,
+        0.01), EXACT - точные квантили; None - квантили только по гистограммам.
+        """
+        dimensions = [dim for dim in dimensions if dim in data]
+        measures = [m for m in bin_edges if m in data]
+
+        codes, levels = [], []
+        for dim in dimensions:
+            code, uniques = pd.factorize(data[dim], use_na_sentinel=False)
+            codes.append(code)
+            levels.append(uniques)
+        if codes:
+            flat = np.ravel_multi_index(codes, [max(len(u), 1) for u in levels])
+            keys, cell = np.unique(flat, return_inverse=True)
+            key_codes = np.unravel_index(keys, [max(len(u), 1) for u in levels])
+        else:
+            keys, cell, key_codes = np.zeros(1), np.zeros(len(data), dtype=np.int64), []
+        n_cells = len(keys)
+
+        cells = pd.DataFrame(index=pd.RangeIndex(n_cells))
+        for dim, uniques, code in zip(dimensions, levels, key_codes):
+            # измерения сохраняют тип исходного столбца (в т.ч. категориальный)
+            cells[dim] = pd.Series(uniques).take(code).reset_index(drop=True)
+        cells['n'] = np.bincount(cell, minlength=n_cells)
+
+        hist, sketches = {}, {}
+        for measure in measures:
+            values = pd.to_numeric(data[measure]).to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            x = values[valid]
+            c = cell[valid]
+            cells[f'{measure}_count'] = np.bincount(c, minlength=n_cells)
+            cells[f'{measure}_sum'] = np.bincount(c, weights=x, minlength=n_cells)
+            cells[f'{measure}_sumsq'] = np.bincount(c, weights=x * x, minlength=n_cells)
+
+            edges = bin_edges[measure]
+            n_bins = len(edges) - 1
+            bins = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, n_bins - 1)
+            hist[measure] = np.bincount(
+                c * n_bins + bins, minlength=n_cells * n_bins
+            ).reshape(n_cells, n_bins)
+            if sketch_alpha is not None:
+                sketches[measure] = QuantileSketches.from_values(c, x, sketch_alpha)
+
+        return cls(cells, hist, dimensions, bin_edges, sketches)
+
+    @property
+    def measures(self):
+        return list(self.hist)
+
+    def _mask(self, where):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, value in (where or {}).items():
+            column = self.cells[dim]
+            if isinstance(value, (list, tuple, set)):
+                mask &= column.isin(list(value)).to_numpy()
+            else:
+                mask &= (column == value).fillna(False).to_numpy(dtype=bool)
+        return mask
+
+    def aggregate(self, by=(), stats=('count',), where=None, sort=False):
+        """Срез куба: группировка по by с фильтром where и статистиками stats.
+
+        by - измерение или список измерений; where - словарь измерение ->
+        значение (или список значений). Статистики: count и для числовых
+        столбцов {measure}_count, _sum, _mean, _std, _median, _pNN
+        (например, seats_median, middle_avg_bill_p90). sort=True - строки в
+        порядке ключей by, как у groupby; иначе в порядке первого появления.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        mask = self._mask(where)
+        cells = self.cells[mask]
+        if by:
+            group = cells.groupby(by, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+            # drop_duplicates сохраняет порядок первого появления, как и ngroup(sort=False)
+            keys = cells[by].drop_duplicates().reset_index(drop=True)
+        else:
+            group = np.zeros(len(cells), dtype=np.int64)
+            keys = pd.DataFrame(index=[0])
+        n_groups = len(keys)
+
+        def total(column):
+            return np.bincount(group, weights=cells[column].to_numpy(dtype=np.float64), minlength=n_groups)
+
+        result = keys.copy()
+        for stat in stats:
+            if stat == 'count':
+                result[stat] = total('n').astype(np.int64)
+                continue
+            quantile = _QUANTILE_RE.match(stat)
+            if quantile and quantile['measure'] in self.hist:
+                measure = quantile['measure']
+                q = 0.5 if quantile['median'] else int(quantile['p']) / 100
+                if measure in self.sketches:
+                    cell_group = np.full(len(self.cells), -1, dtype=np.int64)
+                    cell_group[mask] = group
+                    result[stat] = self.sketches[measure].quantile(cell_group, n_groups, q)
+                    continue
+                hist = np.zeros((n_groups, self.hist[measure].shape[1]), dtype=np.int64)
+                np.add.at(hist, group, self.hist[measure][mask])
+                centers = _bin_centers(self.bin_edges[measure])
+                result[stat] = _hist_quantile(hist, centers, q)
+                continue
+
+            measure, _, kind = stat.rpartition('_')
+            if measure not in self.hist:
+                raise KeyError(f'неизвестная статистика: {stat}')
+            count = total(f'{measure}_count')
+            s = total(f'{measure}_sum')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if kind == 'count':
+                    result[stat] = count.astype(np.int64)
+                elif kind == 'sum':
+                    result[stat] = s
+                elif kind == 'mean':
+                    result[stat] = np.where(count > 0, s / count, np.nan)
+                elif kind == 'std':
+                    sumsq = total(f'{measure}_sumsq')
+                    var = (sumsq - s * s / count) / (count - 1)
+                    result[stat] = np.where(count > 1, np.sqrt(np.maximum(var, 0)), np.nan)
+                else:
+                    raise KeyError(f'неизвестная статистика: {stat}')
+        if sort and by:
+            result = result.sort_values(by, ignore_index=True, kind='stable')
+        return result
+
+    def merge(self, other, sign=1):
+        """Возвращает куб, равный сумме кубов (sign=-1 - разности).
+
+        Все агрегаты куба аддитивны, поэтому куб можно собирать из кубов
+        по частям данных и вычитать из него куб удалённых строк.
+        """
+        if sorted(self.dimensions) != sorted(other.dimensions):
+            raise ValueError('у кубов разные измерения')
+        if self.sketch_alpha != other.sketch_alpha:
+            raise ValueError('у кубов разные эскизы квантилей')
+        values = [c for c in self.cells.columns if c not in self.dimensions]
+        right = other.cells[self.dimensions + values].copy()
+        right[values] = right[values] * sign
+        cells = pd.concat([self.cells, right], ignore_index=True)
+        if self.dimensions:
+            group = cells.groupby(
+                self.dimensions, dropna=False, observed=True, sort=False
+            ).ngroup().to_numpy()
+        else:
+            group = np.zeros(len(cells), dtype=np.int64)
+        n_groups = int(group.max()) + 1 if len(group) else 0
+
+        merged = cells[self.dimensions].drop_duplicates().reset_index(drop=True)
+        for column in values:
+            merged[column] = np.bincount(
+                group, weights=cells[column].to_numpy(dtype=np.float64), minlength=n_groups
+            ).astype(self.cells[column].dtype)
+
+        hist = {}
+        for measure in self.hist:
+            stacked = np.concatenate([self.hist[measure], other.hist[measure] * sign])
+            hist[measure] = np.zeros((n_groups, stacked.shape[1]), dtype=np.int64)
+            np.add.at(hist[measure], group, stacked)
+
+        n_self = len(self.cells)
+        sketches = {
+            measure: sketch.merge(other.sketches[measure], sign, group[:n_self], group[n_self:])
+            for measure, sketch in self.sketches.items()
+        }
+
+        # ячейки, из которых удалены все строки, больше не нужны
+        keep = merged['n'].to_numpy() != 0
+        merged = merged[keep].reset_index(drop=True)
+        hist = {measure: h[keep] for measure, h in hist.items()}
+        sketches = {measure: sketch.take(keep) for measure, sketch in sketches.items()}
+        return PlacesCube(merged, hist, self.dimensions, self.bin_edges, sketches)
+
+
+def report_tables(cube):
+    """Таблицы скрипта Fast food.py, посчитанные срезами куба.
+
+    Медианы совпадают с pandas, только если куб построен с
+    sketch_alpha=EXACT; иначе они приближённые (по эскизам или гистограммам).
+    """
+    coffee = {'category': 'кофейня'}
+    tables = {}
+
+    tables['data_cat'] = (
+        cube.aggregate('category', sort=True)
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+    tables['seats_med'] = (
+        cube.aggregate('category', ['seats_median'], sort=True)
+        .rename(columns={'seats_median': 'median'})
+        .sort_values('median', ascending=False, ignore_index=True)
+    )
+    tables['data_chain'] = cube.aggregate('chain', sort=True)
+    tables['chain_rest_cat'] = (
+        cube.aggregate('category', where={'chain': 1}, sort=True)
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+
+    chain_rest_all = tables['chain_rest_cat'].merge(tables['data_cat'], on='category')
+    chain_rest_all.columns = ['category', 'count_chain', 'count_all']
+    chain_rest_all['ratio'] = (chain_rest_all['count_chain'] / chain_rest_all['count_all'] * 100).round(2)
+    tables['chain_rest_all'] = chain_rest_all.sort_values('ratio', ascending=False, ignore_index=True)
+
+    tables['data_dist'] = (
+        cube.aggregate(['district', 'category'], sort=True)
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+    tables['rating_mean'] = (
+        cube.aggregate('category', ['rating_mean'], sort=True)
+        .round(2).sort_values('rating_mean', ascending=False, ignore_index=True)
+    )
+    tables['distr_rating_mean'] = (
+        cube.aggregate('district', ['rating_mean'], sort=True)
+        .round(2).sort_values('rating_mean', ascending=False, ignore_index=True)
+    )
+    tables['avg_bill'] = (
+        cube.aggregate('district', ['middle_avg_bill_median'], sort=True)
+        .rename(columns={'middle_avg_bill_median': 'median'})
+        .sort_values('median', ascending=False, ignore_index=True)
+    )
+    tables['data_is_24'] = cube.aggregate(['category', 'is_24/7'], sort=True)
+    tables['price_cat'] = (
+        cube.aggregate('price', sort=True).dropna(subset=['price'])
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+    tables['data_dist_price'] = (
+        cube.aggregate(['district', 'price'], sort=True).dropna(subset=['price'])
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+
+    tables['coffe_distr_data'] = (
+        cube.aggregate('district', where=coffee, sort=True)
+        .sort_values('count', ascending=False, ignore_index=True)
+    )
+    tables['coffe_is_24'] = cube.aggregate(['category', 'is_24/7'], where=coffee, sort=True)
+    tables['coffe_dist_rating'] = (
+        cube.aggregate('district', ['rating_mean'], where=coffee, sort=True)
+        .round(2).sort_values('rating_mean', ascending=False, ignore_index=True)
+    )
+    tables['avg_bill_coffe'] = (
+        cube.aggregate('district', ['middle_coffee_cup_mean'], where=coffee, sort=True)
+        .rename(columns={'middle_coffee_cup_mean': 'mean'})
+        .sort_values('mean', ascending=False, ignore_index=True).round(2)
+    )
+    tables['median_bill_coffe'] = (
+        cube.aggregate('district', ['middle_coffee_cup_median'], where=coffee, sort=True)
+        .rename(columns={'middle_coffee_cup_median': 'median'})
+        .sort_values('median', ascending=False, ignore_index=True).round(2)
+    )
+    return tables
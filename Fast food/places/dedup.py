@@ -0,0 +1,259 @@
+# coding: utf-8
+"""Поиск сетей и дубликатов заведений по похожим названиям.
+
+Флаг chain в датасете ненадёжен для небольших сетей, а варианты
+написания («Кофемания», «КОФЕ МАНИЯ», «Кофемания!») разбивают одну сеть
+на несколько. Сравнение всех пар названий невозможно на больших данных,
+поэтому используется блокировка:
+
+ - названия приводятся к ключу (верхний регистр, Е вместо Ё, только буквы
+   и цифры), номер в конце («Столовая № 5», «Кафе Уют 12») отбрасывается,
+   и дальше обрабатываются только уникальные ключи;
+ - кандидаты в пары - ключи с общим словом (от 3 символов) или общим
+   началом; слишком частые слова (больше max_block ключей) не используются;
+ - внутри блока похожесть считается по коэффициенту Дайса для множеств
+   символьных триграмм (векторно, по всем парам кандидатов сразу);
+ - сеть - кластер с представителем: самый частый ключ становится
+   представителем, и к нему присоединяются только похожие на него ключи.
+   Цепочки «A похож на B, B похож на C» сети не объединяют.
+
+Сетью считается кластер, в котором есть отмеченные флагом chain
+заведения: флаг переносится на остальные заведения кластера, если их
+доля не меньше min_flag_share. Одно лишь повторение названия («Кафе Уют»
+в разных концах города) сетью не считается.
+
+Дубликаты - заведения одной сети, стоящие ближе radius метров друг к
+другу; пары ищутся сеточным индексом places.spatial.VenueIndex, который
+здесь играет роль геохеша.
+"""
+
+import numpy as np
+import pandas as pd
+
+from places.preprocessing import _map_unique
+from places.spatial import VenueIndex
+
+# названия-категории, которые не считаются сетью даже при большом кол-ве заведений
+GENERIC_NAMES = {
+    'КАФЕ', 'РЕСТОРАН', 'КОФЕЙНЯ', 'БАР', 'ПАБ', 'БАР ПАБ', 'ПИЦЦЕРИЯ', 'СТОЛОВАЯ',
+    'БУЛОЧНАЯ', 'ПЕКАРНЯ', 'БЫСТРОЕ ПИТАНИЕ', 'ШАУРМА', 'ХИНКАЛЬНАЯ', 'ЧАЙХАНА',
+    'КУЛИНАРИЯ', 'СУШИ', 'ПИВНОЙ БАР',
+}
+
+# длина общего начала ключа для блокировки
+PREFIX_LENGTH = 4
+
+# сколько пар кандидатов сравнивать за один шаг
+_PAIR_CHUNK = 1_000_000
+
+
+def name_keys(names):
+    """Ключи названий: верхний регистр, Е вместо Ё, слова из букв и цифр через пробел."""
+    return _map_unique(
+        names,
+        lambda s: (s.str.upper().str.replace('Ё', 'Е')
+                   .str.replace(r'[^0-9A-ZА-Я]+', ' ', regex=True).str.strip()),
+    )
+
+
+def base_keys(keys):
+    """Ключи без номера в конце («СТОЛОВАЯ 5», «КАФЕ УЮТ N 12» -> без номера)."""
+    def strip(s):
+        stripped = s.str.replace(r'(?:\s+(?:N|НО)?\s*\d+)+$', '', regex=True)
+        # название из одного номера оставляем как есть
+        return stripped.where(stripped != '', s)
+
+    return _map_unique(keys, strip)
+
+
+def _trigrams(key):
+    compact = '^' + key.replace(' ', '') + '$'
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def _gram_table(keys):
+    """Триграммы ключей в CSR-раскладке: offsets, отсортированные коды триграмм."""
+    grams = [sorted(_trigrams(key)) for key in keys]
+    lengths = np.array([len(key_grams) for key_grams in grams], dtype=np.int64)
+    codes, _ = pd.factorize(pd.Series([gram for key_grams in grams for gram in key_grams],
+                                      dtype=object))
+    offsets = np.r_[0, np.cumsum(lengths)]
+    return offsets, codes.astype(np.int64)
+
+
+def _blocks(keys, max_block):
+    """Блоки кандидатов: слово или начало ключа -> номера ключей."""
+    blocks = {}
+    for i, key in enumerate(keys):
+        block_keys = {word for word in key.split() if len(word) >= 3}
+        block_keys.add('#' + key.replace(' ', '')[:PREFIX_LENGTH])
+        for block_key in block_keys:
+            blocks.setdefault(block_key, []).append(i)
+    return [members for members in blocks.values() if 1 < len(members) <= max_block]
+
+
+def _ranges(starts, lengths):
+    """Склеенные диапазоны [start, start + length) для каждой пары (start, length)."""
+    total = int(lengths.sum())
+    shift = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+    return shift + np.arange(total)
+
+
+def candidate_pairs(keys, max_block=500):
+    """Уникальные пары номеров ключей (i < j) с общим блоком."""
+    blocks = _blocks(keys, max_block)
+    if not blocks:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    members = np.concatenate([np.asarray(block, dtype=np.int64) for block in blocks])
+    sizes = np.array([len(block) for block in blocks], dtype=np.int64)
+    # для элемента на месте p блока [start, stop) пары - с элементами p+1..stop-1
+    stops = np.repeat(np.cumsum(sizes), sizes)
+    position = np.arange(len(members))
+    counts = stops - position - 1
+    first = np.repeat(position, counts)
+    second = _ranges(position + 1, counts)
+    left, right = members[first], members[second]
+    low, high = np.minimum(left, right), np.maximum(left, right)
+    pairs = np.unique(low * len(keys) + high)
+    return pairs // len(keys), pairs % len(keys)
+
+
+def similar_pairs(keys, threshold=0.8, max_block=500):
+    """Пары номеров похожих ключей (коэффициент Дайса по триграммам >= threshold)."""
+    left, right = candidate_pairs(keys, max_block)
+    offsets, grams = _gram_table(keys)
+    lengths = np.diff(offsets)
+    n_grams = int(grams.max()) + 1 if len(grams) else 1
+    # множество пар (ключ, триграмма), отсортированное для поиска
+    entries = np.repeat(np.arange(len(keys), dtype=np.int64), lengths) * n_grams + grams
+    entries.sort()
+
+    keep = np.zeros(len(left), dtype=bool)
+    for start in range(0, len(left), _PAIR_CHUNK):
+        i, j = left[start:start + _PAIR_CHUNK], right[start:start + _PAIR_CHUNK]
+        # каждая триграмма ключа i ищется среди триграмм ключа j
+        pair = np.repeat(np.arange(len(i)), lengths[i])
+        probe = j[pair] * n_grams + grams[_ranges(offsets[i], lengths[i])]
+        found = np.minimum(np.searchsorted(entries, probe), len(entries) - 1)
+        common = np.bincount(pair, weights=entries[found] == probe, minlength=len(i))
+        keep[start:start + _PAIR_CHUNK] = 2 * common >= threshold * (lengths[i] + lengths[j])
+    return left[keep], right[keep]
+
+
+def representative_clusters(n, left, right, order):
+    """Кластеры с представителем для n вершин и рёбер (left, right).
+
+    Вершины обходятся в порядке order (например, по убыванию частоты);
+    ещё не попавшая в кластер вершина становится представителем, и к ней
+    присоединяются все свободные соседи. Каждая вершина кластера похожа на
+    представителя. Возвращает номер представителя для каждой вершины.
+    """
+    source = np.r_[left, right]
+    target = np.r_[right, left]
+    sort = np.argsort(source, kind='stable')
+    target = target[sort]
+    offsets = np.r_[0, np.cumsum(np.bincount(source, minlength=n))]
+    labels = np.full(n, -1, dtype=np.int64)
+    for vertex in order:
+        if labels[vertex] >= 0:
+            continue
+        labels[vertex] = vertex
+        neighbours = target[offsets[vertex]:offsets[vertex + 1]]
+        labels[neighbours[labels[neighbours] < 0]] = vertex
+    return labels
+
+
+def connected_components(n, left, right):
+    """Номер компоненты связности (минимальный номер вершины) для n вершин."""
+    labels = np.arange(n)
+    while True:
+        merged = np.minimum(labels[left], labels[right])
+        previous = labels.copy()
+        np.minimum.at(labels, left, merged)
+        np.minimum.at(labels, right, merged)
+        # сжатие путей
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def infer_chains(data, threshold=0.8, radius=50.0, min_chain=2, max_block=500,
+                 min_flag_share=0.5):
+    """Сети и дубликаты заведений.
+
+    Возвращает таблицу с индексом data и столбцами:
+     - name_key - ключ названия;
+     - chain_id, chain_name - номер сети и самое частое название в ней;
+     - chain_size - кол-во разных заведений сети (дубликаты считаются одним);
+     - inferred_chain - исходный флаг chain или сеть от min_chain заведений
+       с неуниверсальным названием, в которой доля отмеченных флагом chain
+       заведений не меньше min_flag_share (0 - любое повторение названия);
+     - duplicate_id - номер группы дубликатов (одинаковый у записей одного заведения).
+    """
+    keys = name_keys(data['name'])
+    # коды по алфавиту: при равной частоте представителем становится первый ключ
+    key_codes, unique_keys = pd.factorize(base_keys(keys), sort=True)
+    unique_keys = list(unique_keys)
+    frequency = np.bincount(key_codes[key_codes >= 0], minlength=len(unique_keys))
+
+    # сети - кластеры похожих уникальных ключей вокруг самых частых
+    left, right = similar_pairs(unique_keys, threshold, max_block)
+    order = np.lexsort((np.arange(len(unique_keys)), -frequency))
+    key_chain = representative_clusters(len(unique_keys), left, right, order)
+    chain_id = np.where(key_codes >= 0, key_chain[key_codes], -1)
+
+    # дубликаты - заведения одной сети в радиусе radius
+    n = len(data)
+    lat = data['lat'].to_numpy(dtype=np.float64)
+    lng = data['lng'].to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lng) & (chain_id >= 0))
+    index = VenueIndex(lat[valid], lng[valid])
+    offsets, neighbours, _ = index.within_radius(lat[valid], lng[valid], radius)
+    query = np.repeat(np.arange(len(valid)), np.diff(offsets))
+    query, neighbours = valid[query], valid[neighbours]
+    same = (query < neighbours) & (chain_id[query] == chain_id[neighbours])
+    duplicate_id = connected_components(n, query[same], neighbours[same])
+
+    # размер сети - кол-во разных групп дубликатов
+    pairs = np.unique(np.stack([chain_id, duplicate_id])[:, chain_id >= 0], axis=1)
+    sizes = np.bincount(pairs[0], minlength=len(unique_keys))
+    chain_size = np.where(chain_id >= 0, sizes[np.maximum(chain_id, 0)], 0)
+
+    # название сети - самое частое название среди её заведений
+    named = pd.DataFrame({'chain': chain_id, 'name': data['name'].to_numpy()})[chain_id >= 0]
+    top_names = named.value_counts().reset_index().drop_duplicates('chain')
+    chain_name = top_names.set_index('chain')['name'].reindex(chain_id).to_numpy()
+
+    # сеть универсальная, если в ней есть название-категория
+    generic_key = pd.Series(unique_keys, dtype=object).isin(GENERIC_NAMES).to_numpy()
+    generic_chain = np.zeros(len(unique_keys), dtype=bool)
+    np.logical_or.at(generic_chain, key_chain, generic_key)
+    generic = np.where(chain_id >= 0, generic_chain[np.maximum(chain_id, 0)], True)
+    # доля отмеченных флагом заведений сети
+    flagged = data['chain'].to_numpy() == 1
+    rows = chain_id >= 0
+    total = np.bincount(chain_id[rows], minlength=len(unique_keys))
+    flagged_total = np.bincount(chain_id[rows], weights=flagged[rows], minlength=len(unique_keys))
+    share = flagged_total / np.maximum(total, 1)
+    flag_share = np.where(rows, share[np.maximum(chain_id, 0)], 0.0)
+    inferred = flagged | ((chain_size >= min_chain) & ~generic & (flag_share >= min_flag_share))
+
+    return pd.DataFrame({
+        'name_key': keys.to_numpy(),
+        'chain_id': chain_id,
+        'chain_name': chain_name,
+        'chain_size': chain_size,
+        'inferred_chain': inferred.astype(np.int8),
+        'duplicate_id': duplicate_id,
+    }, index=data.index)
+
+
+def fix_chain_flag(data, chains=None):
+    """Копия data с флагом chain, заменённым на inferred_chain.
+
+    chains - результат infer_chains(data) (None - считается здесь).
+    """
+    if chains is None:
+        chains = infer_chains(data)
+    return data.assign(chain=chains['inferred_chain'].to_numpy().astype(data['chain'].dtype))
@@ -0,0 +1,222 @@
+# coding: utf-8
+"""Границы административных округов и привязка заведений к округам.
+
+GeoJSON с границами скачивается (или берётся из локального файла) один раз
+и сохраняется в каталоге кеша. Разобранная геометрия - рёбра всех колец
+каждого округа и их ограничивающие прямоугольники - хранится рядом в
+бинарном .npz, поэтому при повторных запусках JSON не разбирается.
+
+Точки относятся к округам векторно: сначала отбрасываются точки вне
+прямоугольника округа, затем для оставшихся считается чётность пересечений
+луча с рёбрами (правило even-odd, дырки в полигонах учитываются).
+"""
+
+import hashlib
+import json
+import os
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+# JSON-файл с границами округов Москвы
+STATE_GEO = 'https://code.s3.yandex.net/data-analyst/admin_level_geomap.geojson'
+
+# кеш рядом со скриптом анализа, как и у places.loader
+DEFAULT_CACHE_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '.cache')
+)
+
+# таймаут скачивания GeoJSON, секунд (на соединение и на каждое чтение)
+DOWNLOAD_TIMEOUT = 30
+
+# сколько пар «точка-ребро» обрабатывать за один шаг
+_CHUNK = 4_000_000
+
+
+def _cache_name(source, suffix):
+    digest = hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f'{stem}-{digest}{suffix}'
+
+
+def cached_geojson(source=STATE_GEO, cache_dir=None):
+    """Возвращает путь к локальной копии GeoJSON, при необходимости скачивая его.
+
+    Путь можно передавать в geo_data конструктора Choropleth вместо URL.
+    Если сервер не отвечает дольше DOWNLOAD_TIMEOUT секунд или скачивание
+    прервалось, поднимается OSError с адресом источника.
+    """
+    if not source.startswith(('http://', 'https://')):
+        return source
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    path = os.path.join(cache_dir, _cache_name(source, '.geojson'))
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with urllib.request.urlopen(source, timeout=DOWNLOAD_TIMEOUT) as response, \
+                    open(tmp, 'wb') as f:
+                f.write(response.read())
+        except OSError as error:
+            # недокачанный файл не должен остаться в кеше
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise OSError(f'не удалось скачать границы округов {source}: {error}') from error
+        os.replace(tmp, path)
+    return path
+
+
+def _feature_name(feature, key):
+    if key in feature:
+        return feature[key]
+    return feature.get('properties', {}).get(key)
+
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+class DistrictBoundaries:
+    """Рёбра границ округов в виде плоских массивов NumPy.
+
+    Рёбра округа i - строки edges[offsets[i]:offsets[i + 1]] со столбцами
+    (lng1, lat1, lng2, lat2); bbox[i] - (min_lng, min_lat, max_lng, max_lat).
+    """
+
+    def __init__(self, names, edges, offsets, bbox):
+        self.names = np.asarray(names, dtype=object)
+        self.edges = edges
+        self.offsets = offsets
+        self.bbox = bbox
+
+    @classmethod
+    def from_geojson(cls, geojson, key='name'):
+        """Строит границы из разобранного GeoJSON (dict)."""
+        names, edges, offsets, bbox = [], [], [0], []
+        for feature in geojson['features']:
+            rings = [
+                np.asarray(ring, dtype=np.float64)[:, :2]
+                for polygon in _polygons(feature['geometry'])
+                for ring in polygon
+            ]
+            if not rings:
+                continue
+            feature_edges = np.concatenate([
+                np.hstack([ring[:-1], ring[1:]]) for ring in rings
+            ])
+            points = np.concatenate(rings)
+            names.append(_feature_name(feature, key))
+            edges.append(feature_edges)
+            offsets.append(offsets[-1] + len(feature_edges))
+            bbox.append([*points.min(axis=0), *points.max(axis=0)])
+        return cls(
+            names,
+            np.concatenate(edges) if edges else np.empty((0, 4)),
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(bbox, dtype=np.float64).reshape(-1, 4),
+        )
+
+    @classmethod
+    def load(cls, source=STATE_GEO, cache_dir=None, key='name'):
+        """Загружает границы из кеша .npz или разбирает GeoJSON и кеширует его."""
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        path = cached_geojson(source, cache_dir)
+        with open(path, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+        binary = os.path.join(cache_dir, f'districts-{key}-{digest}.npz')
+        if os.path.exists(binary):
+            return cls.load_npz(binary)
+
+        with open(path, encoding='utf-8') as f:
+            boundaries = cls.from_geojson(json.load(f), key=key)
+        os.makedirs(cache_dir, exist_ok=True)
+        boundaries.save_npz(binary)
+        return boundaries
+
+    def save_npz(self, path):
+        np.savez(
+            path,
+            names=self.names.astype(str),
+            edges=self.edges,
+            offsets=self.offsets,
+            bbox=self.bbox,
+        )
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path) as f:
+            return cls(f['names'].tolist(), f['edges'], f['offsets'], f['bbox'])
+
+    def take(self, indices):
+        """Границы только округов indices (в том же порядке)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = self.offsets[indices + 1] - self.offsets[indices]
+        rows = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in indices
+        ]) if len(indices) else np.empty(0, dtype=np.int64)
+        return DistrictBoundaries(
+            self.names[indices], self.edges[rows],
+            np.r_[0, np.cumsum(counts)].astype(np.int64), self.bbox[indices],
+        )
+
+    def _contains(self, i, lng, lat):
+        """Булев массив: лежат ли точки внутри округа i."""
+        edges = self.edges[self.offsets[i]:self.offsets[i + 1]]
+        x1, y1, x2, y2 = (edges[:, j] for j in range(4))
+        inside = np.zeros(len(lng), dtype=bool)
+        step = max(1, _CHUNK // max(len(edges), 1))
+        for start in range(0, len(lng), step):
+            px = lng[start:start + step, None]
+            py = lat[start:start + step, None]
+            # ребро пересекает горизонтальный луч вправо от точки
+            spans = (y1 > py) != (y2 > py)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cross_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            crossings = spans & (px < cross_x)
+            inside[start:start + step] = crossings.sum(axis=1) % 2 == 1
+        return inside
+
+    def assign(self, lat, lng):
+        """Название округа для каждой точки (None - вне всех округов)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        result = np.full(len(lat), None, dtype=object)
+        pending = np.isfinite(lat) & np.isfinite(lng)
+        for i, (min_lng, min_lat, max_lng, max_lat) in enumerate(self.bbox):
+            candidates = np.flatnonzero(
+                pending
+                & (lng >= min_lng) & (lng <= max_lng)
+                & (lat >= min_lat) & (lat <= max_lat)
+            )
+            if not len(candidates):
+                continue
+            hit = candidates[self._contains(i, lng[candidates], lat[candidates])]
+            result[hit] = self.names[i]
+            pending[hit] = False
+        return result
+
+
+def assign_districts(data, boundaries=None):
+    """Округ по координатам для каждой строки датафрейма (Series с индексом data)."""
+    if boundaries is None:
+        boundaries = DistrictBoundaries.load()
+    return pd.Series(
+        boundaries.assign(data['lat'], data['lng']), index=data.index, name='district'
+    )
+
+
+def fill_districts(data, boundaries=None):
+    """Заполняет пропуски в district по координатам.
+
+    Возвращает (district, mismatch): заполненный столбец и маску строк, где
+    указанный в данных округ не совпадает с найденным по координатам.
+    """
+    located = assign_districts(data, boundaries)
+    district = data['district']
+    mismatch = district.notna() & located.notna() & (district.astype(object) != located)
+    return district.astype(object).fillna(located), mismatch
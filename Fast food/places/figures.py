@@ -0,0 +1,290 @@
+# coding: utf-8
+"""Пакетный рендеринг графиков отчёта в файлы без интерактивного окружения.
+
+Каждый график описывается спецификацией FigureSpec: таблица данных, вид
+графика (bar, sunburst, pie - plotly; violin, strip - seaborn) и его
+параметры. report_figures собирает спецификации всех графиков скрипта,
+render_figures рендерит их в PNG/SVG/HTML в пуле процессов.
+
+Для каждого файла считается хеш таблицы данных, спецификации и формата;
+хеши хранятся в manifest.json каталога, и графики с неизменившимся
+хешем повторно не рендерятся. Манифест сохраняется и при ошибке
+рендеринга одного из графиков, поэтому готовые графики не рендерятся
+при следующем запуске заново.
+
+PNG и SVG для графиков plotly требуют пакет kaleido. Графики seaborn
+рисуются с бэкендом Agg, HTML для них - страница со встроенным SVG.
+
+Запуск из каталога «Fast food»:
+
+    python -m places.figures moscow_places.csv --out figures --format png html
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from places.analysis import analysis_tables
+from places.loader import load_places
+from places.preprocessing import preprocess
+
+# name - имя файла без расширения, kind - вид графика, data - таблица,
+# params - аргументы построения, layout - оформление (заголовок, подписи осей)
+FigureSpec = namedtuple('FigureSpec', ['name', 'kind', 'data', 'params', 'layout'],
+                        defaults=({}, {}))
+
+PLOTLY_KINDS = ('bar', 'sunburst', 'pie')
+SEABORN_KINDS = ('violin', 'strip')
+FORMATS = ('png', 'svg', 'html')
+
+MANIFEST = 'manifest.json'
+
+
+def spec_digest(spec, fmt):
+    """Хеш таблицы данных, параметров графика и формата файла."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(spec.data, index=False).to_numpy().tobytes())
+    digest.update(repr((list(spec.data.columns), spec.kind, sorted(spec.params.items()),
+                        sorted(spec.layout.items()), fmt)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _plotly_figure(spec):
+    import plotly.express as px
+    from plotly import graph_objects as go
+
+    params = dict(spec.params)
+    if spec.kind == 'pie':
+        fig = go.Figure(data=[go.Pie(
+            labels=spec.data[params.pop('labels')],
+            values=spec.data[params.pop('values')],
+            **params,
+        )])
+    else:
+        fig = getattr(px, spec.kind)(spec.data, **params)
+    fig.update_layout(**spec.layout)
+    return fig
+
+
+def _seaborn_figure(spec):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    layout = dict(spec.layout)
+    fig, ax = plt.subplots(figsize=layout.pop('figsize', (15, 10)))
+    plot = sns.violinplot if spec.kind == 'violin' else sns.stripplot
+    plot(data=spec.data, ax=ax, **spec.params)
+    ax.set_xlabel(layout.pop('xlabel', ''), fontsize=15)
+    ax.set_ylabel(layout.pop('ylabel', ''), fontsize=15)
+    ax.set_title(layout.pop('title', ''), fontsize=15)
+    return fig
+
+
+def build_figure(spec):
+    """Строит график по спецификации: plotly Figure или matplotlib Figure."""
+    if spec.kind in PLOTLY_KINDS:
+        return _plotly_figure(spec)
+    if spec.kind in SEABORN_KINDS:
+        return _seaborn_figure(spec)
+    raise ValueError(f'неизвестный вид графика: {spec.kind}')
+
+
+def _render(out_dir, spec, formats):
+    fig = build_figure(spec)
+    paths = {fmt: os.path.join(out_dir, f'{spec.name}.{fmt}') for fmt in formats}
+    if spec.kind in PLOTLY_KINDS:
+        for fmt, path in paths.items():
+            if fmt == 'html':
+                fig.write_html(path, include_plotlyjs='cdn')
+            else:
+                fig.write_image(path, format=fmt)
+        return spec.name
+
+    import matplotlib.pyplot as plt
+    for fmt, path in paths.items():
+        if fmt == 'html':
+            svg = io.StringIO()
+            fig.savefig(svg, format='svg', bbox_inches='tight')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                        f'<title>{spec.name}</title></head><body>{svg.getvalue()}</body></html>\n')
+        else:
+            fig.savefig(path, format=fmt, bbox_inches='tight')
+    plt.close(fig)
+    return spec.name
+
+
+def _load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_manifest(out_dir, manifest):
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, sort_keys=True, indent=1)
+
+
+def render_figures(specs, out_dir, formats=('png',), workers=None):
+    """Рендерит графики в out_dir, пропуская файлы с неизменившимся хешем.
+
+    Возвращает словарь с кол-вом отрендеренных и пропущенных файлов.
+    Ошибка рендеринга графика не прерывает остальные: она поднимается после
+    того, как манифест сохранён с хешами всех готовых графиков.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f'неподдерживаемые форматы: {sorted(unknown)}')
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+
+    pending, digests = [], {}
+    for spec in specs:
+        stale = []
+        for fmt in formats:
+            key = f'{spec.name}.{fmt}'
+            digests[key] = spec_digest(spec, fmt)
+            if manifest.get(key) != digests[key] or not os.path.exists(os.path.join(out_dir, key)):
+                stale.append(fmt)
+        if stale:
+            pending.append((spec, stale))
+
+    errors = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_render, out_dir, spec, stale): (spec, stale)
+                       for spec, stale in pending}
+            for future in as_completed(futures):
+                spec, stale = futures[future]
+                try:
+                    future.result()
+                except Exception as error:
+                    errors.append(error)
+                    continue
+                manifest.update({f'{spec.name}.{fmt}': digests[f'{spec.name}.{fmt}']
+                                 for fmt in stale})
+    finally:
+        _save_manifest(out_dir, manifest)
+    if errors:
+        raise errors[0]
+
+    rendered = sum(len(stale) for _, stale in pending)
+    return {'rendered': rendered, 'skipped': len(digests) - rendered}
+
+
+def _bar(name, data, x, y, title, xaxis_title, yaxis_title, color=None, **layout):
+    params = {'x': x, 'y': y, 'text': y}
+    if color is not None:
+        params['color'] = color
+    layout = {'title': title, 'xaxis_title': xaxis_title, 'yaxis_title': yaxis_title,
+              'xaxis_tickangle': 45, **layout}
+    return FigureSpec(name, 'bar', data, params, layout)
+
+
+def report_figures(data, tables):
+    """Спецификации всех графиков скрипта.
+
+    data - предобработанная таблица заведений, tables - результат
+    places.analysis.analysis_tables.
+    """
+    category = 'Категория'
+    venues = 'Кол-во заведений'
+    districts = 'Округ'
+
+    data_chain = tables['data_chain'].copy()
+    data_chain['chain'] = data_chain['chain'].map({1: 'Сетевое', 0: 'Несетевое'})
+    is_24_labels = {True: 'Круглосуточно', False: 'Обычно'}
+    data_is_24 = tables['data_is_24'].copy()
+    data_is_24['is_24/7'] = data_is_24['is_24/7'].map(is_24_labels)
+    coffe_is_24 = tables['coffe_is_24'].copy()
+    coffe_is_24['is_24/7'] = coffe_is_24['is_24/7'].map(is_24_labels)
+
+    rest_top, rest_top_cat = tables['rest_top'], tables['rest_top_cat']
+    street_cat = tables['street_cat']
+
+    seats = data[['category', 'seats']].astype({'seats': 'float64'})
+    rating = data[['category', 'rating']]
+    pie = {'labels': None, 'values': 'count', 'pull': (0.1, 0)}
+
+    return [
+        _bar('category_count', tables['data_cat'], 'category', 'count',
+             'Заведения по категориям', category, venues),
+        FigureSpec('seats_violin', 'violin', seats,
+                   {'x': 'category', 'y': 'seats', 'palette': 'rainbow', 'hue': 'category',
+                    'legend': False},
+                   {'title': 'Кол-во посадочных мест по категориям',
+                    'xlabel': category, 'ylabel': 'Кол-во мест'}),
+        FigureSpec('seats_strip', 'strip', seats, {'x': 'category', 'y': 'seats'},
+                   {'title': 'Кол-во посадочных мест по категориям',
+                    'xlabel': category, 'ylabel': 'Кол-во мест'}),
+        _bar('seats_median', tables['seats_med'], 'category', 'median',
+             'Заведения по категориям', category, venues, yaxis_range=(40, 90)),
+        FigureSpec('chain_pie', 'pie', data_chain, {**pie, 'labels': 'chain'},
+                   {'title': 'Соотношение сетевых и несетевых заведений',
+                    'uniformtext_mode': 'hide'}),
+        _bar('chain_category_count', tables['chain_rest_cat'], 'category', 'count',
+             'Сетевые заведения по категориям', category, venues),
+        _bar('chain_category_ratio', tables['chain_rest_all'], 'category', 'ratio',
+             'Процент сетевых заведений по категориям', category, 'Процент сетевых заведений'),
+        _bar('chain_top_category', rest_top_cat, 'category', 'count',
+             'Топ 15 сетевых заведения по категориям', category, venues),
+        _bar('chain_top', rest_top, 'name', 'count',
+             'Топ 15 сетевых заведения по сетям', 'Сеть', venues),
+        FigureSpec('district_sunburst', 'sunburst', tables['data_dist'],
+                   {'path': ('district', 'category'), 'values': 'count'},
+                   {'title': 'Заведения по округам'}),
+        _bar('district_category', tables['data_dist'], 'district', 'count',
+             'Категории заведений по округам', districts, venues, color='category',
+             xaxis_categoryorder='total descending', width=1000, height=900),
+        _bar('category_rating', tables['rating_mean'], 'category', 'rating_mean',
+             'Рейтинг оценок по категориям', category, 'Средняя оценка', yaxis_range=(4, 4.5)),
+        FigureSpec('rating_violin', 'violin', rating,
+                   {'x': 'category', 'y': 'rating', 'palette': 'rainbow', 'hue': 'category',
+                    'legend': False},
+                   {'title': 'Оценки по категориям', 'xlabel': category, 'ylabel': 'Оценки'}),
+        FigureSpec('street_sunburst', 'sunburst', street_cat,
+                   {'path': ('street', 'category'), 'values': 'count_cat'},
+                   {'title': 'Заведения по улицам'}),
+        _bar('street_category', street_cat, 'street', 'count_cat',
+             'Категории заведений по топ 15 улицам', 'Улица', venues, color='category',
+             width=1000, height=1000),
+        FigureSpec('is_24_pie', 'pie', data_is_24, {**pie, 'labels': 'is_24/7'},
+                   {'title': 'Процент обычных и круглосуточных заведений'}),
+        FigureSpec('is_24_sunburst', 'sunburst', data_is_24,
+                   {'path': ('is_24/7', 'category'), 'values': 'count'},
+                   {'title': 'Категории обычных и круглосуточных заведений'}),
+        _bar('district_price', tables['data_dist_price'], 'district', 'count',
+             'Категории заведений по округам', districts, venues, color='price',
+             xaxis_categoryorder='total descending', width=1000, height=900),
+        FigureSpec('coffee_is_24_pie', 'pie', coffe_is_24, {**pie, 'labels': 'is_24/7'},
+                   {'title': 'Процент обычных и круглосуточных заведений'}),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Рендеринг графиков отчёта в файлы')
+    parser.add_argument('data', help='CSV-файл с заведениями')
+    parser.add_argument('--out', default='figures', help='каталог для графиков')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=FORMATS,
+                        help='форматы файлов')
+    parser.add_argument('--workers', type=int, default=None, help='кол-во процессов')
+    args = parser.parse_args(argv)
+
+    data = preprocess(load_places(args.data))
+    specs = report_figures(data, analysis_tables(data))
+    stats = render_figures(specs, args.out, args.format, args.workers)
+    print(f"отрендерено: {stats['rendered']}, без изменений: {stats['skipped']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# coding: utf-8
+"""Разбор строк часов работы (hours) в недельную битовую карту.
+
+Неделя делится на 7 дней по 48 получасовых слотов (336 бит). Битовая карта
+заведения хранится упакованной в 42 байта (np.packbits), поэтому для всего
+датасета получается массив uint8 размером (n, 42). Запросы вида «открыто
+в пятницу в 23:00» сводятся к битовым операциям над этим массивом.
+
+Примеры поддерживаемых строк:
+ - «ежедневно, круглосуточно»;
+ - «ежедневно, 10:00–22:00»;
+ - «пн-пт 09:00–18:00, перерыв 13:00–14:00; сб,вс 10:00–20:00»;
+ - «пн-чт 12:00–00:00; пт,сб 12:00–02:00; вс выходной».
+
+Интервалы, заканчивающиеся после полуночи, переносятся на следующий день
+(воскресенье переходит в понедельник). Строки, которые не удалось разобрать,
+дают пустую карту.
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DAYS = ['пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс']
+SLOTS_PER_DAY = 48
+SLOT_MINUTES = 24 * 60 // SLOTS_PER_DAY
+N_SLOTS = len(DAYS) * SLOTS_PER_DAY
+N_BYTES = N_SLOTS // 8
+
+_DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+_DAY_RE = re.compile(r'(пн|вт|ср|чт|пт|сб|вс)(?:\s*[-–—]\s*(пн|вт|ср|чт|пт|сб|вс))?')
+# элементы описания времени: интервал, «круглосуточно», «перерыв» и
+# «выходной»/«выходные» в конце предложения после списка дней («вс выходной»);
+# «по выходным», «без выходных» и «выходные 10:00–18:00» - это перечисления дней
+_TIME_TOKEN_RE = re.compile(
+    r'(?P<interval>(\d{1,2}):(\d{2})\s*[-–—]\s*(\d{1,2}):(\d{2}))'
+    r'|(?P<round>круглосуточно)'
+    r'|(?P<pause>перерыв)'
+    r'|(?P<off>(?<![а-яё])выходн(?:ой|ые)\s*$)'
+)
+
+# слова, заменяющие перечисление дней
+_DAY_WORDS = {
+    'ежедневно': range(7),
+    'без выходных': range(7),
+    'будни': range(5),
+    'по будням': range(5),
+    'выходные': range(5, 7),
+    'по выходным': range(5, 7),
+}
+
+
+def _parse_days(text):
+    """Возвращает множество индексов дней, перечисленных в text."""
+    days = set()
+    for word, indexes in _DAY_WORDS.items():
+        if word in text:
+            days.update(indexes)
+    for first, last in _DAY_RE.findall(text):
+        start = _DAY_INDEX[first]
+        stop = _DAY_INDEX[last] if last else start
+        # диапазон вида «пт-вс» или «сб-пн» (через конец недели)
+        span = (stop - start) % 7
+        days.update((start + i) % 7 for i in range(span + 1))
+    return days
+
+
+def _minutes(hours, minutes):
+    return int(hours) * 60 + int(minutes)
+
+
+def _set_interval(week, day, start, end, value):
+    """Выставляет value в слотах дня day с start по end минут.
+
+    Если end не больше start, интервал продолжается на следующий день.
+    """
+    if end <= start:
+        end += 24 * 60
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)
+    slots = (day * SLOTS_PER_DAY + np.arange(first, last)) % N_SLOTS
+    week[slots] = value
+
+
+def _parse_clause(clause, week):
+    """Разбирает одно предложение «дни время [, дни время ...]» и отмечает его в week.
+
+    Интервалы относятся к ближайшему перечислению дней перед ними, поэтому
+    «пн 10:00–12:00, вт 14:00–16:00» даёт по одному интервалу на день.
+    Интервалы после слова «перерыв» снимают отметку до следующего
+    перечисления дней.
+    """
+    days, pause, parsed = set(), False, False
+    position = 0
+    for token in _TIME_TOKEN_RE.finditer(clause):
+        listed = _parse_days(clause[position:token.start()])
+        position = token.end()
+        if listed:
+            days, pause = listed, False
+        if not days:
+            continue
+        if token['pause']:
+            pause = True
+        elif token['off']:
+            # карта изначально пустая, поэтому выходной день ничего не меняет
+            # (и не затирает ночные часы, перенесённые с предыдущего дня)
+            parsed = True
+        else:
+            start, end = (0, 0) if token['round'] else (
+                _minutes(token[2], token[3]), _minutes(token[4], token[5])
+            )
+            for day in days:
+                _set_interval(week, day, start, end, not pause)
+            parsed = True
+    return parsed
+
+
+@lru_cache(maxsize=65536)
+def parse_hours(text):
+    """Разбирает строку hours в упакованную карту (bytes длиной 42)."""
+    week = np.zeros(N_SLOTS, dtype=bool)
+    if isinstance(text, str):
+        for clause in text.lower().split(';'):
+            _parse_clause(clause.strip(), week)
+    return np.packbits(week).tobytes()
+
+
+def hours_bitmap(hours):
+    """Возвращает массив uint8 размером (len(hours), 42) с картами часов работы.
+
+    Каждая уникальная строка разбирается один раз.
+    """
+    codes, uniques = pd.factorize(pd.Series(hours))
+    table = np.zeros((len(uniques) + 1, N_BYTES), dtype=np.uint8)
+    for i, text in enumerate(uniques):
+        table[i] = np.frombuffer(parse_hours(text), dtype=np.uint8)
+    # код -1 (пропуск) указывает на последнюю, пустую строку таблицы
+    return table[codes]
+
+
+def slot_index(day, time):
+    """Номер получасового слота для дня (индекс или «пн».. «вс») и времени «ЧЧ:ММ»."""
+    if isinstance(day, str):
+        day = _DAY_INDEX[day.lower()]
+    hours, minutes = str(time).split(':')
+    return day * SLOTS_PER_DAY + _minutes(hours, minutes) // SLOT_MINUTES
+
+
+def week_mask(day, start, end):
+    """Упакованная маска слотов дня day с start по end (строки «ЧЧ:ММ»)."""
+    week = np.zeros(N_SLOTS, dtype=bool)
+    if isinstance(day, str):
+        day = _DAY_INDEX[day.lower()]
+    h1, m1 = start.split(':')
+    h2, m2 = end.split(':')
+    _set_interval(week, day, _minutes(h1, m1), _minutes(h2, m2), True)
+    return np.packbits(week)
+
+
+def open_at(bitmap, day, time):
+    """Булев массив: открыто ли заведение в день day во время time."""
+    slot = slot_index(day, time)
+    return ((bitmap[:, slot // 8] >> (7 - slot % 8)) & 1).astype(bool)
+
+
+def open_during(bitmap, mask, entirely=True):
+    """Булев массив: открыто ли заведение во всех (или хотя бы в одном) слотах mask."""
+    overlap = bitmap & mask
+    if entirely:
+        return (overlap == mask).all(axis=1)
+    return overlap.any(axis=1)
+
+
+def open_slots(bitmap):
+    """Кол-во открытых получасовых слотов в неделю для каждого заведения."""
+    return np.unpackbits(bitmap, axis=1).sum(axis=1)
@@ -0,0 +1,113 @@
+# coding: utf-8
+"""Инкрементальное обновление отчёта по ежедневным снимкам датасета.
+
+Новый снимок сравнивается с предыдущим по ключу заведения: хешу
+названия и адреса (для одинаковых пар добавляется порядковый номер).
+Для каждого ключа хранится хеш содержимого строки, что позволяет найти
+добавленные, удалённые и изменённые заведения, не храня предыдущий
+снимок целиком. Предобработка и куб агрегатов пересчитываются только
+для этих строк.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from places.cube import PlacesCube
+from places.preprocessing import preprocess
+
+KEY_COLUMNS = ['name', 'address']
+
+Diff = namedtuple('Diff', ['added', 'removed', 'changed'])
+
+
+def venue_keys(data, key_columns=KEY_COLUMNS):
+    """Стабильный ключ заведения (uint64) для каждой строки data."""
+    keys = pd.util.hash_pandas_object(data[key_columns], index=False)
+    # одинаковые название и адрес различаем порядковым номером
+    occurrence = keys.groupby(keys).cumcount().to_numpy(dtype=np.uint64)
+    combined = pd.util.hash_array(keys.to_numpy() ^ (occurrence * np.uint64(0x9E3779B97F4A7C15)))
+    return pd.Index(combined, name='key')
+
+
+def content_hashes(data, columns=None):
+    """Хеш содержимого каждой строки по столбцам columns (по умолчанию - всем)."""
+    columns = list(data.columns) if columns is None else columns
+    return pd.util.hash_pandas_object(data[columns], index=False).to_numpy()
+
+
+def diff_snapshots(old_hashes, new_data, key_columns=KEY_COLUMNS):
+    """Сравнивает снимок new_data с хешами предыдущего снимка.
+
+    old_hashes - Series «ключ -> хеш содержимого» предыдущего снимка.
+    Возвращает (diff, new_hashes): ключи добавленных, удалённых и
+    изменённых заведений и такой же Series для нового снимка.
+    """
+    new_hashes = pd.Series(content_hashes(new_data), index=venue_keys(new_data, key_columns))
+    common = new_hashes.index.intersection(old_hashes.index)
+    changed = common[new_hashes[common].to_numpy() != old_hashes[common].to_numpy()]
+    diff = Diff(
+        added=new_hashes.index.difference(old_hashes.index),
+        removed=old_hashes.index.difference(new_hashes.index),
+        changed=changed,
+    )
+    return diff, new_hashes
+
+
+class IncrementalReport:
+    """Предобработанный датасет и куб агрегатов с инкрементальным обновлением.
+
+    data - предобработанные строки, индексированные ключом заведения;
+    cube - куб агрегатов по data; hashes - хеши содержимого исходных строк.
+    """
+
+    def __init__(self, data, cube, hashes, key_columns=KEY_COLUMNS):
+        self.data = data
+        self.cube = cube
+        self.hashes = hashes
+        self.key_columns = list(key_columns)
+
+    @classmethod
+    def build(cls, raw, key_columns=KEY_COLUMNS, sketch_alpha=None):
+        """Полная сборка по снимку raw (исходные, не предобработанные данные).
+
+        sketch_alpha - точность эскизов квантилей куба (см. PlacesCube.build).
+        """
+        keys = venue_keys(raw, key_columns)
+        hashes = pd.Series(content_hashes(raw), index=keys)
+        data = preprocess(raw).set_axis(keys)
+        return cls(data, PlacesCube.build(data, sketch_alpha=sketch_alpha), hashes, key_columns)
+
+    def apply(self, raw):
+        """Применяет новый снимок raw и возвращает разницу с предыдущим.
+
+        Строки удалённых и изменённых заведений вычитаются из куба,
+        строки добавленных и изменённых - предобрабатываются и добавляются.
+        """
+        diff, hashes = diff_snapshots(self.hashes, raw, self.key_columns)
+        outdated = diff.removed.append(diff.changed)
+        fresh = diff.added.append(diff.changed)
+
+        raw = raw.set_axis(hashes.index)
+        fresh_data = preprocess(raw.loc[fresh])
+
+        cube = self.cube
+        alpha = cube.sketch_alpha
+        if len(outdated):
+            cube = cube.merge(PlacesCube.build(self.data.loc[outdated], sketch_alpha=alpha), sign=-1)
+        if len(fresh):
+            cube = cube.merge(PlacesCube.build(fresh_data, sketch_alpha=alpha))
+
+        self.data = pd.concat([self.data.drop(index=outdated), fresh_data])
+        self.cube = cube
+        self.hashes = hashes
+        return diff
+
+    def save(self, path):
+        """Сохраняет состояние для следующего запуска (pickle)."""
+        pd.to_pickle(self, path)
+
+    @staticmethod
+    def load(path):
+        return pd.read_pickle(path)
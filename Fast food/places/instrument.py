@@ -0,0 +1,211 @@
+# coding: utf-8
+"""Замеры этапов расчёта: время, CPU, строки и память.
+
+Каждый этап оборачивается в Instrumentation.stage или вызывается через
+Instrumentation.call; для этапа записываются время (wall), процессорное
+время (включая завершившиеся дочерние процессы, например пул рендеринга
+графиков), кол-во строк на входе и выходе и изменение RSS процесса.
+Вложенные этапы получают имя «родитель/этап». Результаты выгружаются в
+JSON или в текстовый формат OpenMetrics.
+
+По запросу для этапов верхнего уровня снимается профиль cProfile (топ
+функций по накопленному времени) и трасса tracemalloc (пик памяти Python
+и NumPy и топ строк по выделенной памяти). Выключенный экземпляр
+(enabled=False) ничего не замеряет, поэтому функции принимают его по
+умолчанию без накладных расходов.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+# profile - топ функций cProfile, allocations - топ строк tracemalloc
+StageRecord = namedtuple('StageRecord', [
+    'stage', 'wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out',
+    'memory_delta_bytes', 'traced_peak_bytes', 'profile', 'allocations',
+])
+
+# метрика OpenMetrics -> (поле StageRecord, описание)
+OPENMETRICS = {
+    'wall_seconds': ('wall_seconds', 'Время этапа'),
+    'cpu_seconds': ('cpu_seconds', 'Процессорное время этапа'),
+    'rows_in': ('rows_in', 'Строк на входе этапа'),
+    'rows_out': ('rows_out', 'Строк на выходе этапа'),
+    'memory_delta_bytes': ('memory_delta_bytes', 'Изменение RSS за этап'),
+    'traced_peak_bytes': ('traced_peak_bytes', 'Пик памяти по tracemalloc'),
+}
+
+
+def rss_bytes():
+    """Текущий RSS процесса; без /proc - пиковый RSS из getrusage."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def cpu_seconds():
+    """Процессорное время процесса и его завершившихся дочерних процессов."""
+    children = os.times()
+    return time.process_time() + children.children_user + children.children_system
+
+
+def count_rows(value):
+    """Кол-во строк таблицы, массива или словаря таблиц (None - не таблица)."""
+    if isinstance(value, dict):
+        counts = [count_rows(item) for item in value.values()]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    if hasattr(value, 'shape') and getattr(value, 'ndim', 0) >= 1:
+        return int(value.shape[0])
+    return None
+
+
+class _Stage:
+    """Этап в процессе замера; rows_out можно задать внутри блока with."""
+
+    __slots__ = ('rows_in', 'rows_out')
+
+    def __init__(self, rows_in=None):
+        self.rows_in = rows_in
+        self.rows_out = None
+
+
+class Instrumentation:
+    """Сборщик замеров этапов.
+
+    profile=True включает cProfile, trace_memory=True - tracemalloc для
+    этапов верхнего уровня; top - сколько функций и строк сохранять.
+    labels - метки, добавляемые к каждой метрике OpenMetrics (например city).
+    """
+
+    def __init__(self, enabled=True, profile=False, trace_memory=False, top=20, labels=None):
+        self.enabled = enabled
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.top = top
+        self.labels = dict(labels or {})
+        self.records = []
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Замер блока with; возвращает объект, в который можно записать rows_out."""
+        current = _Stage(rows_in)
+        if not self.enabled:
+            yield current
+            return
+        top_level = not self._stack
+        self._stack.append(name)
+        profiler = cProfile.Profile() if self.profile and top_level else None
+        tracing = self.trace_memory and top_level
+        if tracing:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+
+        rss = rss_bytes()
+        cpu = cpu_seconds()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield current
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - start
+            cpu = cpu_seconds() - cpu
+            rss = rss_bytes() - rss
+            traced_peak, allocations = None, None
+            if tracing:
+                traced_peak = tracemalloc.get_traced_memory()[1]
+                allocations = self._allocations(before, tracemalloc.take_snapshot())
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(StageRecord(
+                '/'.join(self._stack), round(wall, 6), round(cpu, 6), current.rows_in,
+                current.rows_out, rss, traced_peak,
+                self._profile(profiler) if profiler is not None else None, allocations,
+            ))
+            self._stack.pop()
+
+    def call(self, name, func, *args, **kwargs):
+        """Вызывает func как этап name; строки считаются по первому аргументу и результату."""
+        with self.stage(name, count_rows(args[0]) if args else None) as current:
+            result = func(*args, **kwargs)
+            current.rows_out = count_rows(result)
+        return result
+
+    def _profile(self, profiler):
+        stats = pstats.Stats(profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {'function': f'{filename}:{line}({function})', 'calls': calls,
+             'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)}
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in rows[:self.top]
+        ]
+
+    def _allocations(self, before, after):
+        stats = after.compare_to(before, 'lineno')[:self.top]
+        return [
+            {'line': str(stat.traceback[0]), 'size_diff': stat.size_diff,
+             'count_diff': stat.count_diff}
+            for stat in stats
+        ]
+
+    def to_dicts(self):
+        """Замеры в виде списка словарей (без пустых полей профиля)."""
+        return [
+            {key: value for key, value in record._asdict().items()
+             if value is not None or key not in ('traced_peak_bytes', 'profile', 'allocations')}
+            for record in self.records
+        ]
+
+    def to_json(self):
+        return json.dumps({'labels': self.labels, 'stages': self.to_dicts()},
+                          ensure_ascii=False, indent=1)
+
+    def to_openmetrics(self, prefix='places_stage'):
+        """Замеры в текстовом формате OpenMetrics (gauge с меткой stage)."""
+        lines = []
+        for metric, (field, description) in OPENMETRICS.items():
+            samples = [(record.stage, getattr(record, field)) for record in self.records
+                       if getattr(record, field) is not None]
+            if not samples:
+                continue
+            name = f'{prefix}_{metric}'
+            lines += [f'# TYPE {name} gauge', f'# HELP {name} {description}']
+            for stage, value in samples:
+                labels = ','.join(f'{key}="{_escape(label)}"'
+                                  for key, label in {**self.labels, 'stage': stage}.items())
+                lines.append(f'{name}{{{labels}}} {value}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, fmt=None):
+        """Сохраняет замеры; fmt - 'json' или 'openmetrics' (по умолчанию по расширению)."""
+        if fmt is None:
+            fmt = 'json' if path.endswith('.json') else 'openmetrics'
+        text = self.to_json() if fmt == 'json' else self.to_openmetrics()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# выключенный сборщик для функций, которым замеры не нужны
+DISABLED = Instrumentation(enabled=False)
@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Загрузка moscow_places.csv с явной схемой и кешем-снимком в формате Arrow.
+
+При первом чтении CSV разбирается с заданными типами, а результат
+сохраняется в несжатый Arrow IPC (Feather v2) файл, имя которого содержит
+хеш содержимого исходного CSV. При последующих запусках снимок
+отображается в память (memory map) вместо повторного разбора CSV.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+# путь к датасету по умолчанию - рядом со скриптом анализа
+DEFAULT_PATH = 'moscow_places.csv'
+
+# явная схема столбцов датасета; текстовые столбцы (name, address, hours,
+# avg_bill) читаются строковым типом pandas по умолчанию
+SCHEMA = {
+    'category': 'category',
+    'district': 'category',
+    'lat': 'float64',
+    'lng': 'float64',
+    'rating': 'float32',
+    'price': 'category',
+    'middle_avg_bill': 'float64',
+    'middle_coffee_cup': 'float64',
+    'chain': 'int8',
+    'seats': 'Int16',
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Возвращает хеш содержимого файла (blake2b, 16 байт в hex)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _csv_dtypes(path):
+    """Типы для pd.read_csv по SCHEMA только для столбцов, которые есть в файле."""
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: SCHEMA[col] for col in header if col in SCHEMA}
+    # seats в исходных данных хранится как float (например, 120.0),
+    # поэтому сначала читаем его как float, а затем приводим к Int16
+    if 'seats' in dtype:
+        dtype['seats'] = 'float64'
+    return dtype
+
+
+def _apply_schema(data):
+    if 'seats' in data:
+        data['seats'] = data['seats'].astype(SCHEMA['seats'])
+    return data
+
+
+def read_csv_typed(path=DEFAULT_PATH, **kwargs):
+    """Читает CSV с явной схемой SCHEMA.
+
+    Столбцы, которых нет в файле, пропускаются; лишние столбцы читаются
+    с типом, который определит pandas.
+    """
+    return _apply_schema(pd.read_csv(path, dtype=_csv_dtypes(path), **kwargs))
+
+
+def read_csv_chunks(path=DEFAULT_PATH, chunksize=100_000, **kwargs):
+    """Читает CSV частями по chunksize строк со схемой SCHEMA (генератор)."""
+    with pd.read_csv(path, dtype=_csv_dtypes(path), chunksize=chunksize, **kwargs) as reader:
+        for chunk in reader:
+            yield _apply_schema(chunk)
+
+
+def snapshot_path(path, cache_dir=None):
+    """Путь к снимку для CSV-файла path с учётом хеша его содержимого."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.cache')
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{stem}-{file_hash(path)}.arrow')
+
+
+def load_places(path=DEFAULT_PATH, cache_dir=None, use_cache=True):
+    """Загружает датасет заведений с типизированными столбцами.
+
+    Если установлен pyarrow и use_cache=True, то при первом вызове создаётся
+    снимок в cache_dir (по умолчанию .cache рядом с CSV), а при следующих
+    вызовах снимок читается через memory map. Снимок привязан к хешу
+    содержимого CSV, поэтому изменённый файл автоматически перечитывается.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        use_cache = False
+
+    if not use_cache:
+        return read_csv_typed(path)
+
+    snapshot = snapshot_path(path, cache_dir)
+    if os.path.exists(snapshot):
+        table = feather.read_table(snapshot, memory_map=True)
+        return table.to_pandas()
+
+    data = read_csv_typed(path)
+    os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+    # пишем во временный файл и переименовываем, чтобы параллельные
+    # запуски не прочитали недописанный снимок
+    tmp = f'{snapshot}.{os.getpid()}.tmp'
+    feather.write_feather(
+        pa.Table.from_pandas(data, preserve_index=False),
+        tmp,
+        compression='uncompressed',
+    )
+    os.replace(tmp, snapshot)
+    return data
@@ -0,0 +1,199 @@
+# coding: utf-8
+"""Предварительная кластеризация маркеров заведений для карт folium.
+
+Вместо отдельного Marker на каждое заведение кластеры считаются заранее
+в NumPy для каждого уровня масштаба: точки раскладываются по сетке в
+пикселях веб-меркатора (cell_px × cell_px), а каждый более мелкий
+масштаб получается объединением соседних ячеек предыдущего (ячейка
+уровня z - 1 состоит из 2×2 ячеек уровня z). В HTML карты попадает
+один компактный JSON с кластерами всех уровней и небольшой скрипт,
+который рисует только кластеры текущего масштаба в видимой области.
+На уровнях кластеров размер JSON ограничен числом занятых ячеек сетки;
+последний уровень (max_zoom + 1 или максимальный масштаб карты, если он
+меньше) - отдельные заведения, заведения с одинаковыми координатами
+показываются одним маркером со списком подписей.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+TILE_SIZE = 256
+
+
+def mercator_pixels(lat, lng, zoom):
+    """Пиксельные координаты точек в проекции веб-меркатора на уровне zoom."""
+    scale = TILE_SIZE * 2.0 ** zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878)
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * scale
+    sin = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)) * scale
+    return x, y
+
+
+def _aggregate(ix, iy, count, lat_sum, lng_sum, first):
+    """Объединяет ячейки с одинаковыми (ix, iy)."""
+    keys = ix.astype(np.int64) << 32 | iy.astype(np.int64)
+    uniq, group = np.unique(keys, return_inverse=True)
+    n = len(uniq)
+    merged_first = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(merged_first, group, first)
+    return (
+        uniq >> 32,
+        uniq & 0xFFFFFFFF,
+        np.bincount(group, weights=count, minlength=n),
+        np.bincount(group, weights=lat_sum, minlength=n),
+        np.bincount(group, weights=lng_sum, minlength=n),
+        merged_first,
+    )
+
+
+def build_clusters(lat, lng, min_zoom=9, max_zoom=15, cell_px=60):
+    """Кластеры для уровней масштаба от min_zoom до max_zoom и отдельные точки.
+
+    Возвращает словарь zoom -> DataFrame со столбцами lat, lng (центр
+    кластера), count и first (позиция первого заведения кластера - для
+    подписи одиночных маркеров). Уровень max_zoom + 1 - отдельные
+    заведения: точки с одинаковыми координатами объединены, а в столбце
+    members - позиции всех заведений точки.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    positions = np.flatnonzero(np.isfinite(lat) & np.isfinite(lng))
+    lat, lng = lat[positions], lng[positions]
+
+    # отдельные точки: кластеры из заведений с совпадающими координатами
+    _, point, point_count = np.unique(np.column_stack([lat, lng]), axis=0,
+                                      return_inverse=True, return_counts=True)
+    point = point.ravel()
+    order = np.argsort(point, kind='stable')
+    members = np.split(positions[order], np.cumsum(point_count)[:-1])
+    points = pd.DataFrame({
+        'lat': np.bincount(point, weights=lat) / point_count,
+        'lng': np.bincount(point, weights=lng) / point_count,
+        'count': point_count.astype(np.int64),
+        'first': [group[0] for group in members],
+        'members': members,
+    })
+
+    x, y = mercator_pixels(lat, lng, max_zoom)
+    level = _aggregate(
+        np.floor(x / cell_px), np.floor(y / cell_px),
+        np.ones(len(lat)), lat, lng, positions,
+    )
+
+    levels = {}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        ix, iy, count, lat_sum, lng_sum, first = level
+        levels[zoom] = pd.DataFrame({
+            'lat': lat_sum / count,
+            'lng': lng_sum / count,
+            'count': count.astype(np.int64),
+            'first': first,
+        })
+        level = _aggregate(ix // 2, iy // 2, count, lat_sum, lng_sum, first)
+    levels[max_zoom + 1] = points.sort_values('first', ignore_index=True)
+    return dict(sorted(levels.items()))
+
+
+def cluster_payload(levels, labels=None, precision=5):
+    """Компактное JSON-представление кластеров.
+
+    labels - подписи заведений по позициям (например, «название рейтинг»);
+    подпись добавляется к кластерам из одного заведения и к отдельным
+    точкам (подписи всех заведений точки через перевод строки). Символ «<»
+    экранируется, поэтому JSON можно вставлять внутрь <script>.
+    """
+    payload = {}
+    for zoom, clusters in levels.items():
+        rows = []
+        single = clusters['count'].to_numpy() == 1
+        members = clusters['members'] if 'members' in clusters else [None] * len(clusters)
+        for lat, lng, count, first, is_single, positions in zip(
+            clusters['lat'].round(precision), clusters['lng'].round(precision),
+            clusters['count'], clusters['first'], single, members,
+        ):
+            label = None
+            if labels is not None and positions is not None:
+                label = '\n'.join(str(labels[position]) for position in positions)
+            elif labels is not None and is_single:
+                label = str(labels[first])
+            rows.append([lat, lng, int(count), label])
+        payload[zoom] = rows
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+
+
+# скрипт выполняется после загрузки страницы, когда объект карты уже создан
+_SCRIPT = """
+window.addEventListener('load', function() {
+    var map = %(map)s;
+    var levels = %(payload)s;
+    var zooms = Object.keys(levels).map(Number);
+    var minZoom = Math.min.apply(null, zooms), pointsZoom = Math.max.apply(null, zooms);
+    var layer = L.layerGroup().addTo(map);
+    function icon(count) {
+        var size = 24 + 6 * Math.round(Math.log10(count));
+        return L.divIcon({
+            html: '<div style="width:' + size + 'px;height:' + size + 'px;line-height:' + size
+                + 'px;border-radius:50%%;background:rgba(110,204,57,0.75);text-align:center;'
+                + 'font:12px sans-serif">' + count + '</div>',
+            className: '', iconSize: [size, size]
+        });
+    }
+    // подпись вставляется как текст, а не как HTML
+    function popup(text) {
+        var node = document.createElement('div');
+        node.style.whiteSpace = 'pre-line';
+        node.textContent = text;
+        return node;
+    }
+    function draw() {
+        // на максимальном масштабе карты кластеры не делятся, поэтому показываются точки
+        var zoom = map.getZoom();
+        var points = zoom >= Math.min(pointsZoom, map.getMaxZoom());
+        var level = points ? pointsZoom : Math.max(minZoom, Math.min(pointsZoom - 1, zoom));
+        var bounds = map.getBounds().pad(0.2);
+        layer.clearLayers();
+        levels[level].forEach(function(p) {
+            if (!bounds.contains([p[0], p[1]])) { return; }
+            var marker;
+            if (p[2] > 1) {
+                marker = L.marker([p[0], p[1]], {icon: icon(p[2])}).addTo(layer);
+                if (!points) {
+                    marker.on('click', function() {
+                        map.setView([p[0], p[1]], Math.min(zoom + 2, map.getMaxZoom()));
+                    });
+                }
+            } else {
+                marker = L.marker([p[0], p[1]]).addTo(layer);
+            }
+            if (p[3] !== null) { marker.bindPopup(popup(p[3])); }
+        });
+    }
+    map.on('moveend', draw);
+    draw();
+});
+"""
+
+
+def add_cluster_layer(m, data, popup=('name', 'rating'), **kwargs):
+    """Добавляет на карту folium m слой предварительно кластеризованных заведений.
+
+    popup - столбцы data, из которых собирается подпись одиночного маркера
+    (по умолчанию «name rating», как в create_clusters из скрипта).
+    Остальные параметры передаются в build_clusters.
+    """
+    from branca.element import Element
+
+    levels = build_clusters(data['lat'], data['lng'], **kwargs)
+    labels = None
+    if popup:
+        columns = [data[column].astype(str) for column in popup]
+        labels = columns[0]
+        for column in columns[1:]:
+            labels = labels + ' ' + column
+        labels = labels.to_numpy()
+    script = _SCRIPT % {'map': m.get_name(), 'payload': cluster_payload(levels, labels)}
+    m.get_root().script.add_child(Element(script))
+    return m
@@ -0,0 +1,58 @@
+# coding: utf-8
+"""Предобработка датасета: нормализация названий, столбцы street и is_24/7.
+
+Все преобразования векторные. Строковые операции выполняются только над
+уникальными значениями столбца (названия и адреса сильно повторяются),
+после чего результат разворачивается обратно по кодам factorize.
+"""
+
+import pandas as pd
+
+from places.instrument import DISABLED
+
+# значение hours для заведений, работающих ежедневно и круглосуточно
+HOURS_24_7 = 'ежедневно, круглосуточно'
+
+# улица - второй элемент адреса через запятую, без пробелов по краям
+STREET_PATTERN = r'^[^,]*,\s*([^,]*?)\s*(?:,|$)'
+
+
+def _map_unique(series, func):
+    """Применяет векторную функцию func к уникальным значениям series."""
+    codes, uniques = pd.factorize(series)
+    result = func(pd.Series(uniques))
+    out = result.take(codes).to_numpy()
+    # factorize помечает пропуски кодом -1
+    values = pd.Series(out, index=series.index, dtype=result.dtype)
+    return values.where(codes != -1)
+
+
+def normalize_names(names):
+    """Переводит названия в верхний регистр, убирает пробелы и заменяет Ё на Е."""
+    return _map_unique(
+        names, lambda s: s.str.upper().str.strip().str.replace('Ё', 'Е')
+    )
+
+
+def extract_street(address):
+    """Выделяет улицу из адреса.
+
+    Для адресов без запятой возвращается пропуск.
+    """
+    return _map_unique(
+        address, lambda s: s.str.extract(STREET_PATTERN, expand=False)
+    )
+
+
+def is_24_7(hours):
+    """Признак того, что заведение работает ежедневно и круглосуточно."""
+    return hours.eq(HOURS_24_7).fillna(False).astype(bool)
+
+
+def preprocess(data, instrument=DISABLED):
+    """Возвращает копию датасета с нормализованным name и столбцами street, is_24/7."""
+    data = data.copy()
+    data['name'] = instrument.call('normalize_names', normalize_names, data['name'])
+    data['street'] = instrument.call('street', extract_street, data['address'])
+    data['is_24/7'] = instrument.call('is_24/7', is_24_7, data['hours'])
+    return data
@@ -0,0 +1,214 @@
+# coding: utf-8
+"""Параллельный расчёт отчёта для нескольких городов.
+
+Города описываются JSON-файлом со списком объектов:
+
+    [
+        {"name": "moscow", "data_path": "moscow_places.csv",
+         "center": [55.751244, 37.618423],
+         "boundary": "https://code.s3.yandex.net/data-analyst/admin_level_geomap.geojson"},
+        ...
+    ]
+
+Локальные пути data_path и boundary считаются от каталога JSON-файла;
+center (центр карт города) и boundary необязательны, названия городов
+должны быть уникальными.
+
+Для каждого города в отдельном процессе выполняются загрузка,
+предобработка и построение куба агрегатов; таблицы отчёта сохраняются
+в каталог города, а ключевые показатели всех городов - в summary.csv.
+Ошибка в одном городе не прерывает расчёт остальных: она попадает в
+столбец error сводной таблицы.
+С --maps в каталог города сохраняются карты показателей по округам и
+заведений с центром в center (по умолчанию - медиана координат).
+С --metrics замеры этапов города сохраняются в его каталог (metrics.json
+или metrics.prom в формате OpenMetrics с меткой city).
+
+Запуск из каталога «Fast food»:
+
+    python -m places.runner cities.json --out reports
+    python -m places.runner cities.json --out reports --maps
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from places.analysis import analysis_tables
+from places.cube import PlacesCube, report_tables
+from places.districts import DistrictBoundaries, fill_districts
+from places.instrument import Instrumentation
+from places.loader import load_places
+from places.preprocessing import preprocess
+from places.sketches import EXACT
+
+# center - центр карт города (lat, lng), boundary - GeoJSON с границами округов (путь или URL)
+CityConfig = namedtuple(
+    'CityConfig', ['name', 'data_path', 'center', 'boundary'], defaults=(None, None)
+)
+REQUIRED_KEYS = ('name', 'data_path')
+
+
+def _check_item(item, position):
+    """Проверяет описание города; ValueError с номером города при ошибке."""
+    if not isinstance(item, dict):
+        raise ValueError(f'город {position}: ожидается объект, получено {item!r}')
+    unknown = sorted(set(item) - set(CityConfig._fields))
+    if unknown:
+        raise ValueError(f'город {position}: неизвестные ключи {", ".join(unknown)} '
+                         f'(допустимы {", ".join(CityConfig._fields)})')
+    missing = [key for key in REQUIRED_KEYS if key not in item]
+    if missing:
+        raise ValueError(f'город {position}: не заданы {", ".join(missing)}')
+    center = item.get('center')
+    if center is not None and (not isinstance(center, list) or len(center) != 2
+                               or not all(isinstance(v, (int, float)) for v in center)):
+        raise ValueError(f'город {position}: center задаётся как [lat, lng]: {center!r}')
+
+
+def load_configs(path):
+    """Читает список городов из JSON-файла (пути считаются от каталога файла).
+
+    Неизвестные или недостающие ключи и повторяющиеся названия городов
+    (у каждого города свой каталог результатов) дают ValueError.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        items = json.load(f)
+    configs = []
+    seen = set()
+    for position, item in enumerate(items, 1):
+        _check_item(item, position)
+        if item['name'] in seen:
+            raise ValueError(f'город {position}: название {item["name"]!r} уже встречалось')
+        seen.add(item['name'])
+        config = CityConfig(**item)
+        if config.center is not None:
+            config = config._replace(center=tuple(config.center))
+        config = config._replace(data_path=os.path.join(base, config.data_path))
+        if config.boundary is not None and '://' not in config.boundary:
+            config = config._replace(boundary=os.path.join(base, config.boundary))
+        configs.append(config)
+    return configs
+
+
+def city_summary(name, data, cube):
+    """Строка сводной таблицы: ключевые показатели города."""
+    total = cube.aggregate([], ['count', 'rating_mean', 'middle_avg_bill_median',
+                                'middle_coffee_cup_median'])
+    chain = cube.aggregate([], where={'chain': 1})['count'].sum()
+    round_the_clock = cube.aggregate([], where={'is_24/7': True})['count'].sum()
+    coffee = cube.aggregate([], where={'category': 'кофейня'})['count'].sum()
+    venues = int(total.loc[0, 'count'])
+    return {
+        'city': name,
+        'venues': venues,
+        'districts': int(data['district'].nunique()),
+        'chain_share': round(chain / venues * 100, 2) if venues else np.nan,
+        'is_24/7_share': round(round_the_clock / venues * 100, 2) if venues else np.nan,
+        'coffee_shops': int(coffee),
+        'rating_mean': round(total.loc[0, 'rating_mean'], 2),
+        'avg_bill_median': total.loc[0, 'middle_avg_bill_median'],
+        'coffee_cup_median': total.loc[0, 'middle_coffee_cup_median'],
+    }
+
+
+def run_city(config, output_dir, metrics=None, maps=False):
+    """Полный расчёт для одного города; возвращает строку сводной таблицы.
+
+    metrics - 'json' или 'openmetrics': сохранить замеры этапов в каталог города.
+    maps=True - посчитать все таблицы анализа и сохранить карты города.
+    """
+    instrument = Instrumentation(metrics is not None, labels={'city': config.name})
+    data = instrument.call('load', load_places, config.data_path)
+    data = instrument.call('preprocess', preprocess, data, instrument)
+    if config.boundary is not None:
+        # округа по координатам для строк, где district не указан
+        with instrument.stage('districts', len(data)) as stage:
+            data['district'], _ = fill_districts(data, DistrictBoundaries.load(config.boundary))
+            stage.rows_out = len(data)
+
+    cube = instrument.call('cube', PlacesCube.build, data, sketch_alpha=EXACT)
+    if maps:
+        # картам нужны таблицы анализа (улицы, кофейни), а не только срезы куба;
+        # куб таблиц анализа строится заново по исправленному флагу chain
+        tables = instrument.call('analysis', analysis_tables, data, instrument=instrument)
+    else:
+        tables = instrument.call('report_tables', report_tables, cube)
+    city_dir = os.path.join(output_dir, config.name)
+    os.makedirs(city_dir, exist_ok=True)
+    with instrument.stage('save_tables', len(tables)):
+        for table_name, table in tables.items():
+            table.to_csv(os.path.join(city_dir, f'{table_name}.csv'), index=False)
+    if maps:
+        from places.cli import save_maps
+        from places.districts import STATE_GEO
+
+        center = config.center or (data['lat'].median(), data['lng'].median())
+        instrument.call('maps', save_maps, data, tables, os.path.join(city_dir, 'maps'),
+                        config.boundary or STATE_GEO, center)
+    if metrics is not None:
+        name = 'metrics.json' if metrics == 'json' else 'metrics.prom'
+        instrument.write(os.path.join(city_dir, name), metrics)
+    return city_summary(config.name, data, cube)
+
+
+def run_cities(configs, output_dir, max_workers=None, metrics=None, maps=False):
+    """Считает отчёты по всем городам в пуле процессов и пишет summary.csv.
+
+    Города, расчёт которых завершился ошибкой, попадают в сводку только с
+    текстом ошибки в столбце error.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # список, а не словарь: города с одним названием не затирают друг друга
+        futures = [(config.name, pool.submit(run_city, config, output_dir, metrics, maps))
+                   for config in configs]
+        for name, future in futures:
+            try:
+                rows.append(future.result())
+            except Exception as error:
+                rows.append({'city': name, 'error': f'{type(error).__name__}: {error}'})
+    # если ошибкой завершились все города, столбца venues в сводке нет
+    summary = pd.DataFrame(rows)
+    if 'venues' in summary:
+        summary = summary.sort_values('venues', ascending=False, ignore_index=True)
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Отчёт по заведениям для нескольких городов')
+    parser.add_argument('config', help='JSON-файл со списком городов')
+    parser.add_argument('--out', default='reports', help='каталог для результатов')
+    parser.add_argument('--workers', type=int, default=None, help='кол-во процессов')
+    parser.add_argument('--metrics', choices=['json', 'openmetrics'], default=None,
+                        help='сохранить замеры этапов в каталог каждого города')
+    parser.add_argument('--maps', action='store_true', help='сохранить карты каждого города')
+    args = parser.parse_args(argv)
+
+    try:
+        configs = load_configs(args.config)
+    except ValueError as error:
+        parser.error(f'{args.config}: {error}')
+    summary = run_cities(configs, args.out, args.workers, args.metrics, args.maps)
+    print(summary.to_string(index=False))
+    return 1 if failed_cities(summary) else 0
+
+
+def failed_cities(summary):
+    """Города сводки, расчёт которых завершился ошибкой."""
+    if 'error' not in summary:
+        return []
+    return summary.loc[summary['error'].notna(), 'city'].tolist()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
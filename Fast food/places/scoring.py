@@ -0,0 +1,154 @@
+# coding: utf-8
+"""Оценка точек-кандидатов для открытия заведения.
+
+Для каждой точки-кандидата (например, узла сетки с шагом 100 м по всему
+городу) считаются признаки окружения:
+
+ - competitors_<r> - кол-во заведений выбранной категории в радиусе r;
+ - venues - кол-во заведений любых категорий в наибольшем радиусе
+   (косвенный показатель потока людей);
+ - median_bill, rating_mean, chain_share, is_24/7_share - медианный чек,
+   средний рейтинг, доли сетевых и круглосуточных заведений среди
+   конкурентов в наибольшем радиусе.
+
+Признаки считаются пакетно через places.spatial.VenueIndex: на пакет
+кандидатов выполняется один поиск в наибольшем радиусе, а все признаки
+получаются из результата через bincount и сортировку, без циклов по
+точкам. Итоговая оценка - взвешенная сумма стандартизованных признаков
+с весами, которые можно заменить.
+"""
+
+import numpy as np
+import pandas as pd
+
+from places.spatial import EARTH_RADIUS, VenueIndex
+
+RADII = (250, 500, 1000)
+
+# веса по умолчанию для кофейни: мало конкурентов рядом, много заведений
+# вокруг, высокий чек, невысокий рейтинг и небольшая доля сетей у конкурентов
+DEFAULT_WEIGHTS = {
+    'competitors_250': -1.0,
+    'competitors_500': -0.5,
+    'venues': 1.0,
+    'median_bill': 1.0,
+    'rating_mean': -0.5,
+    'chain_share': -0.5,
+}
+
+
+def candidate_grid(data, step=100.0, boundaries=None):
+    """Узлы сетки с шагом step метров по охвату заведений data.
+
+    Если передан boundaries (places.districts.DistrictBoundaries), остаются
+    только узлы внутри округов, и добавляется столбец district.
+    """
+    lat = data['lat'].to_numpy(dtype=np.float64)
+    lng = data['lng'].to_numpy(dtype=np.float64)
+    lat0 = np.nanmean(lat)
+    lat_step = np.degrees(step / EARTH_RADIUS)
+    lng_step = lat_step / np.cos(np.radians(lat0))
+    grid_lat, grid_lng = np.meshgrid(
+        np.arange(np.nanmin(lat), np.nanmax(lat) + lat_step, lat_step),
+        np.arange(np.nanmin(lng), np.nanmax(lng) + lng_step, lng_step),
+        indexing='ij',
+    )
+    grid = pd.DataFrame({'lat': grid_lat.ravel(), 'lng': grid_lng.ravel()})
+    if boundaries is not None:
+        grid['district'] = boundaries.assign(grid['lat'], grid['lng'])
+        grid = grid[grid['district'].notna()].reset_index(drop=True)
+    return grid
+
+
+def _group_median(query, values, n_queries):
+    """Медиана values по группам query (NaN для пустых групп)."""
+    keep = np.isfinite(values)
+    query, values = query[keep], values[keep]
+    order = np.lexsort((values, query))
+    values = values[order]
+    counts = np.bincount(query, minlength=n_queries)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    median = np.full(n_queries, np.nan)
+    filled = counts > 0
+    low = starts[filled] + (counts[filled] - 1) // 2
+    high = starts[filled] + counts[filled] // 2
+    median[filled] = (values[low] + values[high]) / 2
+    return median
+
+
+def _group_mean(query, values, n_queries):
+    """Среднее values по группам query без учёта NaN."""
+    keep = np.isfinite(values)
+    sums = np.bincount(query[keep], weights=values[keep], minlength=n_queries)
+    counts = np.bincount(query[keep], minlength=n_queries)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def site_features(data, lat, lng, category='кофейня', radii=RADII,
+                  bill='middle_coffee_cup', index=None, batch_size=20_000):
+    """Признаки окружения для точек-кандидатов lat/lng.
+
+    data - предобработанная таблица заведений (нужен столбец is_24/7),
+    index - готовый VenueIndex по data (строится, если не передан).
+    """
+    if index is None:
+        index = VenueIndex.from_frame(data)
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    radii = sorted(radii)
+    max_radius = radii[-1]
+
+    bills = data[bill].to_numpy(dtype=np.float64, na_value=np.nan)
+    ratings = data['rating'].to_numpy(dtype=np.float64, na_value=np.nan)
+    chains = data['chain'].to_numpy(dtype=np.float64)
+    round_the_clock = data['is_24/7'].to_numpy(dtype=np.float64)
+
+    n = len(lat)
+    features = {f'competitors_{radius}': np.zeros(n, dtype=np.int64) for radius in radii}
+    features.update({name: np.full(n, np.nan) for name in
+                     ['median_bill', 'rating_mean', 'chain_share', 'is_24/7_share']})
+    features['venues'] = index.count_within(lat, lng, max_radius)
+
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        size = stop - start
+        offsets, points, dist = index.within_radius(
+            lat[start:stop], lng[start:stop], max_radius, category=category
+        )
+        query = np.repeat(np.arange(size), np.diff(offsets))
+        for radius in radii:
+            near = dist <= radius
+            features[f'competitors_{radius}'][start:stop] = np.bincount(query[near], minlength=size)
+        features['median_bill'][start:stop] = _group_median(query, bills[points], size)
+        features['rating_mean'][start:stop] = _group_mean(query, ratings[points], size)
+        features['chain_share'][start:stop] = _group_mean(query, chains[points], size)
+        features['is_24/7_share'][start:stop] = _group_mean(query, round_the_clock[points], size)
+
+    return pd.DataFrame({'lat': lat, 'lng': lng, **features})
+
+
+def score_sites(features, weights=None):
+    """Оценка кандидатов - взвешенная сумма стандартизованных признаков.
+
+    weights - словарь признак -> вес (по умолчанию DEFAULT_WEIGHTS) или
+    функция, которая принимает таблицу признаков и возвращает оценки.
+    Пропуски признаков (нет конкурентов рядом) считаются средним значением.
+    """
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    if callable(weights):
+        return pd.Series(weights(features), index=features.index, name='score')
+    score = np.zeros(len(features))
+    for column, weight in weights.items():
+        values = features[column].to_numpy(dtype=np.float64)
+        std = np.nanstd(values)
+        z = (values - np.nanmean(values)) / std if std > 0 else np.zeros_like(values)
+        score += weight * np.nan_to_num(z)
+    return pd.Series(score, index=features.index, name='score')
+
+
+def rank_sites(features, weights=None, top=20):
+    """Лучшие top кандидатов по оценке score_sites."""
+    ranked = features.assign(score=score_sites(features, weights))
+    return ranked.sort_values('score', ascending=False).head(top)
@@ -0,0 +1,288 @@
+# coding: utf-8
+"""Локальный сервис запросов к датасету заведений.
+
+Датасет загружается и предобрабатывается один раз; измерения скрипта
+(category, district, chain, price, is_24/7, street) заранее кодируются
+целыми кодами, поэтому фильтр - это сравнение массивов кодов, а не строк.
+Ответы кешируются в LRU-кеше по нормализованному запросу (порядок
+параметров и значений фильтра не важен), кеш сбрасывается при
+перезагрузке датасета.
+
+Запуск из каталога «Fast food»:
+
+    python -m places serve moscow_places.csv --port 8000
+
+Запросы (повторяющийся параметр измерения - фильтр по любому из значений):
+
+    GET  /filter?category=кофейня&district=...&columns=name,rating&limit=100
+    GET  /groupby?by=district&metric=count&metric=rating:mean&category=кофейня
+    GET  /aggregate?metric=is_24/7:mean&metric=count
+    GET  /stats
+    POST /reload
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from places.loader import load_places
+from places.preprocessing import preprocess
+
+DIMENSIONS = ['category', 'district', 'chain', 'price', 'is_24/7', 'street']
+AGGREGATIONS = ['count', 'sum', 'mean', 'median', 'min', 'max', 'nunique']
+FILTER_LIMIT = 1000
+
+
+class QueryError(ValueError):
+    """Некорректный запрос (ответ 400)."""
+
+
+class QueryCache:
+    """LRU-кеш ответов: ключ - нормализованный запрос."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def info(self):
+        return {'size': len(self._items), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def _value_key(value):
+    """Строковое представление значения измерения для сопоставления с параметрами."""
+    if isinstance(value, (bool, np.bool_)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip().lower()
+
+
+def _param_key(value):
+    value = value.strip().lower()
+    return {'true': '1', 'false': '0'}.get(value, value)
+
+
+class PlacesDataset:
+    """Предобработанная таблица заведений с кодами измерений."""
+
+    def __init__(self, data):
+        self.data = data
+        self.codes = {}
+        self.lookup = {}
+        for column in DIMENSIONS:
+            codes, uniques = data[column].factorize()
+            self.codes[column] = codes
+            self.lookup[column] = {_value_key(value): code for code, value in enumerate(uniques)}
+
+    @classmethod
+    def load(cls, path):
+        return cls(preprocess(load_places(path)))
+
+    def mask(self, filters):
+        """Булева маска строк для нормализованного фильтра ((столбец, значения), ...)."""
+        mask = np.ones(len(self.data), dtype=bool)
+        for column, values in filters:
+            lookup = self.lookup[column]
+            wanted = [lookup[value] for value in values if value in lookup]
+            mask &= np.isin(self.codes[column], wanted)
+        return mask
+
+
+def _split(params, name):
+    """Значения параметра name, заданные повтором или через запятую."""
+    return tuple(item.strip() for value in params.pop(name, [])
+                 for item in value.split(',') if item.strip())
+
+
+def normalize_query(endpoint, params):
+    """Разбор параметров запроса в хешируемый ключ кеша.
+
+    params - словарь имя -> список значений (как из parse_qs). Фильтры по
+    измерениям сортируются, поэтому одинаковые по смыслу запросы дают один
+    ключ. limit для /filter - от 0 до FILTER_LIMIT (больший урезается).
+    """
+    params = dict(params)
+    filters = tuple(sorted(
+        (column, tuple(sorted({_param_key(value) for value in params.pop(column)})))
+        for column in DIMENSIONS if column in params
+    ))
+    by = _split(params, 'by')
+    metrics = _split(params, 'metric')
+    columns = _split(params, 'columns')
+    limit = params.pop('limit', [None])[-1]
+    if params:
+        raise QueryError(f'неизвестные параметры: {", ".join(sorted(params))}')
+    for column in by:
+        if column not in DIMENSIONS:
+            raise QueryError(f'группировка только по измерениям {DIMENSIONS}: {column}')
+    if endpoint == 'filter':
+        try:
+            limit = FILTER_LIMIT if limit is None else int(limit)
+        except ValueError:
+            raise QueryError(f'limit должен быть числом: {limit}') from None
+        if limit < 0:
+            raise QueryError(f'limit не может быть отрицательным: {limit}')
+        return endpoint, filters, columns, min(limit, FILTER_LIMIT)
+    if endpoint == 'groupby' and not by:
+        raise QueryError('не задан параметр by')
+    if endpoint == 'aggregate' and by:
+        raise QueryError('aggregate не группирует, используйте /groupby')
+    return endpoint, filters, by, metrics or ('count',)
+
+
+def _metric(metric):
+    column, _, how = metric.rpartition(':')
+    if metric == 'count':
+        return 'count', ('lat', 'size')
+    if how not in AGGREGATIONS or not column:
+        raise QueryError(f'метрика задаётся как столбец:{"|".join(AGGREGATIONS)}: {metric}')
+    return metric, (column, how)
+
+
+def _columns(data, names):
+    missing = [name for name in names if name not in data.columns]
+    if missing:
+        raise QueryError(f'нет столбцов: {", ".join(missing)}')
+    return list(names)
+
+
+def run_query(dataset, query):
+    """Выполняет нормализованный запрос, возвращает объект для JSON."""
+    endpoint, filters = query[:2]
+    subset = dataset.data[dataset.mask(filters)]
+    if endpoint == 'filter':
+        columns, limit = query[2:]
+        rows = subset[_columns(subset, columns)] if columns else subset
+        return {'total': len(subset),
+                'rows': json.loads(rows.head(limit).to_json(orient='records', force_ascii=False))}
+
+    by, metrics = query[2:]
+    named = dict(map(_metric, metrics))
+    _columns(subset, [column for column, _ in named.values()])
+    if endpoint == 'aggregate':
+        values = {name: subset[column].agg(how) if how != 'size' else len(subset)
+                  for name, (column, how) in named.items()}
+        return json.loads(pd.Series(values, dtype=object).to_json(force_ascii=False))
+    table = subset.groupby(list(by), observed=True, dropna=False).agg(**named).reset_index()
+    return json.loads(table.to_json(orient='records', force_ascii=False))
+
+
+class PlacesService:
+    """Датасет, загруженный один раз, и кеш ответов на запросы к нему."""
+
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        self.cache = QueryCache(cache_size)
+        self.version = 0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Перечитывает датасет и сбрасывает кеш."""
+        dataset = PlacesDataset.load(self.path)
+        with self._lock:
+            self.dataset = dataset
+            self.version += 1
+            self.cache.clear()
+        return {'rows': len(dataset.data), 'version': self.version}
+
+    def query(self, endpoint, params):
+        query = normalize_query(endpoint, params)
+        with self._lock:
+            dataset, key = self.dataset, (self.version, query)
+        result = self.cache.get(key)
+        if result is None:
+            result = json.dumps(run_query(dataset, query), ensure_ascii=False)
+            self.cache.put(key, result)
+        return result
+
+    def stats(self):
+        return {'rows': len(self.dataset.data), 'version': self.version, 'cache': self.cache.info()}
+
+
+def make_handler(service):
+    """Класс обработчика HTTP-запросов для service."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, body):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.strip('/')
+            if endpoint == 'stats':
+                return self._send(200, json.dumps(service.stats()))
+            if endpoint not in ('filter', 'groupby', 'aggregate'):
+                return self._send(404, json.dumps({'error': f'нет запроса /{endpoint}'},
+                                                  ensure_ascii=False))
+            try:
+                body = service.query(endpoint, parse_qs(url.query, keep_blank_values=True))
+            except (QueryError, KeyError, TypeError) as error:
+                return self._send(400, json.dumps({'error': str(error)}, ensure_ascii=False))
+            except Exception as error:
+                # ошибка расчёта не должна обрывать соединение без ответа
+                return self._send(500, json.dumps({'error': f'{type(error).__name__}: {error}'},
+                                                  ensure_ascii=False))
+            self._send(200, body)
+
+        def do_POST(self):
+            if urlsplit(self.path).path.strip('/') != 'reload':
+                return self._send(404, json.dumps({'error': 'только POST /reload'},
+                                                  ensure_ascii=False))
+            try:
+                body = json.dumps(service.reload())
+            except Exception as error:
+                # датасет и кеш остаются прежними
+                return self._send(500, json.dumps({'error': f'{type(error).__name__}: {error}'},
+                                                  ensure_ascii=False))
+            self._send(200, body)
+
+    return Handler
+
+
+def serve(path, host='127.0.0.1', port=8000, cache_size=256):
+    """Запускает сервис на host:port до прерывания."""
+    service = PlacesService(path, cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f'http://{host}:{server.server_address[1]}/ заведений: {len(service.dataset.data)}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
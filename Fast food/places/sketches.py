@@ -0,0 +1,128 @@
+# coding: utf-8
+"""Эскизы квантилей с ограниченной относительной ошибкой для ячеек куба.
+
+Значения раскладываются по логарифмическим корзинам (как в DDSketch):
+корзина i содержит значения из (γ^(i-1), γ^i], где γ = (1 + α) / (1 - α),
+а её представитель 2γ^i / (γ + 1) отличается от любого значения корзины
+не больше чем на долю α. Поэтому медиана или p90 по эскизу отличается от
+точного значения не больше чем на α (по умолчанию 1%) при любом диапазоне
+значений. Нули и отрицательные значения попадают в отдельную нулевую
+корзину.
+
+Эскиз - это кол-во значений в корзинах, поэтому эскизы складываются и
+вычитаются так же, как остальные агрегаты куба (t-digest и KLL вычитание
+не поддерживают, а оно нужно для инкрементального обновления). Хранится
+разреженно: тройки (ячейка куба, корзина, кол-во), отсортированные по
+ячейке и корзине.
+
+С alpha=EXACT (0) корзина - само значение: квантили точные (как у
+pandas), а размер эскиза - кол-во разных значений в каждой ячейке.
+"""
+
+import numpy as np
+
+DEFAULT_ALPHA = 0.01
+# точность, при которой эскизы хранят сами значения
+EXACT = 0.0
+
+# корзина для нулевых и отрицательных значений (представитель - 0)
+ZERO_BUCKET = np.iinfo(np.int64).min
+
+
+def _aggregate(cell, bucket, count):
+    """Складывает кол-ва одинаковых пар (ячейка, корзина), убирает нулевые."""
+    order = np.lexsort((bucket, cell))
+    cell, bucket, count = cell[order], bucket[order], count[order]
+    starts = np.flatnonzero(np.r_[True, (cell[1:] != cell[:-1]) | (bucket[1:] != bucket[:-1])])
+    count = np.add.reduceat(count, starts) if len(count) else count
+    cell, bucket = cell[starts], bucket[starts]
+    keep = count != 0
+    return cell[keep], bucket[keep], count[keep]
+
+
+class QuantileSketches:
+    """Эскизы квантилей одного числового столбца для всех ячеек куба."""
+
+    def __init__(self, cell, bucket, count, alpha=DEFAULT_ALPHA):
+        self.cell = cell
+        self.bucket = bucket
+        self.count = count
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+
+    @classmethod
+    def from_values(cls, cell, values, alpha=DEFAULT_ALPHA):
+        """Эскизы по значениям values, где cell - номер ячейки каждого значения."""
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.isfinite(values)
+        cell = np.asarray(cell, dtype=np.int64)[valid]
+        values = values[valid]
+        if alpha == EXACT:
+            return cls(*_aggregate(cell, values, np.ones(len(values), dtype=np.int64)), alpha)
+        gamma = (1 + alpha) / (1 - alpha)
+        bucket = np.full(len(values), ZERO_BUCKET, dtype=np.int64)
+        positive = values > 0
+        bucket[positive] = np.ceil(np.log(values[positive]) / np.log(gamma)).astype(np.int64)
+        return cls(*_aggregate(cell, bucket, np.ones(len(values), dtype=np.int64)), alpha)
+
+    def values(self, bucket):
+        """Представители корзин."""
+        if self.alpha == EXACT:
+            return bucket
+        with np.errstate(over='ignore'):
+            value = 2 * self.gamma ** bucket.astype(np.float64) / (self.gamma + 1)
+        return np.where(bucket == ZERO_BUCKET, 0.0, value)
+
+    def merge(self, other, sign=1, cell_map=None, other_cell_map=None):
+        """Сумма эскизов (sign=-1 - разность) с перенумерацией ячеек.
+
+        cell_map и other_cell_map - новые номера ячеек для эскизов self и
+        other (None - номера не меняются).
+        """
+        if other.alpha != self.alpha:
+            raise ValueError('у эскизов разная точность alpha')
+        cell = np.concatenate([
+            self.cell if cell_map is None else cell_map[self.cell],
+            other.cell if other_cell_map is None else other_cell_map[other.cell],
+        ])
+        bucket = np.concatenate([self.bucket, other.bucket])
+        count = np.concatenate([self.count, other.count * sign])
+        return QuantileSketches(*_aggregate(cell, bucket, count), self.alpha)
+
+    def take(self, keep):
+        """Эскизы только для ячеек с keep=True (ячейки перенумеровываются подряд)."""
+        new_cell = np.cumsum(keep) - 1
+        rows = keep[self.cell]
+        return QuantileSketches(
+            new_cell[self.cell[rows]], self.bucket[rows], self.count[rows], self.alpha
+        )
+
+    def quantile(self, group, n_groups, q):
+        """Квантиль q для групп ячеек.
+
+        group - номер группы для каждой ячейки куба (-1 - ячейка не входит
+        ни в одну группу). Как и pandas, интерполирует между соседними по
+        рангу значениями; пустые группы - NaN.
+        """
+        entry_group = group[self.cell]
+        selected = entry_group >= 0
+        cell, bucket, count = _aggregate(
+            entry_group[selected], self.bucket[selected], self.count[selected]
+        )
+        # корзины внутри группы идут по возрастанию значений, нулевая - первой
+        totals = np.bincount(cell, weights=count, minlength=n_groups).astype(np.int64)
+        cumulative = np.cumsum(count)
+        before = np.r_[0, np.cumsum(totals)[:-1]]
+        position = (totals - 1) * q
+        lower = np.floor(position)
+        weight = position - lower
+
+        def value_at(rank):
+            idx = np.searchsorted(cumulative, before + rank, side='right')
+            return self.values(bucket[np.minimum(idx, len(bucket) - 1)]) if len(bucket) else rank
+
+        result = value_at(lower) * (1 - weight) + value_at(np.ceil(position)) * weight
+        return np.where(totals > 0, result, np.nan)
+
+    def nbytes(self):
+        return self.cell.nbytes + self.bucket.nbytes + self.count.nbytes
@@ -0,0 +1,244 @@
+# coding: utf-8
+"""Пространственный индекс заведений для поиска в радиусе и k ближайших.
+
+Координаты lat/lng проецируются в метры (равнопромежуточная проекция вокруг
+центра датасета, для масштаба города ошибка меньше процента), точки
+раскладываются по квадратной сетке и сортируются по номеру ячейки. Поиск
+выполняется пакетно: для массива точек-запросов перебираются только
+соседние ячейки, а расстояния считаются векторно в NumPy.
+"""
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS = 6_371_000.0
+
+
+class VenueIndex:
+    """Сеточный индекс по координатам заведений.
+
+    Результаты поиска - позиции строк (0..n-1) в исходных данных.
+    """
+
+    def __init__(self, lat, lng, category=None, cell_size=250.0, batch_size=20_000):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        self.lat0 = float(np.nanmean(lat))
+        self.lng0 = float(np.nanmean(lng))
+        self.cell_size = float(cell_size)
+        self.batch_size = batch_size
+        self.category = None if category is None else pd.Series(category).to_numpy()
+        self._by_category = {}
+
+        x, y = self.project(lat, lng)
+        valid = np.isfinite(x) & np.isfinite(y)
+        self._build(x, y, np.flatnonzero(valid))
+
+    @classmethod
+    def from_frame(cls, data, **kwargs):
+        """Строит индекс по столбцам lat, lng и category датафрейма."""
+        category = data['category'] if 'category' in data else None
+        return cls(data['lat'], data['lng'], category=category, **kwargs)
+
+    def project(self, lat, lng):
+        """Переводит lat/lng в метры относительно центра индекса."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        x = np.radians(lng - self.lng0) * np.cos(np.radians(self.lat0)) * EARTH_RADIUS
+        y = np.radians(lat - self.lat0) * EARTH_RADIUS
+        return x, y
+
+    def _build(self, x, y, positions):
+        self.x0 = float(x[positions].min()) if len(positions) else 0.0
+        self.y0 = float(y[positions].min()) if len(positions) else 0.0
+        ix, iy = self._cell(x[positions], y[positions])
+        self.n_rows = int(iy.max()) + 1 if len(positions) else 1
+        self.n_cols = int(ix.max()) + 1 if len(positions) else 1
+        keys = ix * self.n_rows + iy
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._positions = positions[order]
+        self._x = x[self._positions]
+        self._y = y[self._positions]
+
+    def _cell(self, x, y):
+        ix = np.floor((x - self.x0) / self.cell_size).astype(np.int64)
+        iy = np.floor((y - self.y0) / self.cell_size).astype(np.int64)
+        return ix, iy
+
+    def _subset(self, category):
+        """Индекс только по заведениям категории category (строится один раз)."""
+        if category is None:
+            return self
+        if self.category is None:
+            raise ValueError('индекс построен без столбца category')
+        if category not in self._by_category:
+            sub = object.__new__(VenueIndex)
+            sub.__dict__.update(self.__dict__)
+            sub._by_category = {}
+            mask = self.category[self._positions] == category
+            sub._keys = self._keys[mask]
+            sub._positions = self._positions[mask]
+            sub._x = self._x[mask]
+            sub._y = self._y[mask]
+            self._by_category[category] = sub
+        return self._by_category[category]
+
+    def _candidates(self, qx, qy, meters):
+        """Пары (запрос, точка, расстояние) для точек не дальше meters."""
+        if not len(qx):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        reach = int(np.ceil(meters / self.cell_size))
+        qix, qiy = self._cell(qx, qy)
+        query_ids, starts, stops = [], [], []
+        # смещения, при которых хотя бы один запрос попадает в сетку индекса
+        dx_range = range(max(-reach, -int(qix.max())),
+                         min(reach, self.n_cols - 1 - int(qix.min())) + 1)
+        dy_range = range(max(-reach, -int(qiy.max())),
+                         min(reach, self.n_rows - 1 - int(qiy.min())) + 1)
+        for dx in dx_range:
+            for dy in dy_range:
+                cx, cy = qix + dx, qiy + dy
+                inside = (cy >= 0) & (cy < self.n_rows) & (cx >= 0) & (cx < self.n_cols)
+                keys = cx * self.n_rows + cy
+                lo = np.searchsorted(self._keys, keys, side='left')
+                hi = np.searchsorted(self._keys, keys, side='right')
+                hit = inside & (hi > lo)
+                query_ids.append(np.flatnonzero(hit))
+                starts.append(lo[hit])
+                stops.append(hi[hit])
+
+        # все запросы дальше meters от сетки - смещений нет
+        if not query_ids:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        query_ids = np.concatenate(query_ids)
+        starts = np.concatenate(starts)
+        lengths = np.concatenate(stops) - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+
+        # разворачиваем диапазоны [start, stop) в плоский массив позиций
+        query = np.repeat(query_ids, lengths)
+        shift = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        points = np.arange(total) + shift
+        dist = np.hypot(self._x[points] - qx[query], self._y[points] - qy[query])
+        keep = dist <= meters
+        return query[keep], points[keep], dist[keep]
+
+    def _batches(self, lat, lng):
+        qx, qy = self.project(np.atleast_1d(lat), np.atleast_1d(lng))
+        for start in range(0, len(qx), self.batch_size):
+            stop = start + self.batch_size
+            yield start, qx[start:stop], qy[start:stop]
+
+    def count_within(self, lat, lng, meters, category=None):
+        """Кол-во заведений (категории category) в радиусе meters от каждой точки."""
+        index = self._subset(category)
+        counts = np.zeros(np.size(lat), dtype=np.int64)
+        for start, qx, qy in index._batches(lat, lng):
+            query, _, _ = index._candidates(qx, qy, meters)
+            counts[start:start + len(qx)] = np.bincount(query, minlength=len(qx))
+        return counts
+
+    def within_radius(self, lat, lng, meters, category=None):
+        """Заведения в радиусе meters от каждой точки-запроса.
+
+        Возвращает (offsets, indices, distances) в формате CSR: соседи
+        запроса i - indices[offsets[i]:offsets[i + 1]], отсортированные
+        по расстоянию.
+        """
+        index = self._subset(category)
+        n_queries = np.size(lat)
+        all_query, all_points, all_dist = [], [], []
+        for start, qx, qy in index._batches(lat, lng):
+            query, points, dist = index._candidates(qx, qy, meters)
+            all_query.append(query + start)
+            all_points.append(index._positions[points])
+            all_dist.append(dist)
+
+        query = np.concatenate(all_query) if all_query else np.empty(0, dtype=np.int64)
+        points = np.concatenate(all_points) if all_points else np.empty(0, dtype=np.int64)
+        dist = np.concatenate(all_dist) if all_dist else np.empty(0)
+        order = np.lexsort((dist, query))
+        offsets = np.zeros(n_queries + 1, dtype=np.int64)
+        np.cumsum(np.bincount(query, minlength=n_queries), out=offsets[1:])
+        return offsets, points[order], dist[order]
+
+    def _nearest_all(self, qx, qy, k, max_meters):
+        """k ближайших перебором всех заведений индекса (позиции в индексе, расстояния)."""
+        n_points = len(self._x)
+        k_found = min(k, n_points)
+        points = np.full((len(qx), k), -1, dtype=np.int64)
+        dist = np.full((len(qx), k), np.inf)
+        # не больше ~4 млн расстояний за раз
+        step = max(1, (1 << 22) // max(n_points, 1))
+        for start in range(0, len(qx) if n_points else 0, step):
+            stop = start + step
+            full = np.hypot(qx[start:stop, None] - self._x[None, :],
+                            qy[start:stop, None] - self._y[None, :])
+            nearest = np.argpartition(full, k_found - 1, axis=1)[:, :k_found]
+            nearest_dist = np.take_along_axis(full, nearest, axis=1)
+            order = np.argsort(nearest_dist, axis=1, kind='stable')
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_dist = np.take_along_axis(nearest_dist, order, axis=1)
+            far = nearest_dist > max_meters
+            points[start:stop, :k_found] = np.where(far, -1, nearest)
+            dist[start:stop, :k_found] = np.where(far, np.inf, nearest_dist)
+        return points, dist
+
+    def k_nearest(self, lat, lng, k=1, category=None, max_meters=50_000.0):
+        """k ближайших заведений для каждой точки-запроса.
+
+        Возвращает (indices, distances) размером (n, k); если заведений
+        не хватает, недостающие позиции равны -1, а расстояния - inf.
+        Радиус поиска удваивается, пока не найдены k соседей (не дальше
+        max_meters). Когда окно поиска накрывает больше ячеек, чем в индексе
+        заведений (редкая категория, запрос за пределами города), или уже
+        накрывает все заведения, оставшиеся запросы считаются перебором.
+        """
+        index = self._subset(category)
+        qx_all, qy_all = self.project(np.atleast_1d(lat), np.atleast_1d(lng))
+        n_queries = len(qx_all)
+        indices = np.full((n_queries, k), -1, dtype=np.int64)
+        distances = np.full((n_queries, k), np.inf)
+
+        # расстояние до самого далёкого угла прямоугольника с заведениями
+        if len(index._x):
+            corner_x = np.maximum(np.abs(qx_all - index._x.min()), np.abs(qx_all - index._x.max()))
+            corner_y = np.maximum(np.abs(qy_all - index._y.min()), np.abs(qy_all - index._y.max()))
+            cover = np.hypot(corner_x, corner_y)
+        else:
+            cover = np.zeros(n_queries)
+
+        pending = np.arange(n_queries)
+        meters = min(index.cell_size, max_meters)
+        while len(pending):
+            window = 2 * int(np.ceil(meters / index.cell_size)) + 1
+            if min(window, index.n_cols) * min(window, index.n_rows) > len(index._x):
+                points, dist = index._nearest_all(qx_all[pending], qy_all[pending], k, max_meters)
+                indices[pending] = np.where(points >= 0, index._positions[points], -1)
+                distances[pending] = dist
+                break
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                query, points, dist = index._candidates(qx_all[batch], qy_all[batch], meters)
+                order = np.lexsort((dist, query))
+                query, points, dist = query[order], points[order], dist[order]
+                # порядковый номер кандидата внутри своего запроса
+                first = np.searchsorted(query, query, side='left')
+                rank = np.arange(len(query)) - first
+                top = rank < k
+                rows = batch[query[top]]
+                indices[rows, rank[top]] = index._positions[points[top]]
+                distances[rows, rank[top]] = dist[top]
+            # запрос готов, если k-й сосед найден или просмотрены все заведения
+            found = np.isfinite(distances[pending, -1])
+            pending = pending[~found & (cover[pending] > meters)]
+            if meters >= max_meters or not len(pending):
+                break
+            meters = min(meters * 2, max_meters, float(cover[pending].max()))
+        return indices, distances
@@ -0,0 +1,188 @@
+# coding: utf-8
+"""Компактное хранилище заведений для долгоживущих процессов.
+
+Вместо DataFrame с объектными строками каждый строковый столбец хранится
+словарным кодированием: уникальные значения склеены в один UTF-8 буфер
+с массивом смещений, а у заведений - только коды (int32). Числовые
+столбцы хранятся в типизированных массивах NumPy. Строки декодируются
+только при обращении к конкретному заведению.
+
+Поиск по id заведения и по нормализованному названию выполняется за
+константное время: хеш-индекс id (id должны быть уникальны) и словарь
+название -> код, построенный один раз по уникальным названиям, с
+CSR-раскладкой позиций заведений для каждого кода.
+"""
+
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from places.preprocessing import normalize_names
+
+STRING_COLUMNS = ['name', 'category', 'address', 'district', 'hours', 'price', 'avg_bill']
+NUMERIC_COLUMNS = {
+    'lat': np.float64,
+    'lng': np.float64,
+    'rating': np.float32,
+    'middle_avg_bill': np.float32,
+    'middle_coffee_cup': np.float32,
+    'chain': np.int8,
+    'seats': np.float32,
+}
+
+Venue = namedtuple('Venue', ['id'] + STRING_COLUMNS + list(NUMERIC_COLUMNS) + ['city'])
+
+
+def _scalar(value):
+    """Элемент массива как число Python; float32 - по кратчайшей записи (4.2, а не 4.199999809)."""
+    if isinstance(value, np.float32):
+        return float(str(value))
+    return value.item()
+
+
+class StringColumn:
+    """Строковый столбец в словарном кодировании; пропуск - код -1."""
+
+    __slots__ = ('codes', 'blob', 'offsets')
+
+    def __init__(self, codes, blob, offsets):
+        self.codes = codes
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        encoded = [str(value).encode('utf-8') for value in uniques]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+        return cls(codes.astype(np.int32), b''.join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def n_unique(self):
+        return len(self.offsets) - 1
+
+    def decode(self, code):
+        if code < 0:
+            return None
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].decode('utf-8')
+
+    def __getitem__(self, position):
+        return self.decode(self.codes[position])
+
+    def uniques(self):
+        return [self.decode(code) for code in range(self.n_unique)]
+
+    def nbytes(self):
+        return self.codes.nbytes + len(self.blob) + self.offsets.nbytes
+
+
+class VenueStore:
+    """Хранилище заведений одного или нескольких городов.
+
+    Строится из предобработанной таблицы (from_frame) или из словаря
+    город -> таблица (from_frames); id заведения - метка строки исходной
+    таблицы (для нескольких городов - сквозной номер).
+    """
+
+    __slots__ = ('ids', 'strings', 'numbers', 'cities', '_name_codes', '_name_offsets',
+                 '_name_order')
+
+    def __init__(self, ids, strings, numbers, cities):
+        self.ids = pd.Index(ids)
+        if not self.ids.is_unique:
+            duplicated = self.ids[self.ids.duplicated()].unique()[:5].tolist()
+            raise ValueError(f'id заведений повторяются: {duplicated}')
+        self.strings = strings
+        self.numbers = numbers
+        self.cities = cities
+        # позиции заведений, сгруппированные по коду нормализованного названия
+        name_codes = strings['name'].codes
+        valid = name_codes >= 0
+        self._name_order = np.flatnonzero(valid)[np.argsort(name_codes[valid], kind='stable')]
+        self._name_offsets = np.zeros(strings['name'].n_unique + 1, dtype=np.int64)
+        self._name_offsets[1:] = np.cumsum(np.bincount(name_codes[valid],
+                                                       minlength=strings['name'].n_unique))
+        # нормализованное название -> код (только уникальные названия)
+        self._name_codes = {name: code for code, name in enumerate(strings['name'].uniques())}
+
+    @classmethod
+    def from_frame(cls, data, city=None):
+        """Хранилище по таблице заведений; название нормализуется как в preprocess."""
+        return cls.from_frames({city: data}, ids=data.index)
+
+    @classmethod
+    def from_frames(cls, frames, ids=None):
+        """Хранилище по словарю город -> таблица заведений."""
+        data = pd.concat(list(frames.values()), ignore_index=True)
+        data['name'] = normalize_names(data['name'])
+        strings = {column: StringColumn.from_values(data[column]) for column in STRING_COLUMNS}
+        numbers = {
+            column: data[column].to_numpy(dtype=np.float64, na_value=np.nan).astype(dtype)
+            for column, dtype in NUMERIC_COLUMNS.items()
+        }
+        cities = StringColumn.from_values(
+            np.repeat(np.array(list(frames), dtype=object), [len(frame) for frame in frames.values()])
+        )
+        if ids is None:
+            ids = np.arange(len(data))
+        return cls(ids, strings, numbers, cities)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _venue(self, position):
+        return Venue(
+            self.ids[position],
+            *(self.strings[column][position] for column in STRING_COLUMNS),
+            *(_scalar(self.numbers[column][position]) for column in NUMERIC_COLUMNS),
+            self.cities[position],
+        )
+
+    def get(self, venue_id, default=None):
+        """Заведение по id или default, если такого id нет."""
+        try:
+            position = self.ids.get_loc(venue_id)
+        except KeyError:
+            return default
+        return self._venue(position)
+
+    def __getitem__(self, venue_id):
+        venue = self.get(venue_id)
+        if venue is None:
+            raise KeyError(venue_id)
+        return venue
+
+    def positions_by_name(self, name):
+        """Позиции заведений с данным названием (регистр и Ё не важны)."""
+        code = self._name_codes.get(name.upper().strip().replace('Ё', 'Е'))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._name_order[self._name_offsets[code]:self._name_offsets[code + 1]]
+
+    def by_name(self, name):
+        """Список заведений с данным названием."""
+        return [self._venue(position) for position in self.positions_by_name(name)]
+
+    def column(self, name):
+        """Столбец целиком: массив NumPy (числа) или pd.Series строк."""
+        if name in self.numbers:
+            return self.numbers[name]
+        strings = self.cities if name == 'city' else self.strings[name]
+        uniques = pd.Series(strings.uniques(), dtype=object)
+        return pd.Series(pd.Categorical.from_codes(strings.codes, uniques), index=self.ids)
+
+    def nbytes(self):
+        """Объём памяти под данные хранилища и индексы поиска, байт."""
+        return (
+            sum(column.nbytes() for column in self.strings.values())
+            + sum(array.nbytes for array in self.numbers.values())
+            + self.cities.nbytes() + self.ids.memory_usage(deep=True)
+            + sys.getsizeof(self._name_codes) + sum(map(sys.getsizeof, self._name_codes))
+            + self._name_offsets.nbytes + self._name_order.nbytes
+        )
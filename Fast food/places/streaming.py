@@ -0,0 +1,39 @@
+# coding: utf-8
+"""Потоковая обработка файла заведений частями фиксированного размера.
+
+Каждая часть проходит ту же предобработку, что и весь датасет
+(places.preprocessing), и сворачивается в куб агрегатов (places.cube).
+Куб аддитивен - кол-во, суммы, суммы квадратов и гистограммы-эскизы
+квантилей складываются, - поэтому части объединяются слиянием кубов, а
+расход памяти определяется размером части и числом ячеек куба, но не
+размером файла.
+"""
+
+from places.cube import DIMENSIONS, PlacesCube
+from places.loader import DEFAULT_PATH, read_csv_chunks
+from places.preprocessing import preprocess
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def iter_preprocessed(path=DEFAULT_PATH, chunksize=DEFAULT_CHUNKSIZE):
+    """Генератор предобработанных частей файла path."""
+    for chunk in read_csv_chunks(path, chunksize=chunksize):
+        yield preprocess(chunk)
+
+
+def stream_cube(path=DEFAULT_PATH, chunksize=DEFAULT_CHUNKSIZE, dimensions=DIMENSIONS,
+                sketch_alpha=None):
+    """Строит куб агрегатов по файлу path, не загружая его целиком в память.
+
+    Медианы seats, middle_avg_bill и других числовых столбцов считаются по
+    гистограммам куба (см. PlacesCube.aggregate) или, если задан
+    sketch_alpha, по эскизам квантилей; средние - по суммам.
+    """
+    cube = None
+    for chunk in iter_preprocessed(path, chunksize):
+        part = PlacesCube.build(chunk, dimensions, sketch_alpha=sketch_alpha)
+        cube = part if cube is None else cube.merge(part)
+    if cube is None:
+        raise ValueError(f'файл {path} не содержит строк')
+    return cube
@@ -0,0 +1,193 @@
+# coding: utf-8
+"""Разбор адресов и индекс улиц.
+
+Адрес вида «Москва, улица Егора Абакумова, 9» разбирается на город,
+улицу (как в extract_street), тип улицы, название и номер дома. Разбор
+выполняется один раз для каждого уникального адреса. Ключ улицы -
+«тип название» в нижнем регистре с Е вместо Ё и полным названием типа,
+поэтому «Пресненская наб.» и «набережная Пресненская» совпадают.
+
+StreetIndex хранит для каждой улицы позиции её заведений (CSR) и заранее
+посчитанные кол-ва заведений по категориям и округам. Запросы «топ улиц»
+и «улицы с одним заведением» (в том числе по округу) после первого
+обращения отвечают срезом заранее отсортированного массива.
+"""
+
+import numpy as np
+import pandas as pd
+
+# полное название типа улицы -> сокращения
+STREET_TYPES = {
+    'улица': ['ул'],
+    'проспект': ['пр-т', 'просп'],
+    'переулок': ['пер'],
+    'шоссе': ['ш'],
+    'бульвар': ['б-р'],
+    'площадь': ['пл'],
+    'набережная': ['наб'],
+    'проезд': ['пр-д'],
+    'тупик': [],
+    'аллея': [],
+    'просек': [],
+    'линия': [],
+    'квартал': ['кв-л'],
+    'микрорайон': ['мкр'],
+    'километр': ['км'],
+}
+
+_ALIASES = {alias: full for full, aliases in STREET_TYPES.items() for alias in [full, *aliases]}
+_TYPE = '|'.join(sorted(map(str, _ALIASES), key=len, reverse=True))
+# тип перед названием («улица Арбат») или после него («Ленинградское шоссе»)
+TYPE_PREFIX_PATTERN = rf'^(?P<type>{_TYPE})\.?\s+(?P<name>.+)$'
+TYPE_SUFFIX_PATTERN = rf'^(?P<name>.+?)\s+(?P<type>{_TYPE})\.?$'
+HOUSE_PREFIX_PATTERN = r'^(?:дом|д\.)\s*'
+
+ADDRESS_COLUMNS = ['city', 'street', 'street_type', 'street_name', 'house', 'street_key']
+
+
+def _parse_unique(addresses):
+    """Разбор уникальных адресов (Series строк) в таблицу ADDRESS_COLUMNS."""
+    # у адреса без дома недостающий столбец получается числовым - приводим к object
+    parts = addresses.str.split(',', n=2, expand=True).reindex(columns=range(3)).astype(object)
+    parts = parts.apply(lambda column: column.str.strip())
+    street = parts[1].where(parts[1] != '')
+
+    lowered = street.str.lower().str.replace('ё', 'е')
+    prefix = lowered.str.extract(TYPE_PREFIX_PATTERN)
+    suffix = lowered.str.extract(TYPE_SUFFIX_PATTERN)
+    street_type = prefix['type'].fillna(suffix['type']).map(_ALIASES)
+    street_name = prefix['name'].fillna(suffix['name']).fillna(lowered)
+    street_name = street_name.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+    return pd.DataFrame({
+        'city': parts[0],
+        'street': street,
+        'street_type': street_type,
+        'street_name': street_name,
+        'house': parts[2].str.replace(HOUSE_PREFIX_PATTERN, '', regex=True),
+        'street_key': (street_type + ' ' + street_name).fillna(street_name),
+    })
+
+
+def parse_addresses(address):
+    """Таблица city, street, street_type, street_name, house, street_key для Series адресов."""
+    codes, uniques = pd.factorize(address)
+    parsed = _parse_unique(pd.Series(uniques, dtype=object))
+    result = parsed.take(np.maximum(codes, 0)).set_axis(address.index)
+    # factorize помечает пропуски кодом -1
+    return result.where(pd.Series(codes != -1, index=address.index), axis=0)
+
+
+class StreetIndex:
+    """Индекс улиц: заведения улицы и кол-ва заведений по категориям и округам."""
+
+    def __init__(self, keys, names, codes, ids, categories, districts, spellings=None):
+        self.keys = keys
+        self.names = names
+        self.ids = ids
+        # ключ или любое написание улицы -> код
+        self._lookup = {key: code for code, key in enumerate(keys)}
+        self._lookup.update(spellings or {})
+        valid = codes >= 0
+        self._order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        self._offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(np.bincount(codes[valid], minlength=len(keys)))
+        self.totals = np.diff(self._offsets)
+        self.category_counts = pd.crosstab(codes[valid], categories[valid]).reindex(
+            range(len(keys)), fill_value=0
+        )
+        self.district_counts = pd.crosstab(codes[valid], districts[valid]).reindex(
+            range(len(keys)), fill_value=0
+        )
+        self._rankings = {}
+
+    @classmethod
+    def from_frame(cls, data):
+        """Строит индекс по столбцам address, category и district."""
+        parsed = parse_addresses(data['address'])
+        codes, keys = pd.factorize(parsed['street_key'])
+        # отображаемое название улицы - самое частое её написание
+        named = pd.DataFrame({'code': codes, 'street': parsed['street'].to_numpy()})[codes >= 0]
+        names = (named.value_counts().reset_index().drop_duplicates('code')
+                 .set_index('code')['street'].reindex(range(len(keys))).to_numpy())
+        spellings = dict(zip(named['street'], named['code']))
+        return cls(
+            np.asarray(keys, dtype=object), names, codes, data.index,
+            data['category'].astype(object).to_numpy(), data['district'].astype(object).to_numpy(),
+            spellings,
+        )
+
+    def _code(self, street):
+        code = self._lookup.get(street)
+        if code is None:
+            # новое написание: приводим к ключу разбором
+            key = parse_addresses(pd.Series([f', {street}']))['street_key'].iloc[0]
+            code = self._lookup.get(key)
+        if code is None:
+            raise KeyError(street)
+        return code
+
+    def venues(self, street):
+        """Метки строк data с заведениями улицы street (в любом написании)."""
+        code = self._code(street)
+        return self.ids[self._order[self._offsets[code]:self._offsets[code + 1]]]
+
+    def venues_of(self, streets):
+        """Метки строк data с заведениями всех улиц из списка streets."""
+        positions = [self._order[self._offsets[code]:self._offsets[code + 1]]
+                     for code in map(self._code, streets)]
+        return self.ids[np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)]
+
+    def _counts(self, district=None, category=None):
+        if district is not None:
+            return self.district_counts.get(district, pd.Series(0, index=self.district_counts.index))
+        if category is not None:
+            return self.category_counts.get(category, pd.Series(0, index=self.category_counts.index))
+        return pd.Series(self.totals)
+
+    def _ranking(self, district=None, category=None):
+        """Коды улиц по убыванию кол-ва заведений (кешируется по фильтру)."""
+        key = (district, category)
+        if key not in self._rankings:
+            counts = self._counts(district, category).to_numpy()
+            order = np.argsort(-counts, kind='stable')
+            self._rankings[key] = (order[counts[order] > 0], counts)
+        return self._rankings[key]
+
+    def top(self, n=15, district=None, category=None):
+        """Топ n улиц по кол-ву заведений (с фильтром по округу или категории)."""
+        order, counts = self._ranking(district, category)
+        order = order[:n]
+        return pd.DataFrame({'street': self.names[order], 'count': counts[order]})
+
+    def top_by_category(self, n=15):
+        """Категории заведений на топ n улицах: street, category, count_cat, count_street."""
+        order, _ = self._ranking()
+        order = order[:n]
+        table = self.category_counts.loc[order]
+        table.index = pd.Index(self.names[order], name='street')
+        result = table.stack().rename('count_cat').reset_index()
+        result.columns = ['street', 'category', 'count_cat']
+        result = result[result['count_cat'] > 0]
+        result['count_street'] = result['street'].map(dict(zip(self.names[order], self.totals[order])))
+        return result.sort_values(['count_street', 'count_cat'], ascending=False, ignore_index=True)
+
+    def _single_codes(self, district=None):
+        key = ('single', district)
+        if key not in self._rankings:
+            single = self.totals == 1
+            if district is not None:
+                single &= self._counts(district=district).to_numpy() == 1
+            self._rankings[key] = np.flatnonzero(single)
+        return self._rankings[key]
+
+    def single_venue(self, district=None):
+        """Улицы с одним заведением (с фильтром по округу этого заведения)."""
+        codes = self._single_codes(district)
+        return pd.DataFrame({'street': self.names[codes], 'count': self.totals[codes]})
+
+    def single_venue_districts(self):
+        """Кол-во улиц с одним заведением по округам: district, count (без выборки строк)."""
+        counts = self.district_counts.iloc[self._single_codes()].sum()
+        counts = counts[counts > 0].rename('count').rename_axis('district')
+        return counts.reset_index().sort_values('count', ascending=False, ignore_index=True)
@@ -0,0 +1,237 @@
+# coding: utf-8
+"""Экспорт карт в пирамиду растровых тайлов (PNG, схема z/x/y).
+
+Поддерживаются два слоя:
+ - плотность заведений: кол-во заведений в пикселе тайла в логарифмической
+   шкале цвета;
+ - показатели по округам: заливка округов цветом значения (аналог
+   Choropleth из скрипта).
+
+Тайлы рендерятся в пуле процессов. Для каждого тайла считается хеш входных
+данных (точек тайла или геометрии и значений округов, пересекающих тайл),
+хеши хранятся в manifest.json каталога, и тайлы с неизменившимся хешем не
+рендерятся заново; тайлы, которых больше нет в слое, удаляются. Каталог
+принадлежит одному слою. PNG кодируется встроенным zlib, без внешних
+библиотек.
+
+Тайлы можно раздавать любым статическим сервером и подключать в Leaflet
+через L.tileLayer('<каталог>/{z}/{x}/{y}.png').
+"""
+
+import hashlib
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from places.markers import TILE_SIZE, mercator_pixels
+
+# палитра YlGnBu, как у Choropleth в скрипте
+YLGNBU = np.array([
+    (255, 255, 217), (237, 248, 177), (199, 233, 180), (127, 205, 187),
+    (65, 182, 196), (29, 145, 192), (34, 94, 168), (37, 52, 148), (8, 29, 88),
+], dtype=np.float64)
+
+MANIFEST = 'manifest.json'
+
+
+def encode_png(rgba):
+    """Кодирует массив uint8 (h, w, 4) в PNG."""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', header),
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def colorize(values, vmin, vmax, opacity=0.8):
+    """Переводит значения в RGBA по палитре YLGNBU; NaN - прозрачный пиксель."""
+    values = np.asarray(values, dtype=np.float64)
+    span = vmax - vmin if vmax > vmin else 1.0
+    t = np.clip((values - vmin) / span, 0, 1) * (len(YLGNBU) - 1)
+    t = np.nan_to_num(t)
+    low = np.floor(t).astype(int)
+    high = np.minimum(low + 1, len(YLGNBU) - 1)
+    frac = (t - low)[..., None]
+    rgb = YLGNBU[low] * (1 - frac) + YLGNBU[high] * frac
+    alpha = np.where(np.isnan(values), 0, 255 * opacity)[..., None]
+    return np.concatenate([rgb, alpha], axis=-1).round().astype(np.uint8)
+
+
+def tile_pixel_centers(z, x, y):
+    """lat/lng центров пикселей тайла z/x/y (массивы TILE_SIZE × TILE_SIZE)."""
+    scale = TILE_SIZE * 2.0 ** z
+    px = x * TILE_SIZE + np.arange(TILE_SIZE) + 0.5
+    py = y * TILE_SIZE + np.arange(TILE_SIZE) + 0.5
+    lng = px / scale * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * py / scale))))
+    return np.meshgrid(lat, lng, indexing='ij')
+
+
+def tile_bounds(z, x, y):
+    """(min_lng, min_lat, max_lng, max_lat) тайла z/x/y."""
+    scale = TILE_SIZE * 2.0 ** z
+    lng = np.array([x, x + 1]) * TILE_SIZE / scale * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.array([y + 1, y]) * TILE_SIZE / scale))))
+    return lng[0], lat[0], lng[1], lat[1]
+
+
+def _digest(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_tile(out_dir, key, rgba):
+    path = os.path.join(out_dir, f'{key}.png')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(encode_png(rgba))
+
+
+def _render_density(out_dir, key, px, py, vmax):
+    counts = np.zeros((TILE_SIZE, TILE_SIZE))
+    np.add.at(counts, (py, px), 1)
+    values = np.where(counts > 0, np.log1p(counts), np.nan)
+    _write_tile(out_dir, key, colorize(values, 0, np.log1p(vmax)))
+    return key
+
+
+def _render_districts(out_dir, key, boundaries, names, values, vmin, vmax):
+    z, x, y = map(int, key.split('/'))
+    lat, lng = tile_pixel_centers(z, x, y)
+    district = boundaries.assign(lat.ravel(), lng.ravel())
+    pixel_values = pd.Series(district).map(dict(zip(names, values))).to_numpy(dtype=np.float64)
+    _write_tile(out_dir, key, colorize(pixel_values.reshape(TILE_SIZE, TILE_SIZE), vmin, vmax))
+    return key
+
+
+def _load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, sort_keys=True)
+
+
+def _run(out_dir, tasks, render, workers):
+    """Рендерит задачи (key, digest, args), пропуская тайлы с неизменным хешем.
+
+    Тайлы из манифеста, которых нет среди tasks, удаляются. Манифест
+    сохраняется и при ошибке рендеринга - с хешами уже готовых тайлов.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+    current = {key for key, _, _ in tasks}
+    stale = [key for key in manifest if key not in current]
+    for key in stale:
+        path = os.path.join(out_dir, f'{key}.png')
+        if os.path.exists(path):
+            os.remove(path)
+        del manifest[key]
+
+    pending = [
+        (key, digest, args) for key, digest, args in tasks
+        if manifest.get(key) != digest
+        or not os.path.exists(os.path.join(out_dir, f'{key}.png'))
+    ]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render, out_dir, key, *args): (key, digest)
+                       for key, digest, args in pending}
+            for future in as_completed(futures):
+                future.result()
+                key, digest = futures[future]
+                manifest[key] = digest
+    finally:
+        _save_manifest(out_dir, manifest)
+    return {'rendered': len(pending), 'skipped': len(tasks) - len(pending), 'removed': len(stale)}
+
+
+def export_density_tiles(data, out_dir, zooms=range(9, 15), workers=None):
+    """Экспортирует тайлы плотности заведений по столбцам lat/lng.
+
+    Возвращает словарь с кол-вом отрендеренных и пропущенных тайлов.
+    """
+    lat = data['lat'].to_numpy(dtype=np.float64)
+    lng = data['lng'].to_numpy(dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lng)
+    lat, lng = lat[valid], lng[valid]
+
+    tasks = []
+    for z in zooms:
+        x, y = mercator_pixels(lat, lng, z)
+        x, y = x.astype(np.int64), y.astype(np.int64)
+        # максимум заведений в одном пикселе - общая шкала для всех тайлов уровня
+        _, pixel_counts = np.unique(x << 32 | y, return_counts=True)
+        vmax = int(pixel_counts.max()) if len(pixel_counts) else 1
+
+        tile = (x // TILE_SIZE) << 32 | (y // TILE_SIZE)
+        order = np.argsort(tile, kind='stable')
+        tile, x, y = tile[order], x[order], y[order]
+        starts = np.flatnonzero(np.r_[True, tile[1:] != tile[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(tile)]):
+            tx, ty = int(tile[start] >> 32), int(tile[start] & 0xFFFFFFFF)
+            px = (x[start:stop] % TILE_SIZE).astype(np.int16)
+            py = (y[start:stop] % TILE_SIZE).astype(np.int16)
+            key = f'{z}/{tx}/{ty}'
+            digest = _digest(np.sort(px.astype(np.int32) << 16 | py).tobytes(), vmax)
+            tasks.append((key, digest, (px, py, vmax)))
+    return _run(out_dir, tasks, _render_density, workers)
+
+
+def export_district_tiles(metric, boundaries, out_dir, zooms=range(9, 13), workers=None):
+    """Экспортирует тайлы заливки округов значениями metric (Series: округ -> значение).
+
+    boundaries - places.districts.DistrictBoundaries. Тайлу передаются и
+    входят в его хеш только округа, рамка которых пересекает тайл, поэтому
+    изменение одного округа перерисовывает только его тайлы; тайлы без
+    округов не создаются.
+    """
+    metric = metric.dropna()
+    metric = pd.Series(metric.to_numpy(dtype=np.float64), index=[str(name) for name in metric.index])
+    vmin, vmax = float(metric.min()), float(metric.max())
+    bbox = boundaries.bbox
+
+    min_lng, min_lat = boundaries.bbox[:, 0].min(), boundaries.bbox[:, 1].min()
+    max_lng, max_lat = boundaries.bbox[:, 2].max(), boundaries.bbox[:, 3].max()
+    tasks = []
+    for z in zooms:
+        x0, y0 = mercator_pixels(max_lat, min_lng, z)
+        x1, y1 = mercator_pixels(min_lat, max_lng, z)
+        for tx in range(int(x0) // TILE_SIZE, int(x1) // TILE_SIZE + 1):
+            for ty in range(int(y0) // TILE_SIZE, int(y1) // TILE_SIZE + 1):
+                left, bottom, right, top = tile_bounds(z, tx, ty)
+                hits = np.flatnonzero((bbox[:, 0] <= right) & (bbox[:, 2] >= left)
+                                      & (bbox[:, 1] <= top) & (bbox[:, 3] >= bottom))
+                if not len(hits):
+                    continue
+                local = boundaries.take(hits)
+                names = [str(name) for name in local.names]
+                values = metric.reindex(names).to_numpy()
+                key = f'{z}/{tx}/{ty}'
+                digest = _digest(local.edges.tobytes(), local.offsets.tobytes(), names,
+                                 values.tobytes(), vmin, vmax, key)
+                tasks.append((key, digest, (local, names, values, vmin, vmax)))
+    return _run(out_dir, tasks, _render_districts, workers)
@@ -0,0 +1,220 @@
+# coding: utf-8
+"""Топ-N сущностей (сетей, улиц) с разбивкой по категориям без слияний таблиц.
+
+В скрипте топ сетей считается группировкой chain_rest, затем топ снова
+сливается со всем датасетом (rest_top_data) и группируется по категориям.
+top_entities делает то же по кодам factorize: кол-ва сущностей - один
+bincount, разбивка топа по категориям - bincount по строкам топа,
+выбранным через массив «код сущности -> место в топе». Промежуточные
+таблицы размером с датасет не создаются.
+
+Для неограниченных потоков SpaceSaving хранит не больше capacity
+сущностей (алгоритм Space-Saving): оценка кол-ва завышена не больше чем
+на error, а любая сущность с частотой больше total / capacity гарантированно
+остаётся в сводке. Сводки частей складываются (merge), поэтому части
+потока можно обрабатывать параллельно.
+"""
+
+import heapq
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from places.loader import DEFAULT_PATH
+from places.streaming import DEFAULT_CHUNKSIZE, iter_preprocessed
+
+# top - сущность и кол-во, by_category - разбивка сущностей топа по категориям
+TopN = namedtuple('TopN', ['top', 'by_category'])
+
+
+def _top_codes(counts, n):
+    """Коды с наибольшими counts > 0 по убыванию (при равенстве - по коду)."""
+    candidates = np.flatnonzero(counts > 0)
+    if n is not None and len(candidates) > 4 * n:
+        # частичный отбор: сортируются только коды не меньше n-го значения
+        kth = np.partition(counts[candidates], len(candidates) - n)[len(candidates) - n]
+        candidates = candidates[counts[candidates] >= kth]
+    order = candidates[np.argsort(-counts[candidates], kind='stable')]
+    return order if n is None else order[:n]
+
+
+def top_entities(keys, categories=None, n=15, rank_mask=None):
+    """Топ n значений keys по кол-ву строк и их разбивка по categories.
+
+    keys и categories - Series одной длины (например name и category).
+    rank_mask - строки, учитываемые в рейтинге (None - все); разбивка по
+    категориям считается по всем строкам сущностей топа, как rest_top_data
+    в скрипте. Возвращает TopN: top со столбцами <keys.name>, count и
+    by_category со столбцами <keys.name>, <categories.name>, count_cat,
+    count_<keys.name> (пустая таблица, если categories не заданы).
+    """
+    key_name = keys.name or 'key'
+    key_codes, key_values = pd.factorize(keys, sort=True)
+    valid = key_codes >= 0
+    ranked = valid if rank_mask is None else valid & np.asarray(rank_mask, dtype=bool)
+    counts = np.bincount(key_codes[ranked], minlength=len(key_values))
+    top_codes = _top_codes(counts, n)
+    top = pd.DataFrame({key_name: key_values[top_codes], 'count': counts[top_codes]})
+    if categories is None:
+        return TopN(top, pd.DataFrame())
+
+    category_name = categories.name or 'category'
+    category_codes, category_values = pd.factorize(categories)
+    # место сущности в топе (-1 - не в топе); код пропуска -1 попадает в последний элемент
+    slot = np.full(len(key_values) + 1, -1, dtype=np.int64)
+    slot[top_codes] = np.arange(len(top_codes))
+    row_slot = slot[key_codes]
+    rows = (row_slot >= 0) & (category_codes >= 0)
+    n_categories = len(category_values)
+    cells = np.bincount(row_slot[rows] * n_categories + category_codes[rows],
+                        minlength=len(top_codes) * n_categories)
+    cell_slot, cell_category = np.divmod(np.flatnonzero(cells), n_categories)
+    by_category = pd.DataFrame({
+        key_name: top[key_name].to_numpy()[cell_slot],
+        category_name: np.asarray(category_values)[cell_category],
+        'count_cat': cells[cells > 0],
+        f'count_{key_name}': top['count'].to_numpy()[cell_slot],
+    })
+    by_category = by_category.sort_values([f'count_{key_name}', 'count_cat'], ascending=False,
+                                          ignore_index=True, kind='stable')
+    return TopN(top, by_category)
+
+
+def category_totals(by_category, category='category'):
+    """Кол-во заведений сущностей топа по категориям (как rest_top_cat в скрипте)."""
+    return (by_category.groupby(category, observed=True)['count_cat'].sum().rename('count')
+            .reset_index().sort_values('count', ascending=False, ignore_index=True))
+
+
+class SpaceSaving:
+    """Сводка самых частых значений потока с ограниченной памятью (Space-Saving).
+
+    count - оценка кол-ва (не меньше истинного), error - на сколько она
+    может быть завышена. Кол-ва по категориям считаются с момента, когда
+    значение попало в сводку, поэтому это нижние оценки.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self.categories = {}
+        self._heap = []
+
+    def _push(self, key):
+        heapq.heappush(self._heap, (self.counts[key], key))
+        # устаревшие записи кучи удаляются перестройкой, чтобы куча не росла
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key
+
+    def _add(self, key, weight):
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0
+        else:
+            # вытесняется значение с наименьшей оценкой, новое наследует её как ошибку
+            victim = self._pop_min()
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.categories.pop(victim, None)
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        self._push(key)
+
+    def update(self, keys, categories=None):
+        """Добавляет часть потока: Series значений и, если нужно, их категорий."""
+        keys = pd.Series(np.asarray(keys, dtype=object))
+        valid = keys.notna().to_numpy()
+        self.total += int(valid.sum())
+        batch = keys[valid].value_counts(sort=True)
+        # тяжёлые значения части добавляются первыми и не вытесняются лёгкими
+        for key, weight in zip(batch.index, batch.to_numpy()):
+            self._add(key, int(weight))
+        if categories is None:
+            return self
+        pairs = pd.DataFrame({
+            'key': keys[valid].to_numpy(),
+            'category': np.asarray(categories, dtype=object)[valid],
+        })
+        pairs = pairs[pairs['key'].isin(list(self.counts))]
+        for (key, category), weight in pairs.value_counts().items():
+            counter = self.categories.setdefault(key, {})
+            counter[category] = counter.get(category, 0) + int(weight)
+        return self
+
+    def _floor(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Сводка объединения двух потоков (ошибка - сумма ошибок сводок)."""
+        floors = self._floor(), other._floor()
+        merged = SpaceSaving(self.capacity)
+        merged.total = self.total + other.total
+        estimates = {}
+        for key in set(self.counts) | set(other.counts):
+            # отсутствующее в заполненной сводке значение встречалось не больше её минимума
+            count, error = 0, 0
+            for summary, floor in zip((self, other), floors):
+                count += summary.counts.get(key, floor)
+                error += summary.errors.get(key, floor)
+            estimates[key] = (count, error)
+        kept = heapq.nlargest(self.capacity, estimates.items(), key=lambda item: item[1][0])
+        for key, (count, error) in kept:
+            merged.counts[key] = count
+            merged.errors[key] = error
+            categories = {}
+            for summary in (self, other):
+                for category, weight in summary.categories.get(key, {}).items():
+                    categories[category] = categories.get(category, 0) + weight
+            if categories:
+                merged.categories[key] = categories
+        merged._heap = [(count, key) for key, count in merged.counts.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def top(self, n=15, key_name='key'):
+        """Топ n: столбцы <key_name>, count, error и guaranteed (нижняя оценка кол-ва)."""
+        items = sorted(self.counts.items(), key=lambda item: (-item[1], str(item[0])))[:n]
+        keys = [key for key, _ in items]
+        table = pd.DataFrame({
+            key_name: pd.Series(keys, dtype=object),
+            'count': np.array([count for _, count in items], dtype=np.int64),
+            'error': np.array([self.errors[key] for key in keys], dtype=np.int64),
+        })
+        table['guaranteed'] = table['count'] - table['error']
+        return table
+
+    def top_by_category(self, n=15, key_name='key', category_name='category'):
+        """Разбивка топа n по категориям: <key_name>, <category_name>, count_cat, count_<key_name>."""
+        top = self.top(n, key_name)
+        rows = [
+            (key, category, weight, count)
+            for key, count in zip(top[key_name], top['count'])
+            for category, weight in self.categories.get(key, {}).items()
+        ]
+        table = pd.DataFrame(rows, columns=[key_name, category_name, 'count_cat',
+                                            f'count_{key_name}'])
+        return table.sort_values([f'count_{key_name}', 'count_cat'], ascending=False,
+                                 ignore_index=True, kind='stable')
+
+
+def stream_top(path=DEFAULT_PATH, key='name', category='category', where=None,
+               capacity=1000, chunksize=DEFAULT_CHUNKSIZE):
+    """SpaceSaving по файлу path, прочитанному частями; where - фильтр строк (query)."""
+    summary = SpaceSaving(capacity)
+    for chunk in iter_preprocessed(path, chunksize):
+        if where is not None:
+            chunk = chunk.query(where)
+        summary.update(chunk[key], chunk[category] if category is not None else None)
+    return summary
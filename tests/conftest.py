@@ -0,0 +1,26 @@
+# coding: utf-8
+"""Общие настройки тестов: пакеты places и benchmarks лежат в каталоге «Fast food»."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Fast food')
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def raw_places():
+    """Синтетический датасет по схеме moscow_places.csv (без предобработки)."""
+    from benchmarks.synthetic import make_places
+
+    return make_places(5_000, seed=7)
+
+
+@pytest.fixture(scope='session')
+def places_data(raw_places):
+    """Предобработанный синтетический датасет."""
+    from places.preprocessing import preprocess
+
+    return preprocess(raw_places)
@@ -0,0 +1,45 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+
+from places.avg_bill import middle_prices, parse_avg_bill
+
+
+def test_parse_avg_bill_bounds():
+    parsed = parse_avg_bill(pd.Series([
+        'Средний счёт:1000–1500 ₽',
+        'Средний счёт:от 1000 ₽',
+        'Средний счёт:до 500 ₽',
+        'Цена чашки капучино:2 000 ₽',
+        'Цена бокала пива:400–600 ₽',
+    ]))
+    assert parsed['kind'].tolist() == ['bill', 'bill', 'bill', 'coffee_cup', 'beer']
+    np.testing.assert_array_equal(parsed['low'], [1000, 1000, np.nan, 2000, 400])
+    np.testing.assert_array_equal(parsed['high'], [1500, np.nan, 500, np.nan, 600])
+    np.testing.assert_array_equal(parsed['middle'], [1250, 1000, 500, 2000, 500])
+
+
+def test_unknown_and_missing_are_empty():
+    parsed = parse_avg_bill(pd.Series(['Цена обеда:300 ₽', None, 'без чека'], index=[5, 6, 7]))
+    assert parsed.index.tolist() == [5, 6, 7]
+    assert parsed.isna().all().all()
+
+
+def test_middle_prices_match_source_columns(raw_places):
+    middle = middle_prices(raw_places['avg_bill'])
+    for column in middle.columns:
+        np.testing.assert_allclose(middle[column].to_numpy(dtype=float),
+                                   raw_places[column].to_numpy(dtype=float))
+
+
+def test_non_breaking_space_separators():
+    values = pd.Series([
+        'Средний счёт:1 500–2 000 ₽',
+        'Цена чашки капучино:1 200 ₽',
+        'Средний счёт:от 2 500 ₽',
+    ])
+    for series in (values, values.astype(object)):
+        parsed = parse_avg_bill(series)
+        np.testing.assert_array_equal(parsed['low'], [1500, 1200, 2500])
+        np.testing.assert_array_equal(parsed['high'], [2000, np.nan, np.nan])
+        np.testing.assert_array_equal(parsed['middle'], [1750, 1200, 2500])
@@ -0,0 +1,62 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from benchmarks.bench_pipeline import GROUPBY_TABLES, REQUIRED_STAGES, compare, run_size
+from benchmarks.synthetic import CATEGORIES, DISTRICTS, make_places, write_places_csv
+from places.avg_bill import middle_prices
+from places.loader import SCHEMA, read_csv_typed
+
+
+def test_make_places_is_deterministic():
+    tm.assert_frame_equal(make_places(1_000, seed=4), make_places(1_000, seed=4))
+    assert not make_places(1_000, seed=4).equals(make_places(1_000, seed=5))
+
+
+def test_make_places_follows_schema(raw_places):
+    data = raw_places
+    assert set(SCHEMA) <= set(data.columns)
+    assert set(data['category']) <= set(CATEGORIES)
+    assert set(data['district']) <= set(DISTRICTS)
+    assert data['rating'].between(1, 5).all()
+    # средний чек и цена чашки согласованы со строкой avg_bill
+    middles = middle_prices(data['avg_bill'])
+    for column in ('middle_avg_bill', 'middle_coffee_cup'):
+        np.testing.assert_array_equal(middles[column].to_numpy(), data[column].to_numpy())
+
+
+def test_write_places_csv_in_chunks(tmp_path):
+    path = tmp_path / 'places.csv'
+    write_places_csv(str(path), 2_500, seed=1, chunk_rows=1_000)
+    data = read_csv_typed(str(path))
+    assert len(data) == 2_500
+    tm.assert_series_equal(data['name'].iloc[:1_000],
+                           make_places(1_000, seed=1)['name'], check_names=False)
+
+
+def test_compare_flags_regressions():
+    baseline = {'results': [
+        {'rows': 100, 'stage': 'load', 'seconds': 1.0},
+        {'rows': 100, 'stage': 'cube', 'seconds': 0.001},
+        {'rows': 100, 'stage': 'street', 'seconds': 1.0},
+    ]}
+    records = [
+        {'rows': 100, 'stage': 'load', 'seconds': 1.5},
+        # втрое медленнее, но на 2 мс - шум
+        {'rows': 100, 'stage': 'cube', 'seconds': 0.003},
+        {'rows': 100, 'stage': 'street', 'seconds': 1.1},
+        {'rows': 100, 'stage': 'figures', 'seconds': 9.0},
+    ]
+    table = compare(records, baseline, tolerance=0.25).set_index('stage')
+    assert table['regression'].to_dict() == {'load': True, 'cube': False, 'street': False}
+
+
+def test_run_size_records_every_stage(tmp_path):
+    records = pd.DataFrame(run_size(2_000, str(tmp_path), skip=('figures', 'load_snapshot')))
+    stages = set(records['stage'])
+    assert set(REQUIRED_STAGES) <= stages
+    assert {f'groupby:{name}' for name in GROUPBY_TABLES} <= stages
+    assert {'cube', 'report_tables', 'analysis_tables'} <= stages
+    assert not {'figures', 'load_snapshot', 'load_snapshot_write'} & stages
+    assert (records['rows'] == 2_000).all() and (records['seconds'] >= 0).all()
@@ -0,0 +1,34 @@
+# coding: utf-8
+import copy
+import json
+
+import pandas as pd
+
+from places.choropleth import load_geometry, render_district_metrics
+
+
+def _geojson(path):
+    features = [
+        {'type': 'Feature', 'name': name, 'properties': {},
+         'geometry': {'type': 'Polygon', 'coordinates': [[
+             [lng, 55.6], [lng + 0.2, 55.6], [lng + 0.2, 55.8], [lng, 55.8], [lng, 55.6],
+         ]]}}
+        for name, lng in [('west', 37.3), ('east', 37.7)]
+    ]
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}),
+                    encoding='utf-8')
+    return str(path)
+
+
+def test_geometry_is_parsed_once_and_not_mutated(tmp_path):
+    source = _geojson(tmp_path / 'districts.geojson')
+    geometry = load_geometry(source)
+    assert load_geometry(source) is geometry
+    before = copy.deepcopy(geometry)
+
+    metrics = {'a': pd.Series({'west': 1.0, 'east': 2.0}),
+               'b': pd.Series({'west': 3.0, 'east': 1.0})}
+    m = render_district_metrics(metrics, source=source, layered=True)
+    html = m.get_root().render()
+    assert html.count('"west"') >= 2
+    assert geometry == before
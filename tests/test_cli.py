@@ -0,0 +1,69 @@
+# coding: utf-8
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import places
+
+# каталог «Fast food», из которого пакет импортируется в подпроцессе
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(places.__file__)))
+
+HEAVY = ('plotly', 'seaborn', 'matplotlib', 'folium')
+
+
+def _loaded_after(code):
+    script = f'import sys\n{code}\nprint(" ".join(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    return set(result.stdout.split())
+
+
+def test_import_places_loads_nothing():
+    loaded = _loaded_after('import places')
+    assert 'pandas' not in loaded and 'numpy' not in loaded
+    assert not [name for name in loaded if name.startswith('places.')]
+
+
+def test_cli_import_skips_plotting_libraries():
+    loaded = _loaded_after('import places.cli')
+    assert 'pandas' in loaded
+    assert not [name for name in loaded if name.split('.')[0] in HEAVY]
+
+
+@pytest.mark.parametrize('name', places.__all__)
+def test_exported_names_resolve(name):
+    assert getattr(places, name) is not None
+    assert name in dir(places)
+
+
+def test_unknown_name_raises():
+    with pytest.raises(AttributeError):
+        places.no_such_name
+
+
+def test_report_writes_tables_and_metrics(tmp_path):
+    from benchmarks.synthetic import write_places_csv
+    from places.cli import main
+
+    path = str(tmp_path / 'places.csv')
+    write_places_csv(path, 2_000, 3)
+    metrics = tmp_path / 'metrics.json'
+    assert not main(['report', path, '--out', str(tmp_path / 'report'),
+                     '--metrics', str(metrics)])
+
+    tables = os.listdir(tmp_path / 'report' / 'tables')
+    assert 'street_top.csv' in tables and 'seats_med.csv' in tables
+    stages = [stage['stage'] for stage in json.loads(metrics.read_text())['stages']]
+    assert {'load', 'preprocess', 'analysis', 'save_tables'} <= set(stages)
+
+
+def test_cities_reports_failures(tmp_path, capsys):
+    from places.cli import main
+
+    config = tmp_path / 'cities.json'
+    config.write_text(json.dumps([{'name': 'нигде', 'data_path': 'missing.csv'}]))
+    assert main(['cities', str(config), '--out', str(tmp_path / 'reports'), '--workers', '1']) == 1
+    assert 'нигде' in capsys.readouterr().out
@@ -0,0 +1,68 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from places.cube import PlacesCube, report_tables
+from places.sketches import EXACT, QuantileSketches
+
+
+def test_report_tables_match_groupby(places_data):
+    data = places_data
+    tables = report_tables(PlacesCube.build(data, sketch_alpha=EXACT))
+
+    seats_med = (data.groupby('category').agg(median=('seats', 'median')).reset_index()
+                 .sort_values('median', ascending=False, ignore_index=True))
+    tm.assert_frame_equal(tables['seats_med'], seats_med, check_dtype=False)
+
+    avg_bill = (data.groupby('district').agg(median=('middle_avg_bill', 'median')).reset_index()
+                .sort_values('median', ascending=False, ignore_index=True))
+    tm.assert_frame_equal(tables['avg_bill'], avg_bill, check_dtype=False)
+
+    coffee = data[data['category'] == 'кофейня']
+    median_bill_coffe = (coffee.groupby('district').agg(median=('middle_coffee_cup', 'median'))
+                         .reset_index().sort_values('median', ascending=False, ignore_index=True)
+                         .round(2))
+    tm.assert_frame_equal(tables['median_bill_coffe'], median_bill_coffe, check_dtype=False)
+
+    # порядок строк как у groupby в скрипте
+    data_is_24 = data.groupby(['category', 'is_24/7']).agg(count=('name', 'count')).reset_index()
+    tm.assert_frame_equal(tables['data_is_24'], data_is_24, check_dtype=False)
+
+    rating_mean = (data.groupby('category').agg(rating_mean=('rating', 'mean')).reset_index()
+                   .round(2).sort_values('rating_mean', ascending=False, ignore_index=True))
+    tm.assert_frame_equal(tables['rating_mean'], rating_mean, check_dtype=False)
+
+
+def _by_cell(cube, stats):
+    table = cube.aggregate(cube.dimensions, stats)
+    return table.sort_values(cube.dimensions, ignore_index=True)
+
+
+def test_merge_and_subtract_match_full_build(places_data):
+    stats = ['count', 'seats_count', 'seats_sum', 'rating_mean', 'seats_median',
+             'middle_avg_bill_p90']
+    full = PlacesCube.build(places_data, sketch_alpha=EXACT)
+    head, tail = places_data.iloc[:3000], places_data.iloc[3000:]
+
+    merged = PlacesCube.build(head, sketch_alpha=EXACT).merge(
+        PlacesCube.build(tail, sketch_alpha=EXACT))
+    tm.assert_frame_equal(_by_cell(merged, stats), _by_cell(full, stats), check_dtype=False)
+
+    subtracted = full.merge(PlacesCube.build(tail, sketch_alpha=EXACT), sign=-1)
+    expected = PlacesCube.build(head, sketch_alpha=EXACT)
+    tm.assert_frame_equal(_by_cell(subtracted, stats), _by_cell(expected, stats),
+                          check_dtype=False)
+
+
+def test_sketch_quantiles_within_alpha():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(7, 1, 20_000)
+    cell = rng.integers(0, 4, len(values))
+    group = np.arange(4)
+    for q in (0.1, 0.5, 0.9):
+        expected = pd.Series(values).groupby(cell).quantile(q).to_numpy()
+        exact = QuantileSketches.from_values(cell, values, EXACT).quantile(group, 4, q)
+        np.testing.assert_allclose(exact, expected)
+        approx = QuantileSketches.from_values(cell, values, 0.01).quantile(group, 4, q)
+        assert np.all(np.abs(approx - expected) <= 0.01 * expected + 1e-9)
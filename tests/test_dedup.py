@@ -0,0 +1,74 @@
+# coding: utf-8
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from places.dedup import (
+    _blocks, _trigrams, base_keys, infer_chains, name_keys, representative_clusters,
+    similar_pairs,
+)
+
+
+def test_base_keys_strip_numbering():
+    keys = name_keys(pd.Series(['Столовая № 5', 'Кафе Уют 12', 'Кафе «Уют»', '1', 'Bar 24 7']))
+    assert base_keys(keys).tolist() == ['СТОЛОВАЯ', 'КАФЕ УЮТ', 'КАФЕ УЮТ', '1', 'BAR']
+
+
+def test_similar_pairs_match_python_dice(places_data):
+    keys = list(base_keys(name_keys(places_data['name'])).dropna().unique())
+    expected = set()
+    for members in _blocks(keys, 500):
+        for i, j in combinations(sorted(members), 2):
+            a, b = _trigrams(keys[i]), _trigrams(keys[j])
+            if 2 * len(a & b) >= 0.8 * (len(a) + len(b)):
+                expected.add((i, j))
+    left, right = similar_pairs(keys, 0.8)
+    assert set(zip(left.tolist(), right.tolist())) == expected
+
+
+def test_clusters_do_not_chain_through_members():
+    # 0~1 и 1~2, но 0 и 2 не похожи: 2 не попадает в кластер представителя 0
+    labels = representative_clusters(4, np.array([0, 1]), np.array([1, 2]), order=[0, 1, 2, 3])
+    assert labels.tolist() == [0, 0, 2, 3]
+
+
+def test_infer_chains_merges_spellings_not_homonyms():
+    data = pd.DataFrame({
+        'name': ['Кофемания', 'КОФЕМАНИЯ!', 'Кофемания 3', 'Кофе Мания',
+                 'Кафе Уют', 'Кафе Уют 12', 'Кафе Уют'],
+        'chain': [1, 1, 0, 1, 0, 0, 0],
+        'lat': [55.70, 55.72, 55.74, 55.76, 55.70, 55.75, 55.80],
+        'lng': [37.60, 37.60, 37.60, 37.60, 37.50, 37.55, 37.60],
+    })
+    chains = infer_chains(data)
+    assert chains['chain_id'].iloc[:4].nunique() == 1
+    assert (chains['chain_name'].iloc[:4] == 'Кофемания').all()
+    assert chains['inferred_chain'].tolist() == [1, 1, 1, 1, 0, 0, 0]
+
+
+def test_inferred_share_close_to_flag(places_data):
+    chains = infer_chains(places_data)
+    assert abs(chains['inferred_chain'].mean() - places_data['chain'].mean()) < 0.02
+    bases = base_keys(chains['name_key'])
+    assert bases.groupby(chains['chain_id']).nunique().max() <= 3
+
+
+def test_analysis_tables_use_inferred_flag(places_data):
+    from places.analysis import analysis_tables
+
+    # у каждого пятого сетевого заведения флаг chain потерян
+    data = places_data.copy()
+    data.loc[data.index[(data['chain'] == 1).to_numpy()][::5], 'chain'] = 0
+    chains = infer_chains(data)
+    inferred = data[chains['inferred_chain'] == 1]
+    assert len(inferred) > (data['chain'] == 1).sum()
+
+    tables = analysis_tables(data)
+    expected = inferred.groupby('category', observed=True).size()
+    result = tables['chain_rest_cat'].set_index('category')['count']
+    assert result.sort_index().tolist() == expected.sort_index().tolist()
+
+    names = chains.loc[inferred.index, 'chain_name'].value_counts()
+    assert tables['rest_top']['count'].tolist() == names.iloc[:15].tolist()
+    assert tables['data_chain'].set_index('chain')['count'][1] == len(inferred)
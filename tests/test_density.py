@@ -0,0 +1,56 @@
+# coding: utf-8
+import numpy as np
+
+from places.density import _gaussian_kernel, hexbin, kde_surface, kde_surfaces
+from places.spatial import EARTH_RADIUS
+
+
+def test_kde_preserves_total_weight(places_data):
+    cell = 100.0
+    surface = kde_surface(places_data, weights='seats', bandwidth=300, cell=cell)
+    total = places_data['seats'].fillna(0).sum()
+    np.testing.assert_allclose(surface.values.sum() * cell * cell / 1e6, total, rtol=1e-9)
+
+
+def test_group_surfaces_add_up(places_data):
+    surfaces = kde_surfaces(places_data, by=['category', 'chain'])
+    total = kde_surface(places_data)
+    assert len(surfaces) == places_data.groupby(['category', 'chain']).ngroups
+    np.testing.assert_allclose(sum(s.values for s in surfaces.values()), total.values,
+                               atol=1e-9)
+
+
+def test_kde_matches_direct_convolution(places_data):
+    data = places_data.iloc[:40]
+    cell, bandwidth = 100.0, 200.0
+    surface = kde_surface(data, bandwidth=bandwidth, cell=cell)
+    lat_step = np.degrees(cell / EARTH_RADIUS)
+    lng_step = surface.lng[1] - surface.lng[0]
+    kernel = _gaussian_kernel(bandwidth, cell)
+    half = kernel.shape[0] // 2
+
+    expected = np.zeros_like(surface.values)
+    rows = np.floor((data['lat'].to_numpy() - surface.lat[0]) / lat_step + 0.5).astype(int)
+    cols = np.floor((data['lng'].to_numpy() - surface.lng[0]) / lng_step + 0.5).astype(int)
+    for row, col in zip(rows, cols):
+        expected[row - half:row + half + 1, col - half:col + half + 1] += kernel
+    np.testing.assert_allclose(surface.values, expected / (cell * cell / 1e6), atol=1e-9)
+
+
+def test_hexbin_assigns_nearest_center(places_data):
+    size = 250.0
+    cells = hexbin(places_data, size=size)
+    assert cells['count'].sum() == len(places_data)
+
+    lat0 = places_data['lat'].mean()
+    cos0 = np.cos(np.radians(lat0))
+
+    def metres(lat, lng):
+        return (np.radians(np.asarray(lng)) * cos0 * EARTH_RADIUS,
+                np.radians(np.asarray(lat)) * EARTH_RADIUS)
+
+    px, py = metres(places_data['lat'].to_numpy()[:300], places_data['lng'].to_numpy()[:300])
+    cx, cy = metres(cells['lat'].to_numpy(), cells['lng'].to_numpy())
+    nearest = np.hypot(px[:, None] - cx[None, :], py[:, None] - cy[None, :]).min(axis=1)
+    # центр ближайшего шестиугольника не дальше радиуса описанной окружности
+    assert nearest.max() <= size + 1e-6
@@ -0,0 +1,109 @@
+# coding: utf-8
+import json
+import socket
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from places.districts import DistrictBoundaries, cached_geojson, fill_districts
+
+GEOJSON = {'type': 'FeatureCollection', 'features': [
+    # квадрат с дыркой
+    {'properties': {'name': 'A'}, 'geometry': {'type': 'Polygon', 'coordinates': [
+        [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]],
+        [[1, 1], [1, 2], [2, 2], [2, 1], [1, 1]],
+    ]}},
+    # два треугольника, один из них в дырке квадрата
+    {'properties': {'name': 'B'}, 'geometry': {'type': 'MultiPolygon', 'coordinates': [
+        [[[5, 0], [8, 0], [5, 3], [5, 0]]],
+        [[[1.2, 1.2], [1.8, 1.2], [1.2, 1.8], [1.2, 1.2]]],
+    ]}},
+    {'properties': {'name': 'пусто'}, 'geometry': {'type': 'Point', 'coordinates': [9, 9]}},
+]}
+
+
+def _inside(point, rings):
+    # обычный построчный ray casting по всем кольцам
+    x, y = point
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def _expected(lat, lng):
+    result = []
+    for point in zip(lng, lat):
+        name = None
+        for feature in GEOJSON['features'][:2]:
+            geometry = feature['geometry']
+            polygons = ([geometry['coordinates']] if geometry['type'] == 'Polygon'
+                        else geometry['coordinates'])
+            if any(_inside(point, polygon) for polygon in polygons):
+                name = feature['properties']['name']
+                break
+        result.append(name)
+    return result
+
+
+def test_assign_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lng, lat = rng.uniform(-1, 9, 3_000), rng.uniform(-1, 5, 3_000)
+    lat[:5] = np.nan
+    boundaries = DistrictBoundaries.from_geojson(GEOJSON)
+    assert boundaries.names.tolist() == ['A', 'B']
+    assert boundaries.assign(lat, lng).tolist() == _expected(lat, lng)
+    # точка в дырке квадрата попадает в треугольник внутри неё
+    assert boundaries.assign([1.3], [1.3]).tolist() == ['B']
+
+
+def test_take_and_npz_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    lng, lat = rng.uniform(-1, 9, 1_000), rng.uniform(-1, 5, 1_000)
+    boundaries = DistrictBoundaries.from_geojson(GEOJSON)
+
+    only_b = boundaries.take([1]).assign(lat, lng)
+    full = boundaries.assign(lat, lng)
+    assert [name for name in only_b if name] == [name for name in full if name == 'B']
+
+    path = tmp_path / 'districts.npz'
+    boundaries.save_npz(str(path))
+    assert DistrictBoundaries.load_npz(str(path)).assign(lat, lng).tolist() == full.tolist()
+
+
+def test_load_caches_local_file(tmp_path):
+    source = tmp_path / 'districts.geojson'
+    source.write_text(json.dumps(GEOJSON), encoding='utf-8')
+    cache_dir = tmp_path / 'cache'
+    first = DistrictBoundaries.load(str(source), str(cache_dir))
+    assert len(list(cache_dir.glob('*.npz'))) == 1
+    second = DistrictBoundaries.load(str(source), str(cache_dir))
+    np.testing.assert_array_equal(first.edges, second.edges)
+
+
+def test_download_timeout(tmp_path, monkeypatch):
+    # сервер принимает соединение, но ничего не отвечает
+    monkeypatch.setattr('places.districts.DOWNLOAD_TIMEOUT', 0.2)
+    with socket.socket() as server:
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        source = f'http://127.0.0.1:{server.getsockname()[1]}/districts.geojson'
+        with pytest.raises(OSError, match='districts.geojson'):
+            cached_geojson(source, str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fill_districts():
+    boundaries = DistrictBoundaries.from_geojson(GEOJSON)
+    data = pd.DataFrame({
+        'lat': [0.5, 0.5, 0.5, 10.0],
+        'lng': [0.5, 5.5, 3.5, 10.0],
+        'district': pd.Categorical([None, 'A', 'A', None]),
+    }, index=[4, 2, 9, 1])
+    district, mismatch = fill_districts(data, boundaries)
+    assert district.tolist()[:3] == ['A', 'A', 'A'] and pd.isna(district.iloc[3])
+    assert mismatch.tolist() == [False, True, False, False]
+    assert district.index.equals(data.index)
@@ -0,0 +1,35 @@
+# coding: utf-8
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from places.figures import MANIFEST, FigureSpec, render_figures
+
+
+def _specs(broken=False):
+    table = pd.DataFrame({'category': ['кафе', 'бар'], 'count': [3, 1]})
+    return [
+        FigureSpec('bars', 'bar', table, {'x': 'category', 'y': 'count'}),
+        FigureSpec('broken', 'unknown' if broken else 'bar', table,
+                   {'x': 'category', 'y': 'count'}),
+        FigureSpec('violin', 'violin', table, {'x': 'category', 'y': 'count'}),
+    ]
+
+
+def test_unchanged_figures_are_skipped(tmp_path):
+    out = str(tmp_path)
+    assert render_figures(_specs(), out, ['html'], workers=1) == {'rendered': 3, 'skipped': 0}
+    assert render_figures(_specs(), out, ['html'], workers=1) == {'rendered': 0, 'skipped': 3}
+
+
+def test_manifest_saved_when_one_figure_fails(tmp_path):
+    out = str(tmp_path)
+    with pytest.raises(ValueError):
+        render_figures(_specs(broken=True), out, ['html'], workers=2)
+    with open(os.path.join(out, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert sorted(manifest) == ['bars.html', 'violin.html']
+    # готовые графики не рендерятся заново
+    assert render_figures(_specs(), out, ['html'], workers=1) == {'rendered': 1, 'skipped': 2}
@@ -0,0 +1,44 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pytest
+
+from places.hours import (
+    SLOTS_PER_DAY, hours_bitmap, open_at, open_during, parse_hours, week_mask,
+)
+
+
+def open_per_day(text):
+    """Кол-во открытых получасовых слотов по дням недели."""
+    week = np.unpackbits(np.frombuffer(parse_hours(text), dtype=np.uint8))
+    return week.reshape(7, SLOTS_PER_DAY).sum(axis=1).tolist()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('ежедневно, круглосуточно', [48] * 7),
+    ('ежедневно, 10:00–22:00', [24] * 7),
+    ('пн-пт 09:00–18:00', [18] * 5 + [0, 0]),
+    ('пн-пт 09:00–18:00, перерыв 13:00–14:00; сб,вс 10:00–20:00', [16] * 5 + [20, 20]),
+    ('пн-чт 12:00–00:00; пт,сб 12:00–02:00; вс выходной', [24] * 5 + [28, 4]),
+    ('пн-пт 10:00–20:00, сб,вс выходные', [20] * 5 + [0, 0]),
+    ('по выходным 10:00–18:00', [0] * 5 + [16, 16]),
+    ('выходные 10:00–18:00', [0] * 5 + [16, 16]),
+    ('без выходных 10:00–22:00', [24] * 7),
+    ('по будням 08:00–20:00', [24] * 5 + [0, 0]),
+])
+def test_parse_hours_phrases(text, expected):
+    assert open_per_day(text) == expected
+
+
+def test_intervals_belong_to_preceding_days():
+    assert open_per_day('пн 10:00–12:00, вт 14:00–16:00') == [4, 4, 0, 0, 0, 0, 0]
+    bitmap = hours_bitmap(['пн 10:00–12:00, вт 14:00–16:00'])
+    assert open_at(bitmap, 'пн', '11:00')[0]
+    assert not open_at(bitmap, 'пн', '15:00')[0]
+    assert open_at(bitmap, 'вт', '15:00')[0]
+
+
+def test_unparsed_and_missing_hours_are_closed():
+    bitmap = hours_bitmap(pd.Series(['по записи', None, 'ежедневно, 10:00–22:00']))
+    assert bitmap[:2].sum() == 0
+    assert open_during(bitmap, week_mask('пт', '12:00', '14:00')).tolist() == [False, False, True]
@@ -0,0 +1,45 @@
+# coding: utf-8
+import pandas as pd
+import pandas.testing as tm
+
+from places.cube import PlacesCube, report_tables
+from places.incremental import IncrementalReport
+from places.preprocessing import preprocess
+from places.sketches import EXACT
+
+
+def _next_snapshot(raw):
+    """Снимок на следующий день: часть строк удалена, часть изменена, часть добавлена."""
+    snapshot = raw.drop(index=raw.index[:300]).copy()
+    changed = snapshot.index[:200]
+    snapshot.loc[changed, 'seats'] = snapshot.loc[changed, 'seats'].fillna(0) + 1
+    recategorized = snapshot.index[200:250]
+    coffee = snapshot.loc[recategorized, 'category'] == 'кофейня'
+    snapshot.loc[recategorized, 'category'] = coffee.map({True: 'бар,паб', False: 'кофейня'})
+    added = raw.iloc[:100].copy()
+    added['address'] = added['address'] + 'Б'
+    return pd.concat([snapshot, added], ignore_index=True)
+
+
+def test_apply_matches_rebuild(raw_places):
+    # без повторов названия и адреса удаление не перенумеровывает ключи оставшихся строк
+    raw_places = raw_places.drop_duplicates(['name', 'address'], ignore_index=True)
+    report = IncrementalReport.build(raw_places, sketch_alpha=EXACT)
+    snapshot = _next_snapshot(raw_places)
+    diff = report.apply(snapshot)
+
+    assert (len(diff.added), len(diff.removed), len(diff.changed)) == (100, 300, 250)
+    assert len(report.data) == len(snapshot)
+
+    rebuilt = PlacesCube.build(preprocess(snapshot), sketch_alpha=EXACT)
+    expected, actual = report_tables(rebuilt), report_tables(report.cube)
+    for name in expected:
+        tm.assert_frame_equal(actual[name], expected[name], check_dtype=False,
+                              check_categorical=False, obj=name)
+
+
+def test_apply_same_snapshot_is_noop(raw_places):
+    report = IncrementalReport.build(raw_places)
+    diff = report.apply(raw_places)
+    assert not (len(diff.added) or len(diff.removed) or len(diff.changed))
+    tm.assert_frame_equal(report.cube.cells, IncrementalReport.build(raw_places).cube.cells)
@@ -0,0 +1,88 @@
+# coding: utf-8
+import json
+
+import numpy as np
+import pandas as pd
+
+from places.instrument import DISABLED, Instrumentation, count_rows
+
+
+def _work():
+    return sum(i * i for i in range(20_000))
+
+
+def test_nested_stages_and_rows():
+    instrument = Instrumentation(labels={'city': 'Москва'})
+    with instrument.stage('analysis', rows_in=10) as stage:
+        instrument.call('cube', lambda data: data.head(3), pd.DataFrame({'a': range(10)}))
+        with instrument.stage('streets'):
+            _work()
+        stage.rows_out = 4
+
+    cube, streets, analysis = instrument.records
+    assert [cube.stage, streets.stage, analysis.stage] == ['analysis/cube', 'analysis/streets',
+                                                            'analysis']
+    assert (cube.rows_in, cube.rows_out) == (10, 3)
+    assert (analysis.rows_in, analysis.rows_out) == (10, 4)
+    assert analysis.wall_seconds >= streets.wall_seconds >= 0
+    assert analysis.profile is None and analysis.traced_peak_bytes is None
+
+
+def test_failed_stage_is_recorded():
+    instrument = Instrumentation()
+    try:
+        with instrument.stage('load'):
+            raise OSError('нет файла')
+    except OSError:
+        pass
+    assert [record.stage for record in instrument.records] == ['load']
+    assert not instrument._stack
+
+
+def test_profile_and_memory_trace_top_level_only():
+    instrument = Instrumentation(profile=True, trace_memory=True, top=5)
+    with instrument.stage('outer'):
+        with instrument.stage('inner'):
+            np.ones(1_000_000)
+        _work()
+    inner, outer = instrument.records
+    assert inner.profile is None and inner.allocations is None
+    assert 0 < len(outer.profile) <= 5 and len(outer.allocations) <= 5
+    # массив NumPy виден tracemalloc
+    assert outer.traced_peak_bytes >= 8_000_000
+
+
+def test_export_formats(tmp_path):
+    instrument = Instrumentation(labels={'city': 'Мос"ква'})
+    instrument.call('load', _work)
+    data = json.loads(instrument.to_json())
+    assert data['labels'] == {'city': 'Мос"ква'}
+    assert set(data['stages'][0]) == {'stage', 'wall_seconds', 'cpu_seconds', 'rows_in',
+                                      'rows_out', 'memory_delta_bytes'}
+
+    text = instrument.to_openmetrics()
+    assert text.endswith('# EOF\n')
+    assert '# TYPE places_stage_wall_seconds gauge' in text
+    assert 'places_stage_wall_seconds{city="Мос\\"ква",stage="load"} ' in text
+    # метрики без значений (rows_in у вызова без аргументов) не выводятся
+    assert 'places_stage_rows_in' not in text
+
+    path = tmp_path / 'metrics.json'
+    instrument.write(str(path))
+    assert json.loads(path.read_text(encoding='utf-8')) == data
+    instrument.write(str(tmp_path / 'metrics.prom'))
+    assert (tmp_path / 'metrics.prom').read_text(encoding='utf-8') == text
+
+
+def test_disabled_records_nothing():
+    with DISABLED.stage('load', rows_in=5) as stage:
+        stage.rows_out = 1
+    assert DISABLED.call('cube', len, [1, 2]) == 2
+    assert DISABLED.records == []
+
+
+def test_count_rows():
+    assert count_rows(pd.DataFrame({'a': [1, 2]})) == 2
+    assert count_rows(np.zeros((3, 2))) == 3
+    assert count_rows({'a': pd.Series([1]), 'b': np.zeros(4), 'c': 'text'}) == 5
+    assert count_rows(7) is None and count_rows({}) is None
@@ -0,0 +1,42 @@
+# coding: utf-8
+import os
+
+import pandas as pd
+import pandas.testing as tm
+
+from places.loader import SCHEMA, load_places, read_csv_chunks, read_csv_typed, snapshot_path
+
+
+def test_read_csv_typed_applies_schema(raw_places, tmp_path):
+    path = tmp_path / 'places.csv'
+    raw_places.drop(columns='price').to_csv(path, index=False)
+    data = read_csv_typed(str(path))
+    for column, dtype in SCHEMA.items():
+        if column != 'price':
+            assert str(data[column].dtype) == dtype, column
+    assert 'price' not in data
+    assert data['seats'].isna().sum() == raw_places['seats'].isna().sum()
+    assert data['seats'].sum() == raw_places['seats'].sum()
+
+    chunks = pd.concat(read_csv_chunks(str(path), chunksize=1_500), ignore_index=True)
+    tm.assert_frame_equal(chunks, data, check_categorical=False)
+
+
+def test_snapshot_cache(raw_places, tmp_path):
+    path = tmp_path / 'places.csv'
+    cache_dir = tmp_path / 'cache'
+    raw_places.to_csv(path, index=False)
+
+    first = load_places(str(path), str(cache_dir))
+    snapshot = snapshot_path(str(path), str(cache_dir))
+    assert os.path.exists(snapshot)
+    tm.assert_frame_equal(load_places(str(path), str(cache_dir)), first)
+
+    # изменённый файл получает новый снимок
+    raw_places.head(100).to_csv(path, index=False)
+    assert snapshot_path(str(path), str(cache_dir)) != snapshot
+    assert len(load_places(str(path), str(cache_dir))) == 100
+    assert len(os.listdir(cache_dir)) == 2
+
+    assert len(load_places(str(path), str(tmp_path / 'unused'), use_cache=False)) == 100
+    assert not os.path.exists(tmp_path / 'unused')
@@ -0,0 +1,43 @@
+# coding: utf-8
+import json
+
+import folium
+import numpy as np
+import pandas as pd
+
+from places.markers import add_cluster_layer, build_clusters, cluster_payload
+
+
+def test_levels_keep_every_venue(places_data):
+    levels = build_clusters(places_data['lat'], places_data['lng'], min_zoom=9, max_zoom=15)
+    assert list(levels) == list(range(9, 17))
+    for clusters in levels.values():
+        assert clusters['count'].sum() == len(places_data)
+    # чем мельче масштаб, тем меньше кластеров
+    sizes = [len(clusters) for clusters in levels.values()]
+    assert sizes == sorted(sizes)
+
+
+def test_points_level_splits_clusters():
+    lat = np.array([55.75, 55.75, 55.7500001, 55.76])
+    lng = np.array([37.62, 37.62, 37.62, 37.63])
+    levels = build_clusters(lat, lng, max_zoom=15)
+    assert levels[15]['count'].max() == 3
+    points = levels[16]
+    assert points['count'].tolist() == [2, 1, 1]
+    assert [list(members) for members in points['members']] == [[0, 1], [2], [3]]
+
+    payload = json.loads(cluster_payload(levels, np.array(['a', 'b', 'c', 'd'])))
+    assert [row[3] for row in payload['16']] == ['a\nb', 'c', 'd']
+    assert all(row[3] is None for row in payload['15'] if row[2] > 1)
+
+
+def test_labels_are_not_html():
+    data = pd.DataFrame({'lat': [55.75, 55.76], 'lng': [37.62, 37.63],
+                         'name': ['</script><script>alert(1)</script>', 'Кафе'],
+                         'rating': [4.5, 4.0]})
+    m = add_cluster_layer(folium.Map(location=[55.75, 37.62]), data)
+    html = m.get_root().render()
+    assert '</script><script>alert(1)' not in html
+    assert '\\u003c/script>' in html
+    assert 'bindPopup(popup(p[3]))' in html
@@ -0,0 +1,44 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from benchmarks.synthetic import make_places
+from places.preprocessing import extract_street, is_24_7, normalize_names, preprocess
+
+
+def test_preprocess_matches_rowwise_script(raw_places):
+    data = preprocess(raw_places)
+    # так столбцы считались в скрипте до векторизации
+    name = raw_places['name'].str.upper().str.strip().str.replace('Ё', 'Е')
+    street = raw_places['address'].apply(lambda x: x.split(',')[1].strip())
+    round_the_clock = raw_places['hours'].apply(
+        lambda x: True if x == 'ежедневно, круглосуточно' else False
+    )
+    tm.assert_series_equal(data['name'], name, check_dtype=False)
+    tm.assert_series_equal(data['street'], street, check_dtype=False, check_names=False)
+    tm.assert_series_equal(data['is_24/7'], round_the_clock, check_names=False)
+    # исходная таблица не меняется
+    assert 'street' not in raw_places
+
+
+def test_missing_values_and_index():
+    index = pd.Index([10, 3, 7, 5])
+    address = pd.Series(['Москва, улица Мира , 5', 'Москва', None, 'Москва,проспект Мира'],
+                        index=index)
+    tm.assert_series_equal(extract_street(address), pd.Series(
+        ['улица Мира', np.nan, np.nan, 'проспект Мира'], index=index, dtype=object),
+        check_dtype=False)
+
+    names = pd.Series([' кофёмания ', None, 'Кофемания'], index=index[:3])
+    assert normalize_names(names).tolist()[::2] == ['КОФЕМАНИЯ', 'КОФЕМАНИЯ']
+    assert pd.isna(normalize_names(names).iloc[1])
+
+    hours = pd.Series(['ежедневно, круглосуточно', None, 'пн-пт 10:00–20:00'])
+    assert is_24_7(hours).tolist() == [True, False, False]
+
+
+def test_missing_street_rows():
+    data = make_places(500, seed=2, missing_street=0.2)
+    street = extract_street(data['address'])
+    assert street.isna().equals(data['address'] == 'Москва')
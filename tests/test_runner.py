@@ -0,0 +1,89 @@
+# coding: utf-8
+import json
+import os
+
+import pytest
+
+from places.runner import failed_cities, load_configs, run_cities
+
+
+def test_load_configs_resolves_local_paths(tmp_path):
+    config_path = tmp_path / 'cities.json'
+    config_path.write_text(json.dumps([
+        {'name': 'a', 'data_path': 'a.csv', 'boundary': 'geo/a.geojson'},
+        {'name': 'b', 'data_path': 'b.csv', 'boundary': 'https://example.org/b.geojson'},
+        {'name': 'c', 'data_path': 'c.csv'},
+    ]), encoding='utf-8')
+    a, b, c = load_configs(str(config_path))
+    assert a.data_path == os.path.join(str(tmp_path), 'a.csv')
+    assert a.boundary == os.path.join(str(tmp_path), 'geo/a.geojson')
+    assert b.boundary == 'https://example.org/b.geojson'
+    assert c.boundary is None
+
+
+def test_failed_city_does_not_abort_run(raw_places, tmp_path):
+    raw_places.to_csv(tmp_path / 'good.csv', index=False)
+    config_path = tmp_path / 'cities.json'
+    config_path.write_text(json.dumps([
+        {'name': 'missing', 'data_path': 'missing.csv'},
+        {'name': 'good', 'data_path': 'good.csv'},
+    ]), encoding='utf-8')
+
+    summary = run_cities(load_configs(str(config_path)), str(tmp_path / 'out'), max_workers=2)
+    assert failed_cities(summary) == ['missing']
+    good = summary.set_index('city').loc['good']
+    assert good['venues'] == len(raw_places)
+    assert os.path.exists(tmp_path / 'out' / 'good' / 'data_cat.csv')
+    assert os.path.exists(tmp_path / 'out' / 'summary.csv')
+
+
+def test_all_cities_failed(tmp_path):
+    config_path = tmp_path / 'cities.json'
+    config_path.write_text(json.dumps([{'name': 'missing', 'data_path': 'missing.csv'}]),
+                           encoding='utf-8')
+    summary = run_cities(load_configs(str(config_path)), str(tmp_path / 'out'), max_workers=1)
+    assert failed_cities(summary) == ['missing']
+    assert os.path.exists(tmp_path / 'out' / 'summary.csv')
+
+
+def _write_config(tmp_path, items):
+    config_path = tmp_path / 'cities.json'
+    config_path.write_text(json.dumps(items), encoding='utf-8')
+    return str(config_path)
+
+
+def test_load_configs_validates_entries(tmp_path):
+    a, = load_configs(_write_config(tmp_path, [
+        {'name': 'a', 'data_path': 'a.csv', 'center': [59.94, 30.31]},
+    ]))
+    assert a.center == (59.94, 30.31)
+
+    for items, message in [
+        ([{'name': 'a', 'data_path': 'a.csv', 'zoom': 10}], 'неизвестные ключи zoom'),
+        ([{'name': 'a'}], 'не заданы data_path'),
+        ([{'name': 'a', 'data_path': 'a.csv', 'center': [59.94]}], 'center'),
+        ([{'name': 'a', 'data_path': 'a.csv'}, {'name': 'a', 'data_path': 'b.csv'}],
+         'город 2'),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            load_configs(_write_config(tmp_path, items))
+
+
+def test_city_maps_use_center(raw_places, tmp_path):
+    raw_places.head(1_000).to_csv(tmp_path / 'spb.csv', index=False)
+    boundary = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'name': 'центр', 'properties': {}, 'geometry': {
+            'type': 'Polygon',
+            'coordinates': [[[37.3, 55.6], [37.9, 55.6], [37.9, 55.9], [37.3, 55.9], [37.3, 55.6]]],
+        }},
+    ]}
+    (tmp_path / 'spb.geojson').write_text(json.dumps(boundary), encoding='utf-8')
+    configs = load_configs(_write_config(tmp_path, [
+        {'name': 'spb', 'data_path': 'spb.csv', 'center': [59.94, 30.31],
+         'boundary': 'spb.geojson'},
+    ]))
+    summary = run_cities(configs, str(tmp_path / 'out'), max_workers=1, maps=True)
+    assert not failed_cities(summary)
+    for name in ('districts.html', 'venues.html'):
+        html = (tmp_path / 'out' / 'spb' / 'maps' / name).read_text(encoding='utf-8')
+        assert '59.94' in html and '30.31' in html
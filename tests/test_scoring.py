@@ -0,0 +1,36 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+
+from places.scoring import candidate_grid, rank_sites, site_features
+from places.spatial import VenueIndex
+
+
+def test_site_features_match_brute_force(places_data):
+    index = VenueIndex.from_frame(places_data)
+    grid = candidate_grid(places_data, step=2000)
+    features = site_features(places_data, grid['lat'], grid['lng'], index=index, batch_size=37)
+
+    x, y = index.project(places_data['lat'], places_data['lng'])
+    qx, qy = index.project(grid['lat'], grid['lng'])
+    coffee = (places_data['category'] == 'кофейня').to_numpy()
+    for i in range(0, len(grid), max(1, len(grid) // 25)):
+        dist = np.hypot(x - qx[i], y - qy[i])
+        assert features.loc[i, 'venues'] == (dist <= 1000).sum()
+        for radius in (250, 500, 1000):
+            assert features.loc[i, f'competitors_{radius}'] == (coffee & (dist <= radius)).sum()
+        near = places_data[coffee & (dist <= 1000)]
+        expected = {
+            'median_bill': near['middle_coffee_cup'].median(),
+            'rating_mean': near['rating'].mean(),
+            'chain_share': near['chain'].mean(),
+            'is_24/7_share': near['is_24/7'].astype(float).mean(),
+        }
+        for column, value in expected.items():
+            np.testing.assert_allclose(features.loc[i, column], value, equal_nan=True)
+
+
+def test_rank_sites_prefers_fewer_competitors():
+    features = pd.DataFrame({'competitors_250': [10, 0, 5], 'venues': [5, 5, 5]})
+    ranked = rank_sites(features, {'competitors_250': -1.0, 'venues': 1.0}, top=2)
+    assert ranked.index.tolist() == [1, 2]
@@ -0,0 +1,116 @@
+# coding: utf-8
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from places.service import (PlacesDataset, PlacesService, QueryCache, QueryError, make_handler,
+                            normalize_query, run_query)
+
+
+def test_normalize_query_ignores_order():
+    first = normalize_query('groupby', {'by': ['district'], 'category': ['бар', 'Кафе'],
+                                        'chain': ['true']})
+    second = normalize_query('groupby', {'chain': ['1'], 'category': ['кафе', 'бар'],
+                                         'by': ['district']})
+    assert first == second
+    with pytest.raises(QueryError):
+        normalize_query('aggregate', {'unknown': ['1']})
+    with pytest.raises(QueryError):
+        normalize_query('groupby', {})
+
+
+def test_filter_limit_bounds():
+    with pytest.raises(QueryError):
+        normalize_query('filter', {'limit': ['-1']})
+    # слишком большой limit урезается до FILTER_LIMIT и делит с ним ключ кеша
+    assert normalize_query('filter', {'limit': ['10000000']}) == normalize_query('filter', {})
+    assert normalize_query('filter', {'limit': ['0']})[-1] == 0
+
+
+def test_run_query_matches_pandas(places_data):
+    dataset = PlacesDataset(places_data)
+    coffee = places_data[places_data['category'] == 'кофейня']
+
+    query = normalize_query('groupby', {'by': ['district'], 'category': ['кофейня'],
+                                        'metric': ['count', 'rating:mean']})
+    result = pd.DataFrame(run_query(dataset, query))
+    expected = (coffee.groupby('district', observed=True)
+                .agg(count=('lat', 'size'), **{'rating:mean': ('rating', 'mean')}).reset_index())
+    expected['district'] = expected['district'].astype(object)
+    tm.assert_frame_equal(result.sort_values('district', ignore_index=True),
+                          expected.sort_values('district', ignore_index=True), check_dtype=False)
+
+    query = normalize_query('aggregate', {'metric': ['is_24/7:mean', 'count'], 'chain': ['1']})
+    chains = places_data[places_data['chain'] == 1]
+    result = run_query(dataset, query)
+    assert result['count'] == len(chains)
+    np.testing.assert_allclose(result['is_24/7:mean'], chains['is_24/7'].mean())
+
+    query = normalize_query('filter', {'category': ['кофейня'], 'columns': ['name'],
+                                       'limit': ['5']})
+    result = run_query(dataset, query)
+    assert result['total'] == len(coffee)
+    assert [row['name'] for row in result['rows']] == coffee['name'].head(5).tolist()
+
+
+def test_query_cache_lru():
+    cache = QueryCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    # вытесняется давно не использованный ключ
+    assert cache.get('b') is None and cache.get('c') == 3
+    assert cache.info() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1}
+
+
+@pytest.fixture
+def server(raw_places, tmp_path):
+    path = tmp_path / 'places.csv'
+    raw_places.to_csv(path, index=False)
+    service = PlacesService(str(path))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield service, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(url, method='GET'):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=method)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_http_cache_and_errors(server, monkeypatch):
+    service, base = server
+    url = f'{base}/groupby?by=category&metric=seats:median'
+    status, first = _request(url)
+    assert status == 200
+    assert _request(url)[1] == first
+    assert service.cache.info()['hits'] == 1
+
+    assert _request(f'{base}/reload', 'POST') == (200, {'rows': len(service.dataset.data),
+                                                        'version': 2})
+    assert service.cache.info()['size'] == 0
+
+    assert _request(f'{base}/groupby?by=name')[0] == 400
+    assert _request(f'{base}/filter?limit=-5')[0] == 400
+    assert _request(f'{base}/nowhere')[0] == 404
+
+    def broken(dataset, query):
+        raise RuntimeError('сбой')
+
+    monkeypatch.setattr('places.service.run_query', broken)
+    status, body = _request(f'{base}/aggregate?metric=count')
+    assert status == 500 and 'сбой' in body['error']
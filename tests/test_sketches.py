@@ -0,0 +1,61 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pytest
+
+from places.sketches import EXACT, QuantileSketches
+
+
+def _state(sketches):
+    return sketches.cell, sketches.bucket, sketches.count
+
+
+def _assert_same(left, right):
+    for a, b in zip(_state(left), _state(right)):
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize('alpha', [EXACT, 0.01, 0.05])
+def test_merge_and_subtract_equal_build_on_combined_data(alpha):
+    rng = np.random.default_rng(5)
+    values = np.r_[rng.lognormal(5, 2, 3000), np.zeros(50), -rng.random(50)]
+    cell = rng.integers(0, 6, len(values))
+    full = QuantileSketches.from_values(cell, values, alpha)
+    head = QuantileSketches.from_values(cell[:1000], values[:1000], alpha)
+    tail = QuantileSketches.from_values(cell[1000:], values[1000:], alpha)
+
+    _assert_same(head.merge(tail), full)
+    _assert_same(full.merge(tail, sign=-1), head)
+    # полное вычитание не оставляет нулевых корзин
+    assert len(full.merge(full, sign=-1).count) == 0
+
+
+def test_relative_error_over_wide_range():
+    rng = np.random.default_rng(11)
+    values = 10 ** rng.uniform(-3, 9, 50_000)
+    cell = rng.integers(0, 8, len(values))
+    for alpha in (0.01, 0.001):
+        sketches = QuantileSketches.from_values(cell, values, alpha)
+        for q in (0.0, 0.25, 0.5, 0.99, 1.0):
+            expected = pd.Series(values).groupby(cell).quantile(q).to_numpy()
+            approx = sketches.quantile(np.arange(8), 8, q)
+            assert np.all(np.abs(approx - expected) <= alpha * expected * (1 + 1e-9))
+
+
+def test_groups_and_empty_cells():
+    cell = np.array([0, 0, 1, 1, 3])
+    values = np.array([1.0, 3.0, -2.0, np.nan, 7.0])
+    sketches = QuantileSketches.from_values(cell, values, EXACT)
+    # ячейки 0 и 1 в группе 0, ячейка 2 пустая, ячейка 3 не входит ни в одну группу
+    group = np.array([0, 0, 1, -1])
+    np.testing.assert_allclose(sketches.quantile(group, 2, 0.5), [1.0, np.nan])
+
+    taken = sketches.take(np.array([False, True, False, True]))
+    np.testing.assert_allclose(taken.quantile(np.arange(2), 2, 0.5), [-2.0, 7.0])
+
+
+def test_merge_requires_same_alpha():
+    cell, values = np.zeros(3, dtype=np.int64), np.arange(1.0, 4.0)
+    with pytest.raises(ValueError):
+        QuantileSketches.from_values(cell, values, 0.01).merge(
+            QuantileSketches.from_values(cell, values, 0.02))
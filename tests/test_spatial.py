@@ -0,0 +1,71 @@
+# coding: utf-8
+import time
+
+import numpy as np
+
+from places.spatial import VenueIndex
+
+
+def brute_force(index, lat, lng, query_lat, query_lng):
+    x, y = index.project(lat, lng)
+    qx, qy = index.project(query_lat, query_lng)
+    return np.hypot(qx[:, None] - x[None, :], qy[:, None] - y[None, :])
+
+
+def test_k_nearest_matches_brute_force(places_data):
+    index = VenueIndex.from_frame(places_data, cell_size=200)
+    rng = np.random.default_rng(1)
+    query_lat = 55.75 + rng.normal(0, 0.1, 300)
+    query_lng = 37.62 + rng.normal(0, 0.15, 300)
+    indices, distances = index.k_nearest(query_lat, query_lng, k=5)
+
+    dist = brute_force(index, places_data['lat'], places_data['lng'], query_lat, query_lng)
+    expected = np.sort(dist, axis=1)[:, :5]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+    np.testing.assert_allclose(np.take_along_axis(dist, indices, axis=1), expected, rtol=1e-9)
+
+
+def test_radius_search_matches_brute_force(places_data):
+    index = VenueIndex.from_frame(places_data)
+    query_lat, query_lng = places_data['lat'].to_numpy()[:200], places_data['lng'].to_numpy()[:200]
+    dist = brute_force(index, places_data['lat'], places_data['lng'], query_lat, query_lng)
+
+    counts = index.count_within(query_lat, query_lng, 700)
+    np.testing.assert_array_equal(counts, (dist <= 700).sum(axis=1))
+    offsets, points, _ = index.within_radius(query_lat, query_lng, 700)
+    for i in range(0, 200, 37):
+        assert set(points[offsets[i]:offsets[i + 1]]) == set(np.flatnonzero(dist[i] <= 700))
+
+
+def test_k_nearest_by_category(places_data):
+    index = VenueIndex.from_frame(places_data)
+    indices, _ = index.k_nearest([55.75], [37.62], k=3, category='кофейня')
+    assert (places_data['category'].to_numpy()[indices[0]] == 'кофейня').all()
+
+
+def test_k_nearest_stops_at_data_extent(places_data):
+    index = VenueIndex.from_frame(places_data, cell_size=100)
+    category = places_data['category'].to_numpy()
+    sparse = np.flatnonzero(category == 'булочная')
+    k = len(sparse) + 3
+    # запросы внутри города и далеко за его пределами
+    query_lat, query_lng = np.array([55.75, 56.5]), np.array([37.62, 39.0])
+    start = time.perf_counter()
+    indices, distances = index.k_nearest(query_lat, query_lng, k=k, category='булочная',
+                                         max_meters=500_000)
+    assert time.perf_counter() - start < 5
+    # найдены все заведения категории, остальные места пустые
+    for row in range(2):
+        assert set(indices[row, :len(sparse)]) == set(sparse)
+        assert (indices[row, len(sparse):] == -1).all()
+        assert np.isinf(distances[row, len(sparse):]).all()
+    dist = brute_force(index, places_data['lat'].to_numpy()[sparse],
+                       places_data['lng'].to_numpy()[sparse], query_lat, query_lng)
+    np.testing.assert_allclose(distances[:, :len(sparse)], np.sort(dist, axis=1), rtol=1e-9)
+
+
+def test_queries_far_outside_grid(places_data):
+    index = VenueIndex.from_frame(places_data)
+    assert index.count_within([60.0], [30.0], 1_000).tolist() == [0]
+    offsets, points, _ = index.within_radius([60.0, 60.1], [30.0, 30.1], 1_000)
+    assert offsets.tolist() == [0, 0, 0] and len(points) == 0
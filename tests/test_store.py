@@ -0,0 +1,41 @@
+# coding: utf-8
+import numpy as np
+import pytest
+
+from places.store import VenueStore
+
+
+def test_get_returns_source_values(raw_places):
+    store = VenueStore.from_frame(raw_places)
+    for venue_id in [0, 17, 4999]:
+        venue = store[venue_id]
+        row = raw_places.loc[venue_id]
+        assert venue.category == row['category']
+        assert venue.rating == row['rating']
+        assert venue.lat == row['lat']
+        assert (np.isnan(venue.seats) and np.isnan(row['seats'])) or venue.seats == row['seats']
+    assert store.get(10_000) is None
+
+
+def test_by_name_matches_normalized_names(places_data):
+    store = VenueStore.from_frame(places_data)
+    names = places_data['name']
+    # индекс названий строится по уникальным названиям, а не по строкам
+    assert len(store._name_codes) == names.nunique()
+    for name in ['ШОКОЛАДНИЦА', 'ёлки-палки', 'Кафе', 'нет такого']:
+        key = name.upper().replace('Ё', 'Е')
+        expected = np.flatnonzero(names.to_numpy() == key)
+        np.testing.assert_array_equal(np.sort(store.positions_by_name(name)), expected)
+
+
+def test_duplicate_ids_are_rejected(raw_places):
+    data = raw_places.iloc[:10].set_axis([0, 1, 2, 3, 4, 5, 6, 7, 8, 8])
+    with pytest.raises(ValueError):
+        VenueStore.from_frame(data)
+
+
+def test_nbytes_counts_lookup_arrays(raw_places):
+    store = VenueStore.from_frame(raw_places)
+    strings = sum(column.nbytes() for column in store.strings.values())
+    numbers = sum(array.nbytes for array in store.numbers.values())
+    assert store.nbytes() > strings + numbers + store.cities.nbytes() + 4 * len(store)
@@ -0,0 +1,20 @@
+# coding: utf-8
+import pandas.testing as tm
+
+from places.cube import PlacesCube, report_tables
+from places.loader import read_csv_typed
+from places.preprocessing import preprocess
+from places.sketches import EXACT
+from places.streaming import stream_cube
+
+
+def test_stream_cube_matches_full_build(raw_places, tmp_path):
+    path = str(tmp_path / 'places.csv')
+    raw_places.to_csv(path, index=False)
+
+    streamed = stream_cube(path, chunksize=700, sketch_alpha=EXACT)
+    full = PlacesCube.build(preprocess(read_csv_typed(path)), sketch_alpha=EXACT)
+    expected, actual = report_tables(full), report_tables(streamed)
+    for name in expected:
+        tm.assert_frame_equal(actual[name], expected[name], check_dtype=False,
+                              check_categorical=False, obj=name)
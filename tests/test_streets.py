@@ -0,0 +1,57 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from places.streets import StreetIndex, parse_addresses
+
+
+def test_parse_addresses_unifies_spellings():
+    parsed = parse_addresses(pd.Series([
+        'Москва, улица Тверская, 5', 'Москва, Тверская ул., дом 5',
+        'Москва, Ленинградский проспект, 12к1', None,
+    ]))
+    assert parsed.loc[0, 'street_key'] == parsed.loc[1, 'street_key'] == 'улица тверская'
+    assert parsed.loc[1, 'house'] == '5'
+    assert parsed.loc[2, 'street_type'] == 'проспект'
+    assert parsed.loc[3].isna().all()
+
+
+def test_street_index_matches_groupby(places_data):
+    data = places_data
+    index = StreetIndex.from_frame(data)
+    keys = parse_addresses(data['address'])['street_key']
+    expected = keys.value_counts()
+
+    top = index.top(None)
+    assert len(top) == len(expected)
+    np.testing.assert_array_equal(top['count'].to_numpy(), expected.to_numpy())
+
+    # заведения улицы в любом написании - строки с тем же ключом
+    street = top['street'].iloc[0]
+    key = parse_addresses(pd.Series([f', {street}']))['street_key'].iloc[0]
+    assert set(index.venues(street)) == set(data.index[keys == key])
+    # написание, которого нет в данных, приводится к ключу разбором
+    assert set(index.venues('пр-т Мира')) == set(data.index[keys == 'проспект мира'])
+
+    district = data['district'].iloc[0]
+    in_district = keys[data['district'] == district].value_counts()
+    np.testing.assert_array_equal(index.top(None, district=district)['count'].to_numpy(),
+                                  in_district.to_numpy())
+
+
+def test_single_venue_streets_match_groupby(places_data):
+    data = places_data
+    index = StreetIndex.from_frame(data)
+    keys = parse_addresses(data['address'])['street_key']
+    sizes = keys.map(keys.value_counts())
+    single = data[sizes == 1]
+
+    assert len(index.single_venue()) == len(single)
+    assert set(index.venues_of(index.single_venue()['street'])) == set(single.index)
+
+    expected = (single.groupby('district', observed=True).size().rename('count').reset_index()
+                .sort_values('count', ascending=False, ignore_index=True))
+    result = index.single_venue_districts()
+    tm.assert_frame_equal(result.sort_values('district', ignore_index=True),
+                          expected.sort_values('district', ignore_index=True), check_dtype=False)
@@ -0,0 +1,86 @@
+# coding: utf-8
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from places.districts import DistrictBoundaries
+from places.tiles import (
+    MANIFEST, _render_districts, _run, encode_png, export_density_tiles, export_district_tiles,
+)
+
+
+def _square(name, lng, lat, size):
+    ring = [[lng, lat], [lng + size, lat], [lng + size, lat + size], [lng, lat + size], [lng, lat]]
+    return {'type': 'Feature', 'properties': {'name': name},
+            'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+
+
+@pytest.fixture
+def boundaries():
+    return DistrictBoundaries.from_geojson({'type': 'FeatureCollection', 'features': [
+        _square('west', 37.3, 55.6, 0.2), _square('east', 37.7, 55.6, 0.2),
+    ]})
+
+
+def _manifest(out_dir):
+    with open(os.path.join(out_dir, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_district_tiles_rerender_only_changed_district(boundaries, tmp_path):
+    out = str(tmp_path)
+    metric = pd.Series({'west': 1.0, 'east': 2.0, 'north': 3.0})
+    first = export_district_tiles(metric, boundaries, out, zooms=[11], workers=1)
+    assert first['rendered'] > 0 and first['skipped'] == 0
+    assert export_district_tiles(metric, boundaries, out, zooms=[11], workers=1)['rendered'] == 0
+
+    # east не пересекает тайлы west: перерисовываются только тайлы east
+    changed = export_district_tiles(metric.replace(2.0, 1.5), boundaries, out, zooms=[11],
+                                    workers=1)
+    assert 0 < changed['rendered'] < first['rendered']
+
+
+def test_district_tile_matches_full_boundaries(boundaries, tmp_path):
+    names, values = ['west', 'east'], np.array([1.0, 2.0])
+    key = '11/1236/640'
+    local = boundaries.take([0])
+    _render_districts(str(tmp_path / 'full'), key, boundaries, names, values, 1.0, 2.0)
+    _render_districts(str(tmp_path / 'local'), key, local, ['west'], values[:1], 1.0, 2.0)
+    with open(tmp_path / 'full' / f'{key}.png', 'rb') as full, \
+            open(tmp_path / 'local' / f'{key}.png', 'rb') as part:
+        png = full.read()
+        assert png == part.read()
+    # тайл внутри west, а не пустой
+    assert png != encode_png(np.zeros((256, 256, 4), dtype=np.uint8))
+
+
+def test_stale_tiles_are_removed(places_data, tmp_path):
+    out = str(tmp_path)
+    export_density_tiles(places_data, out, zooms=[10, 11], workers=1)
+    old = [key for key in _manifest(out) if key.startswith('11/')]
+    result = export_density_tiles(places_data, out, zooms=[10], workers=1)
+    assert result['removed'] == len(old) and result['rendered'] == 0
+    assert not any(key.startswith('11/') for key in _manifest(out))
+    assert not any(os.path.exists(os.path.join(out, f'{key}.png')) for key in old)
+
+
+def _render_or_fail(out_dir, key, fail):
+    if fail:
+        raise RuntimeError(key)
+    with open(os.path.join(out_dir, f'{key}.png'), 'wb') as f:
+        f.write(encode_png(np.zeros((1, 1, 4), dtype=np.uint8)))
+    return key
+
+
+def test_manifest_saved_when_render_fails(tmp_path):
+    out = str(tmp_path)
+    tasks = [('a', 'd1', (False,)), ('b', 'd2', (True,)), ('c', 'd3', (False,))]
+    with pytest.raises(RuntimeError):
+        _run(out, tasks, _render_or_fail, workers=1)
+    manifest = _manifest(out)
+    assert 'b' not in manifest
+    assert all(manifest[key] == digest for key, digest in manifest.items()
+               if os.path.exists(os.path.join(out, f'{key}.png')))
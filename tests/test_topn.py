@@ -0,0 +1,84 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from places.topn import SpaceSaving, category_totals, top_entities
+
+
+def test_top_entities_match_groupby_and_merge(places_data):
+    data = places_data
+    chains = top_entities(data['name'], data['category'], 15,
+                          rank_mask=data['chain'].to_numpy() == 1)
+
+    # как в скрипте до изменения: groupby сетевых, затем слияние топа со всеми заведениями
+    rest_top = (data[data['chain'] == 1].groupby('name').agg(count=('lat', 'count')).reset_index()
+                .sort_values(['count', 'name'], ascending=[False, True], ignore_index=True)
+                .head(15))
+    tm.assert_frame_equal(chains.top, rest_top, check_dtype=False)
+
+    rest_top_data = data.merge(rest_top, how='inner', on='name')
+    expected = (rest_top_data.groupby(['name', 'category'], observed=True).size()
+                .rename('count_cat').reset_index())
+    result = chains.by_category[['name', 'category', 'count_cat']]
+    expected['category'] = expected['category'].astype(object)
+    tm.assert_frame_equal(result.sort_values(['name', 'category'], ignore_index=True),
+                          expected.sort_values(['name', 'category'], ignore_index=True),
+                          check_dtype=False)
+
+    rest_top_cat = (rest_top_data.groupby('category', observed=True).agg(count=('name', 'count'))
+                    .reset_index().sort_values('count', ascending=False, ignore_index=True))
+    rest_top_cat['category'] = rest_top_cat['category'].astype(object)
+    tm.assert_frame_equal(category_totals(chains.by_category), rest_top_cat, check_dtype=False)
+
+
+@pytest.mark.parametrize('n', [1, 3, 10, None])
+def test_partial_selection_keeps_ties_order(n):
+    rng = np.random.default_rng(2)
+    keys = pd.Series(rng.integers(0, 200, 5_000).astype(str), name='key')
+    keys[rng.random(len(keys)) < 0.05] = None
+    counts = keys.value_counts().rename('count').rename_axis('key').reset_index()
+    expected = counts.sort_values(['count', 'key'], ascending=[False, True], ignore_index=True)
+    top = top_entities(keys, n=n).top
+    tm.assert_frame_equal(top, expected.head(n) if n else expected, check_dtype=False)
+
+
+def _zipf_stream(seed, size=40_000):
+    rng = np.random.default_rng(seed)
+    keys = rng.zipf(1.3, size) % 5_000
+    categories = np.where(keys % 3 == 0, 'кафе', 'бар')
+    return pd.Series(keys).astype(str), pd.Series(categories)
+
+
+def _check_bounds(summary, keys, categories):
+    true = keys.value_counts()
+    assert summary.total == len(keys)
+    assert len(summary.counts) <= summary.capacity
+    for key, count in summary.counts.items():
+        assert count - summary.errors[key] <= true.get(key, 0) <= count
+        for category, weight in summary.categories.get(key, {}).items():
+            assert weight <= ((keys == key) & (categories == category)).sum()
+    # значения с частотой больше total / capacity гарантированно в сводке
+    assert set(true[true > len(keys) / summary.capacity].index) <= set(summary.counts)
+
+
+def test_space_saving_bounds():
+    keys, categories = _zipf_stream(0)
+    summary = SpaceSaving(capacity=100)
+    for start in range(0, len(keys), 5_000):
+        summary.update(keys[start:start + 5_000], categories[start:start + 5_000])
+    _check_bounds(summary, keys, categories)
+
+    top = summary.top(5)
+    assert (top['guaranteed'] <= top['count']).all()
+    assert top['key'].tolist() == keys.value_counts().index[:5].tolist()
+
+
+def test_space_saving_merge_bounds():
+    (left, left_cat), (right, right_cat) = _zipf_stream(1), _zipf_stream(2)
+    merged = (SpaceSaving(100).update(left, left_cat)
+              .merge(SpaceSaving(100).update(right, right_cat)))
+    keys = pd.concat([left, right], ignore_index=True)
+    categories = pd.concat([left_cat, right_cat], ignore_index=True)
+    _check_bounds(merged, keys, categories)